@@ -0,0 +1 @@
+"""Benchmarks for QuickerCleaner; run the bench_*.py scripts directly"""
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the DiskCleaner scan and cleanup engines
+
+Generates a deterministic tree (see benchmarks/tree.py) and runs scan_path,
+scan_path_detailed, scan_drive and a dry-run clean_drive over it, each in its
+own process so peak RSS is per engine. Reports wall time, files/sec and stat
+calls per file, optionally saves the results as JSON and compares them with a
+stored baseline; the exit status is 1 if any engine regressed.
+
+Usage: python benchmarks/bench_engines.py [--files N] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.tree import SIZE_DISTRIBUTIONS, TreeSpec, generate_tree
+
+ENGINES = ('scan_path', 'scan_path_detailed', 'scan_drive', 'clean_drive')
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+
+class StatCounter:
+    """Counts stat calls made by an engine
+
+    os.stat/os.lstat are wrapped; DirEntry.stat() cannot be, so the walkers'
+    own WalkStats are collected: the sequential iter_files gets a shared
+    WalkStats and every ParallelWalker lister call records the per-worker one.
+    """
+    def __init__(self):
+        from quickercleaner import walker
+        self.walker = walker
+        self.os_calls = 0
+        self.shared = walker.WalkStats()
+        self.worker_stats: Dict[int, object] = {}
+
+    @property
+    def stat_calls(self) -> int:
+        walked = self.shared.stat_calls + sum(s.stat_calls for s in self.worker_stats.values())
+        return walked + self.os_calls
+
+    def install(self, cleaner):
+        import quickercleaner.cleaner as cleaner_module
+        for attr in ('stat', 'lstat'):
+            original = getattr(os, attr)
+            def counted(*args, _original=original, **kwargs):
+                self.os_calls += 1
+                return _original(*args, **kwargs)
+            setattr(os, attr, counted)
+
+        original_iter_files = cleaner_module.iter_files
+        def counted_iter_files(path, stats=None, *args, **kwargs):
+            return original_iter_files(path, self.shared, *args, **kwargs)
+        cleaner_module.iter_files = counted_iter_files
+
+        original_make_walker = cleaner._make_walker
+        def counted_make_walker(*args, **kwargs):
+            parallel = original_make_walker(*args, **kwargs)
+            lister = parallel.lister
+            def counted_lister(dirpath, stats):
+                self.worker_stats[id(stats)] = stats
+                return lister(dirpath, stats)
+            parallel.lister = counted_lister
+            return parallel
+        cleaner._make_walker = counted_make_walker
+
+def run_engine(engine: str, root: str, min_age_days: int, repeat: int, workers: int) -> Dict:
+    """Run one engine repeat times in this process and return its measurements"""
+    from quickercleaner.cleaner import DiskCleaner
+    from quickercleaner.config import Config
+
+    cleaner = DiskCleaner(Config())
+    cleaner.scan_index = None
+    cleaner.protected_paths = []
+    cleaner.cleanup_targets = {'bench': [root]}
+    cleaner.min_age_days = min_age_days
+    cleaner.dry_run = True
+    cleaner.thread_pool_size = workers
+    counter = StatCounter()
+    counter.install(cleaner)
+
+    walls: List[float] = []
+    candidates = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if engine == 'scan_path':
+            size, candidates = cleaner.scan_path(root)
+        elif engine == 'scan_path_detailed':
+            size, candidates, _ = cleaner.scan_path_detailed(root)
+        elif engine == 'scan_drive':
+            candidates = cleaner.scan_drive('bench')['total_files']
+        else:
+            candidates = cleaner.clean_drive('bench').files_processed
+        walls.append(time.perf_counter() - start)
+    return {
+        'wall_seconds': min(walls),
+        'walls': walls,
+        'candidates': candidates,
+        'stat_calls': counter.stat_calls // repeat,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+def run_isolated(engine: str, root: str, args) -> Dict:
+    cmd = [sys.executable, os.path.abspath(__file__), '--worker', engine, '--tree', root,
+           '--min-age', str(args.min_age), '--repeat', str(args.repeat), '--workers', str(args.workers)]
+    out = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print the change in files/sec per engine and return the regressed engines"""
+    regressed = []
+    print(f"\n{'engine':<20} {'baseline/s':>12} {'current/s':>12} {'change':>8}")
+    for engine, current in results['engines'].items():
+        base = baseline.get('engines', {}).get(engine)
+        if not base or not base['files_per_second']:
+            continue
+        change = current['files_per_second'] / base['files_per_second'] - 1
+        flag = ''
+        if change < -tolerance:
+            regressed.append(engine)
+            flag = '  REGRESSION'
+        print(f"{engine:<20} {base['files_per_second']:>12.0f} {current['files_per_second']:>12.0f} {change:>+7.1%}{flag}")
+    if results['tree'] != baseline.get('tree'):
+        print("warning: baseline was recorded on a different tree spec")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--fan-out', type=int, default=8)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--size-distribution', choices=SIZE_DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--mean-size', type=int, default=64 * 1024)
+    parser.add_argument('--max-age', type=int, default=1000, help='Oldest backdated mtime in days')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-age', type=int, default=365, help='DiskCleaner.min_age_days during the run')
+    parser.add_argument('--workers', type=int, default=4, help='Walker threads for scan_drive/clean_drive')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per engine; the fastest is reported')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+    parser.add_argument('--output', metavar='FILE', help='Save results as JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare with results saved by --output')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed files/sec drop vs the baseline')
+    parser.add_argument('--tree', metavar='DIR', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', choices=ENGINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_engine(args.worker, args.tree, args.min_age, args.repeat, args.workers)))
+        return
+
+    spec = TreeSpec(fan_out=args.fan_out, depth=args.depth, files=args.files,
+                    size_distribution=args.size_distribution, mean_size=args.mean_size,
+                    max_age_days=args.max_age, seed=args.seed)
+    root = tempfile.mkdtemp(prefix='qc-bench-')
+    try:
+        start = time.perf_counter()
+        manifest = generate_tree(root, spec)
+        print(f"Tree: {manifest['files']} files in {manifest['dirs']} directories, "
+              f"{manifest['bytes'] / 1024 / 1024:.0f} MB apparent, built in {time.perf_counter() - start:.1f}s\n")
+
+        results = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'min_age_days': args.min_age,
+            'workers': args.workers,
+            'tree': spec.to_dict(),
+            'engines': {},
+        }
+        print(f"{'engine':<20} {'wall':>8} {'files/s':>10} {'stat/file':>10} {'rss MB':>8} {'candidates':>11}")
+        for engine in args.engines:
+            data = run_isolated(engine, root, args)
+            data['files'] = manifest['files']
+            data['files_per_second'] = manifest['files'] / data['wall_seconds'] if data['wall_seconds'] else 0.0
+            data['stats_per_file'] = data['stat_calls'] / manifest['files'] if manifest['files'] else 0.0
+            results['engines'][engine] = data
+            print(f"{engine:<20} {data['wall_seconds']:>7.3f}s {data['files_per_second']:>10.0f} "
+                  f"{data['stats_per_file']:>10.2f} {data['peak_rss_mb']:>8.1f} {data['candidates']:>11}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the quicker-cleaner entry points
+
+Runs each scenario in a fresh interpreter under -X importtime and reports
+the wall time and the total time spent importing, plus the slowest
+top-level imports. Each scenario also lists modules it must never load
+(the scan engine for --help, sqlite3 for a plain scan, ...); loading one
+fails the run, as does an import-time regression against a saved baseline.
+
+Usage: python benchmarks/bench_startup.py [--repeat N] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name: (interpreter arguments, modules that must not be imported)
+SCENARIOS = {
+    'cli_help': (['-m', 'quickercleaner.main', '--help'],
+                 ('quickercleaner.cleaner', 'quickercleaner.config', 'dotenv', 'logging', 'sqlite3')),
+    # What --scan/--clean load before touching the disk
+    'cli_engine': (['-c', 'import quickercleaner.main; from quickercleaner.cleaner import DiskCleaner; DiskCleaner()'],
+                   ('sqlite3', 'hashlib', 'tkinter', 'psutil', 'quickercleaner.watch')),
+    'gui_import': (['-c', 'import quickercleaner.gui'],
+                   ('psutil', 'sqlite3', 'tkinter.filedialog')),
+}
+
+def parse_importtime(stderr: str) -> Tuple[int, List[Tuple[str, int]]]:
+    """Total import microseconds and (module, cumulative us) of the top-level imports"""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith('  '):
+            # Nested imports are already included in their parent's cumulative time
+            continue
+        top_level.append((name.strip(), int(cumulative)))
+    return sum(us for name, us in top_level), top_level
+
+def imported_modules(stderr: str) -> List[str]:
+    return [line.rsplit('|', 1)[1].strip() for line in stderr.splitlines()
+            if line.startswith('import time:') and 'self [us]' not in line]
+
+def run_scenario(args: List[str], repeat: int) -> Optional[Dict]:
+    """Fastest of repeat runs, or None if the scenario cannot run here (e.g. no tkinter)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            print(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit status {proc.returncode}")
+            return None
+        import_us, top_level = parse_importtime(proc.stderr)
+        if best is None or import_us < best['import_us']:
+            best = {
+                'wall_seconds': wall,
+                'import_us': import_us,
+                'slowest': sorted(top_level, key=lambda item: -item[1])[:5],
+                'modules': imported_modules(proc.stderr),
+            }
+    return best
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print the change in import time per scenario and return the regressed ones"""
+    regressed = []
+    print(f"\n{'scenario':<12} {'baseline ms':>12} {'current ms':>11} {'change':>8}")
+    for name, current in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base or not base['import_us']:
+            continue
+        change = current['import_us'] / base['import_us'] - 1
+        flag = ''
+        if change > tolerance:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<12} {base['import_us'] / 1000:>12.1f} {current['import_us'] / 1000:>11.1f} {change:>+7.1%}{flag}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per scenario; the fastest is reported')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--output', metavar='FILE', help='Save results as JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare with results saved by --output')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed import time increase vs the baseline')
+    args = parser.parse_args()
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scenarios': {},
+    }
+    failures = []
+    print(f"{'scenario':<12} {'wall ms':>8} {'import ms':>10}  slowest top-level imports")
+    for name in args.scenarios:
+        cmd, forbidden = SCENARIOS[name]
+        data = run_scenario(cmd, args.repeat)
+        if data is None:
+            print(f"{name:<12} skipped")
+            continue
+        slowest = ', '.join(f"{module} {us / 1000:.1f}" for module, us in data['slowest'])
+        print(f"{name:<12} {data['wall_seconds'] * 1000:>8.1f} {data['import_us'] / 1000:>10.1f}  {slowest}")
+        modules = set(data.pop('modules'))
+        loaded = [module for module in forbidden if module in modules]
+        if loaded:
+            failures.append(name)
+            print(f"{'':<12} imports {', '.join(loaded)}, which it should not need")
+        results['scenarios'][name] = data
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        failures.extend(compare(results, baseline, args.tolerance))
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Syscall-per-file benchmark for DiskCleaner.scan_path_detailed
+
+Builds a throwaway tree of backdated files and compares the legacy
+os.walk + exists/getsize/getmtime scan against the scandir engine.
+Stats issued through the os module are counted by wrapping os.stat/os.lstat;
+DirEntry.stat() calls cannot be wrapped and are taken from WalkStats.
+
+Usage: python benchmarks/bench_syscalls.py [--dirs N] [--files-per-dir N]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.tree import TreeSpec, generate_tree
+from quickercleaner import walker
+from quickercleaner.cleaner import DiskCleaner
+from quickercleaner.config import Config
+
+class CallCounter:
+    """Wrap os.stat, os.lstat, os.scandir and time.time with call counters"""
+    def __init__(self):
+        self.counts = {'os.stat': 0, 'os.lstat': 0, 'os.scandir': 0, 'time.time': 0}
+        self._originals = {}
+
+    def _wrap(self, module, attr, key):
+        original = getattr(module, attr)
+        self._originals[(module, attr)] = original
+        def counted(*args, **kwargs):
+            self.counts[key] += 1
+            return original(*args, **kwargs)
+        setattr(module, attr, counted)
+
+    def __enter__(self):
+        self._wrap(os, 'stat', 'os.stat')
+        self._wrap(os, 'lstat', 'os.lstat')
+        self._wrap(os, 'scandir', 'os.scandir')
+        self._wrap(time, 'time', 'time.time')
+        return self
+
+    def __exit__(self, *exc):
+        for (module, attr), original in self._originals.items():
+            setattr(module, attr, original)
+
+def legacy_scan_path_detailed(cleaner, path):
+    """The pre-scandir implementation, kept here as the baseline"""
+    total_size = 0
+    file_count = 0
+    file_list = []
+    for root, dirs, files in os.walk(path):
+        for f in files:
+            try:
+                fp = os.path.join(root, f)
+                if os.path.exists(fp):
+                    file_size = os.path.getsize(fp)
+                    file_age = cleaner.get_file_age(fp)
+                    if file_age >= cleaner.min_age_days:
+                        total_size += file_size
+                        file_count += 1
+                        file_list.append({
+                            'path': fp,
+                            'size': file_size,
+                            'age_days': file_age,
+                            'category': cleaner.get_file_category(fp)
+                        })
+            except Exception:
+                continue
+    return total_size, file_count, file_list
+
+def report(name, counter, file_count, elapsed, extra_stats=0):
+    stats = counter.counts['os.stat'] + counter.counts['os.lstat'] + extra_stats
+    print(f"{name:<10} {elapsed:8.3f}s  stat/file={stats / file_count:5.2f}  "
+          f"time.time/file={counter.counts['time.time'] / file_count:5.2f}  "
+          f"scandir={counter.counts['os.scandir']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dirs', type=int, default=50)
+    parser.add_argument('--files-per-dir', type=int, default=200)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='qc-bench-')
+    try:
+        spec = TreeSpec(fan_out=args.dirs, depth=1, files=args.dirs * args.files_per_dir,
+                        size_distribution='uniform', mean_size=256, min_age_days=400, max_age_days=400)
+        manifest = generate_tree(root, spec)
+        file_count = manifest['files']
+        cleaner = DiskCleaner(Config())
+        cleaner.min_age_days = 365
+        print(f"Tree: {file_count} files in {manifest['dirs']} directories\n")
+
+        with CallCounter() as counter:
+            start = time.perf_counter()
+            legacy = legacy_scan_path_detailed(cleaner, root)
+            elapsed = time.perf_counter() - start
+        report('legacy', counter, file_count, elapsed)
+
+        walk_stats = walker.WalkStats()
+        original_iter_files = walker.iter_files
+        def counted_iter_files(path, stats=None, *args, **kwargs):
+            return original_iter_files(path, walk_stats, *args, **kwargs)
+        sys.modules['quickercleaner.cleaner'].iter_files = counted_iter_files
+        try:
+            with CallCounter() as counter:
+                start = time.perf_counter()
+                current = cleaner.scan_path_detailed(root)
+                elapsed = time.perf_counter() - start
+        finally:
+            sys.modules['quickercleaner.cleaner'].iter_files = original_iter_files
+        report('scandir', counter, file_count, elapsed, walk_stats.stat_calls)
+
+        assert legacy[:2] == current[:2], "engines disagree on totals"
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
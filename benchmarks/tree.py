@@ -0,0 +1,98 @@
+"""
+Deterministic synthetic directory trees for the benchmarks
+
+The same TreeSpec (including its seed) always produces the same names, sizes
+and mtimes, so runs on different days or machines walk identical trees.
+Files are created sparse with truncate(), which keeps large trees cheap to
+build while st_size still reports the intended size.
+"""
+
+import math
+import os
+import random
+import time
+from typing import Dict, List, Tuple
+
+SECONDS_PER_DAY = 24 * 3600
+SIZE_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+class TreeSpec:
+    """Shape of a synthetic tree
+
+    fan_out subdirectories per directory down to depth levels below the root;
+    files are spread round-robin over every directory including the root.
+    Sizes follow size_distribution around mean_size, capped at max_size. Each
+    mtime is backdated by a whole number of days drawn uniformly from
+    [min_age_days, max_age_days], relative to the generation time.
+    """
+    def __init__(self, fan_out: int = 8, depth: int = 3, files: int = 20000,
+                 size_distribution: str = 'lognormal', mean_size: int = 64 * 1024,
+                 max_size: int = 256 * 1024 * 1024, min_age_days: int = 0, max_age_days: int = 1000,
+                 extensions: Tuple[str, ...] = ('.tmp', '.log', '.cache', '.dat'), seed: int = 0):
+        if size_distribution not in SIZE_DISTRIBUTIONS:
+            raise ValueError(f"size_distribution must be one of {SIZE_DISTRIBUTIONS}")
+        self.fan_out = fan_out
+        self.depth = depth
+        self.files = files
+        self.size_distribution = size_distribution
+        self.mean_size = mean_size
+        self.max_size = max_size
+        self.min_age_days = min_age_days
+        self.max_age_days = max_age_days
+        self.extensions = tuple(extensions)
+        self.seed = seed
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self), extensions=list(self.extensions))
+
+def _directories(root: str, spec: TreeSpec) -> List[str]:
+    dirs = [root]
+    level = [root]
+    for depth in range(spec.depth):
+        level = [os.path.join(parent, f"d{depth}_{i:03d}") for parent in level for i in range(spec.fan_out)]
+        dirs.extend(level)
+    return dirs
+
+def _size(rng: random.Random, spec: TreeSpec) -> int:
+    if spec.size_distribution == 'fixed':
+        size = spec.mean_size
+    elif spec.size_distribution == 'uniform':
+        size = rng.randint(0, 2 * spec.mean_size)
+    else:
+        # sigma 2 gives the long tail real temp and cache folders have;
+        # mu is chosen so the mean comes out at mean_size
+        sigma = 2.0
+        mu = math.log(max(spec.mean_size, 1)) - sigma * sigma / 2
+        size = int(rng.lognormvariate(mu, sigma))
+    return min(size, spec.max_size)
+
+def generate_tree(root: str, spec: TreeSpec) -> Dict:
+    """Create the tree under root and return its dirs, files, bytes and old_files
+
+    old_files maps min age in days to the number of files at least that old,
+    for the ages the benchmarks use (0, 30, 365).
+    """
+    rng = random.Random(spec.seed)
+    now = time.time()
+    dirs = _directories(root, spec)
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
+    total_bytes = 0
+    ages = {0: 0, 30: 0, 365: 0}
+    for i in range(spec.files):
+        dirpath = dirs[i % len(dirs)]
+        name = f"f{i:07d}{spec.extensions[i % len(spec.extensions)]}"
+        size = _size(rng, spec)
+        age_days = rng.randint(spec.min_age_days, spec.max_age_days)
+        fp = os.path.join(dirpath, name)
+        with open(fp, 'wb') as fh:
+            fh.truncate(size)
+        # Half a day past the whole number keeps age_in_days stable while
+        # the benchmark runs
+        mtime = now - (age_days + 0.5) * SECONDS_PER_DAY
+        os.utime(fp, (mtime, mtime))
+        total_bytes += size
+        for min_age in ages:
+            if age_days >= min_age:
+                ages[min_age] += 1
+    return {'dirs': len(dirs), 'files': spec.files, 'bytes': total_bytes, 'old_files': ages}
@@ -3,11 +3,18 @@
 Simple build script for QuickerCleaner Elite Edition
 """
 
+import argparse
 import os
 import subprocess
 import sys
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the QuickerCleaner Elite executable with PyInstaller")
+    parser.add_argument('--onedir', action='store_true',
+                        help='Fast-start layout: a folder with the executable and its libraries. '
+                             'A --onefile build unpacks itself to a temporary folder on every launch.')
+    args = parser.parse_args()
+
     print("Building QuickerCleaner Elite Edition...")
     
     # Install PyInstaller if not present
@@ -26,7 +33,7 @@ def main():
     # Build the executable
     cmd = [
         sys.executable, '-m', 'PyInstaller',
-        '--onefile',
+        '--onedir' if args.onedir else '--onefile',
         '--windowed',
         '--name=QuickerCleaner_Elite',
         '--add-data=quickercleaner;quickercleaner',
@@ -36,7 +43,11 @@ def main():
     print("Running PyInstaller...")
     subprocess.check_call(cmd)
     
-    print("Build complete! Executable: dist/QuickerCleaner_Elite.exe")
+    if args.onedir:
+        print("Build complete! Executable: dist/QuickerCleaner_Elite/QuickerCleaner_Elite.exe "
+              "(ship the whole dist/QuickerCleaner_Elite folder)")
+    else:
+        print("Build complete! Executable: dist/QuickerCleaner_Elite.exe")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,270 @@
+import os
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from quickercleaner.walker import age_in_days
+
+# Names are kept as UTF-8; surrogatepass round-trips any str os.scandir can
+# return, including undecodable bytes (Linux) and lone surrogates (Windows)
+_ENCODING = 'utf-8'
+_ERRORS = 'surrogatepass'
+
+class FileRecord:
+    """One candidate file
+
+    Supports record['path'] style access so code written against the old
+    per-file dicts keeps working.
+    """
+    __slots__ = ('dirpath', 'name', 'size', 'mtime', 'age_days', 'category')
+
+    def __init__(self, dirpath: str, name: str, size: int, mtime: float, age_days: int, category: str):
+        self.dirpath = dirpath
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.age_days = age_days
+        self.category = category
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.dirpath, self.name)
+
+    def __getitem__(self, key: str):
+        if key not in ('path', 'dirpath', 'name', 'size', 'mtime', 'age_days', 'category'):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict:
+        return {
+            'path': self.path,
+            'size': self.size,
+            'mtime': self.mtime,
+            'age_days': self.age_days,
+            'category': self.category,
+        }
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.path!r}, size={self.size}, age_days={self.age_days}, category={self.category!r})"
+
+class PathStore:
+    """Compact append-only list of paths
+
+    Each directory string is stored once; a path is a directory index plus a
+    slice of one shared buffer of UTF-8 basenames. Behaves as a read-only
+    sequence of path strings.
+    """
+    def __init__(self):
+        self._dirs: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self._dir_index = array('I')
+        self._names = bytearray()
+        self._offsets = array('Q', [0])
+
+    def append(self, path: str):
+        dirpath, name = os.path.split(path)
+        self.append_parts(dirpath, name)
+
+    def append_parts(self, dirpath: str, name: str):
+        dir_id = self._dir_ids.get(dirpath)
+        if dir_id is None:
+            dir_id = self._dir_ids[dirpath] = len(self._dirs)
+            self._dirs.append(dirpath)
+        self._dir_index.append(dir_id)
+        self._names += name.encode(_ENCODING, _ERRORS)
+        self._offsets.append(len(self._names))
+
+    def extend(self, other: 'PathStore', limit: Optional[int] = None):
+        """Append the first limit paths (all by default) of another store"""
+        count = len(other) if limit is None else min(limit, len(other))
+        if count <= 0:
+            return
+        remap = []
+        for dirpath in other._dirs:
+            dir_id = self._dir_ids.get(dirpath)
+            if dir_id is None:
+                dir_id = self._dir_ids[dirpath] = len(self._dirs)
+                self._dirs.append(dirpath)
+            remap.append(dir_id)
+        self._dir_index.extend(remap[i] for i in other._dir_index[:count])
+        base = len(self._names)
+        self._names += other._names[:other._offsets[count]]
+        self._offsets.extend(base + off for off in other._offsets[1:count + 1])
+
+    def dirname(self, index: int) -> str:
+        return self._dirs[self._dir_index[index]]
+
+    def basename(self, index: int) -> str:
+        return self._names[self._offsets[index]:self._offsets[index + 1]].decode(_ENCODING, _ERRORS)
+
+    def __len__(self) -> int:
+        return len(self._dir_index)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return os.path.join(self.dirname(index), self.basename(index))
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield os.path.join(self.dirname(i), self.basename(i))
+
+    def __repr__(self) -> str:
+        return f"PathStore({len(self)} paths, {len(self._dirs)} directories)"
+
+class FileStat(NamedTuple):
+    """The subset of os.stat_result duplicate detection reads, rebuilt from a FileIdentityStore"""
+    st_size: int
+    st_dev: int
+    st_ino: int
+    st_mtime_ns: int
+
+    @property
+    def st_mtime(self) -> float:
+        # Computed like os.stat_result does, so the value compares equal to a fresh stat
+        seconds, nanoseconds = divmod(self.st_mtime_ns, 1000000000)
+        return seconds + nanoseconds * 1e-9
+
+class FileIdentityStore:
+    """Columnar store of the files a duplicate scan may have to compare
+
+    Every file of the walk the rules allow goes in here, whatever its age,
+    so it keeps only what grouping by size, hard link detection and the
+    hash cache need: the path in a PathStore and size, device, inode and
+    mtime_ns in parallel arrays, a few dozen bytes per file. An inode or
+    device too large for 64 bits is stored as an inode of 0, which makes
+    DuplicateFinder stat the file again if it shares its size with another.
+    """
+    def __init__(self):
+        self.paths = PathStore()
+        self._sizes = array('q')
+        self._devs = array('Q')
+        self._inos = array('Q')
+        self._mtimes = array('q')
+
+    def add(self, dirpath: str, name: str, st: os.stat_result):
+        dev, ino = st.st_dev, st.st_ino
+        if dev >= 1 << 64 or ino >= 1 << 64:
+            dev, ino = 0, 0
+        self.paths.append_parts(dirpath, name)
+        self._sizes.append(st.st_size)
+        self._devs.append(dev)
+        self._inos.append(ino)
+        self._mtimes.append(st.st_mtime_ns)
+
+    def extend(self, other: 'FileIdentityStore'):
+        self.paths.extend(other.paths)
+        self._sizes.extend(other._sizes)
+        self._devs.extend(other._devs)
+        self._inos.extend(other._inos)
+        self._mtimes.extend(other._mtimes)
+
+    def entry(self, index: int) -> Tuple[str, str, FileStat]:
+        """(dirpath, name, stat) of one file"""
+        return (self.paths.dirname(index), self.paths.basename(index),
+                FileStat(self._sizes[index], self._devs[index], self._inos[index], self._mtimes[index]))
+
+    def shared_sizes(self, min_size: int = 1) -> Dict[int, List[int]]:
+        """Indices of the files of at least min_size bytes, by size, for sizes two or more files share"""
+        counts: Dict[int, int] = {}
+        for size in self._sizes:
+            if size >= min_size:
+                counts[size] = counts.get(size, 0) + 1
+        groups: Dict[int, List[int]] = {}
+        for index, size in enumerate(self._sizes):
+            if counts.get(size, 0) > 1:
+                groups.setdefault(size, []).append(index)
+        return groups
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def __repr__(self) -> str:
+        return f"FileIdentityStore({len(self)} files)"
+
+class CandidateStore:
+    """Columnar store of candidate files
+
+    Paths live in a PathStore; size, mtime and an interned category code are
+    parallel arrays, so a record costs a few dozen bytes instead of a dict.
+    Indexing and iteration materialise FileRecord views on demand; ages are
+    computed against the scan's reference time.
+    """
+    def __init__(self, now: float):
+        self.now = now
+        self.paths = PathStore()
+        self._sizes = array('q')
+        self._mtimes = array('d')
+        self._codes = array('B')
+        self._categories: List[str] = []
+        self._category_ids: Dict[str, int] = {}
+
+    def add(self, dirpath: str, name: str, size: int, mtime: float, category: str):
+        code = self._category_ids.get(category)
+        if code is None:
+            code = self._category_ids[category] = len(self._categories)
+            self._categories.append(category)
+        self.paths.append_parts(dirpath, name)
+        self._sizes.append(size)
+        self._mtimes.append(mtime)
+        self._codes.append(code)
+
+    def extend(self, other: 'CandidateStore', limit: Optional[int] = None):
+        """Append the first limit records (all by default) of another store"""
+        count = len(other) if limit is None else min(limit, len(other))
+        if count <= 0:
+            return
+        remap = []
+        for category in other._categories:
+            code = self._category_ids.get(category)
+            if code is None:
+                code = self._category_ids[category] = len(self._categories)
+                self._categories.append(category)
+            remap.append(code)
+        self.paths.extend(other.paths, count)
+        self._sizes.extend(other._sizes[:count])
+        self._mtimes.extend(other._mtimes[:count])
+        self._codes.extend(remap[c] for c in other._codes[:count])
+
+    @property
+    def total_size(self) -> int:
+        return sum(self._sizes)
+
+    def record(self, index: int) -> FileRecord:
+        mtime = self._mtimes[index]
+        return FileRecord(
+            self.paths.dirname(index),
+            self.paths.basename(index),
+            self._sizes[index],
+            mtime,
+            age_in_days(mtime, self.now),
+            self._categories[self._codes[index]],
+        )
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[FileRecord, List[FileRecord]]:
+        if isinstance(index, slice):
+            return [self.record(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.record(index)
+
+    def __iter__(self) -> Iterator[FileRecord]:
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def __repr__(self) -> str:
+        return f"CandidateStore({len(self)} files)"
@@ -1,10 +1,8 @@
 import os
-import shutil
 import logging
 import sys
 import time
-from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Iterator, List, Dict, Optional, Tuple
 
 # Import datetime with fallback for exe builds
 try:
@@ -20,25 +18,143 @@ if __name__ == "__main__":
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Simple imports
+from quickercleaner.candidates import CandidateStore, FileIdentityStore, FileRecord, PathStore
 from quickercleaner.config import Config
+from quickercleaner.counters import RunCounters
+from quickercleaner.dirtree import DirTree
+from quickercleaner.histogram import LogHistogram
+from quickercleaner.topk import TopFiles
+from quickercleaner.pipeline import StageStats
+from quickercleaner.progress import CancellationToken, ProgressReporter
+from quickercleaner.protected import ProtectedPathTrie, path_components
+from quickercleaner.throttle import IOThrottle
+from quickercleaner.trash import DeleterPool, DeleterTotals, TrashBackend
+from quickercleaner.walker import ParallelWalker, WalkStats, age_in_days, iter_files
+
+# Imported where used: sqlite3, hashlib and the copy machinery are only
+# needed by the features that use them, not on every start
+if TYPE_CHECKING:
+    from quickercleaner.hash_cache import HashCache
+    from quickercleaner.journal import CleanupJournal, JournalState
+    from quickercleaner.report import ReportWriter
+    from quickercleaner.scan_index import ScanIndex
 
 class CleanupResult:
-    def __init__(self, files_processed: int, space_freed_bytes: int, errors: List[str], duration_seconds: float, target_paths: List[str]):
+    def __init__(self, files_processed: int, space_freed_bytes: int, errors: List[str], duration_seconds: float, target_paths: PathStore, files_skipped: int = 0, stages: Optional[Dict[str, Dict]] = None, cancelled: bool = False,
+                 categories: Optional[Dict[str, Dict[str, int]]] = None, error_counts: Optional[Dict[str, int]] = None):
         self.files_processed = files_processed
         self.space_freed_bytes = space_freed_bytes
         self.errors = errors
         self.duration_seconds = duration_seconds
         self.target_paths = target_paths
+        self.files_skipped = files_skipped
+        # Per-stage counters of the cleanup pipeline: items, bytes,
+        # items_per_second, blocked_seconds and starved_seconds
+        self.stages = stages or {}
+        self.cancelled = cancelled
+        # {category: {'files': ..., 'bytes': ...}} of the files processed
+        self.categories = categories or {}
+        # Removal failures by symbolic errno (see walker.error_key)
+        self.error_counts = error_counts or {}
+
+class CleanupPlan:
+    """The exact set of files a scan found, ready to be executed by clean_drive
+
+    Entries are the scan's own candidate stores (path, size, mtime), so building
+    a plan costs no extra memory and executing it needs one stat per file to
+    confirm the file is unchanged since the preview.
+    """
+    def __init__(self, drive: str, created: float, file_details: Dict[str, CandidateStore]):
+        self.drive = drive
+        self.created = created
+        self.file_details = file_details
+
+    @property
+    def total_files(self) -> int:
+        return sum(len(files) for files in self.file_details.values())
+
+    @property
+    def total_size(self) -> int:
+        return sum(files.total_size for files in self.file_details.values())
+
+class _ScanAccumulator:
+    """Per-worker category totals, merged once the walk is finished
+
+    Only the first sample_size detail records per category are kept, or all of
+    them when sample_size is None (needed to build a CleanupPlan). Size and age
+    histograms are filled from the same stat, so they cover every candidate,
+    as do the bounded heaps of the top_k largest and oldest files. With
+    duplicates, every file the rules allow is also recorded in identities,
+    whatever its age. Every candidate of a listing is passed on to report in
+    one batch.
+    """
+    def __init__(self, cleaner: 'DiskCleaner', now: float, sample_size: Optional[int], progress: Optional[ProgressReporter] = None,
+                 duplicates: bool = False, top_k: int = 0, report: Optional['ReportWriter'] = None):
+        self.cleaner = cleaner
+        self.now = now
+        self.sample_size = sample_size
+        self.top_k = top_k
+        self.progress = progress
+        self.report = report
+        self.categories: Dict[str, List] = {}
+        self.identities: Optional[FileIdentityStore] = FileIdentityStore() if duplicates else None
+
+    def add_files(self, category: str, root: str, files: List[Tuple[str, os.stat_result]]):
+        cleaner = self.cleaner
+        totals = self.categories.get(category)
+        if self.progress is not None:
+            self.progress.update(len(files), sum(st.st_size for name, st in files), 1, root)
+        identities = self.identities
+        reported = [] if self.report is not None else None
+        for name, st in files:
+            if identities is not None and st.st_size >= cleaner.duplicate_min_size and cleaner.file_rules.classify(name) is not None:
+                identities.add(root, name, st)
+            file_category = cleaner._classify(name, st, self.now)
+            if file_category is None:
+                continue
+            if totals is None:
+                totals = self.categories[category] = [0, 0, CandidateStore(self.now), LogHistogram(), LogHistogram(),
+                                                      TopFiles(self.top_k), TopFiles(self.top_k)]
+            totals[0] += st.st_size
+            totals[1] += 1
+            totals[3].add(st.st_size, st.st_size)
+            totals[4].add(age_in_days(st.st_mtime, self.now), st.st_size)
+            if self.top_k:
+                totals[5].offer(st.st_size, root, name, st.st_size, st.st_mtime, file_category)
+                totals[6].offer(-st.st_mtime, root, name, st.st_size, st.st_mtime, file_category)
+            if self.sample_size is None or len(totals[2]) < self.sample_size:
+                totals[2].add(root, name, st.st_size, st.st_mtime, file_category)
+            if reported is not None:
+                reported.append((root, name, st, file_category))
+        if reported:
+            self.report.add_candidates(category, reported, self.now)
 
 class DiskCleaner:
     def __init__(self, config: Optional[Config] = None):
-        self.config = config or Config()
+        self.config = config or Config.default()
         self.logger = logging.getLogger("QuickerCleaner")
         self.dry_run = self.config.dry_run
         self.min_age_days = 365
-        self.move_target: Optional[str] = None
+        self.max_file_size_gb = self.config.max_file_size_gb
+        self._move_target: Optional[str] = None
         self.protected_paths = self.config.protected_paths
+        self.thread_pool_size = self.config.thread_pool_size
+        self.batch_size = self.config.batch_size
+        self.delete_workers = self.config.delete_workers
+        self.duplicate_min_size = self.config.duplicate_min_size
+        self.file_rules = self.config.file_rules
+        self.scan_index: Optional['ScanIndex'] = None
+        if self.config.use_scan_index:
+            from quickercleaner import scan_index
+            self.scan_index = scan_index.ScanIndex(self.config.scan_index_file)
+        # Opened by the first duplicates scan
+        self.hash_cache: Optional['HashCache'] = None
         self.cleanup_targets = self._default_cleanup_targets()
+        # Cumulative over this cleaner's lifetime; see RunCounters.summary_rows
+        self.counters = RunCounters()
+        # Shared by every walk and cleanup; set_limits() applies to runs in progress
+        self.throttle = IOThrottle(self.config.max_scan_ops, self.config.max_remove_ops,
+                                   self.config.max_remove_mb * 1024 * 1024, self.counters.add_phase)
 
     def _default_cleanup_targets(self) -> Dict[str, List[str]]:
         # Add more as needed for elite cleaning
@@ -48,161 +164,599 @@ class DiskCleaner:
             'downloads': [os.path.expandvars('%USERPROFILE%\\Downloads')],
         }
 
+    @property
+    def protected_paths(self) -> List[str]:
+        return self._protected_paths
+
+    @protected_paths.setter
+    def protected_paths(self, paths: List[str]):
+        # Normalise once; every check and walk then uses the trie
+        self._protected_paths = list(paths)
+        self._build_protected_trie()
+
+    @property
+    def move_target(self) -> Optional[str]:
+        """Directory clean_drive moves files into instead of the recycle bin"""
+        return self._move_target
+
+    @move_target.setter
+    def move_target(self, target: Optional[str]):
+        self._move_target = target or None
+        self._build_protected_trie()
+
+    def _build_protected_trie(self):
+        paths = list(self._protected_paths)
+        # Files already relocated must never be picked up again
+        if self._move_target:
+            paths.append(self._move_target)
+        self.protected_trie = ProtectedPathTrie(paths)
+
+    @property
+    def max_file_size_gb(self) -> float:
+        return self._max_file_size_gb
+
+    @max_file_size_gb.setter
+    def max_file_size_gb(self, value: float):
+        # Compared against st_size for every file, so keep it in bytes
+        self._max_file_size_gb = value
+        self._max_file_size_bytes = int(value * 1024**3)
+
+    def is_protected(self, path: str) -> bool:
+        """Check a path against the protected paths without touching the disk"""
+        return self.protected_trie.is_protected(path)
+
     def is_safe_to_clean(self, path: str) -> bool:
-        path = os.path.abspath(path)
-        for protected in self.protected_paths:
-            if path.startswith(os.path.abspath(protected)):
-                return False
+        if self.is_protected(path):
+            return False
         return os.path.exists(path)
 
-    def scan_path(self, path: str) -> Tuple[int, int]:
+    def scan_path(self, path: str, tree: Optional[DirTree] = None) -> Tuple[int, int]:
+        """Total size and count of every file below path
+
+        A DirTree(path) passed as tree is filled in the same walk and
+        finished, giving the per-directory breakdown.
+        """
         total_size = 0
         file_count = 0
-        for root, dirs, files in os.walk(path):
-            for f in files:
-                try:
-                    fp = os.path.join(root, f)
-                    total_size += os.path.getsize(fp)
-                    file_count += 1
-                except Exception:
-                    continue
+        stats = WalkStats()
+        with self.counters.phase('scan_path'):
+            for root, name, st in iter_files(path, stats, throttle=self.throttle):
+                total_size += st.st_size
+                file_count += 1
+                if tree is not None:
+                    tree.add(root, st.st_size, st.st_mtime)
+        self.counters.add_walk(stats)
+        if tree is not None:
+            tree.finish()
         return total_size, file_count
 
-    def scan_drive(self, drive: str) -> Dict:
+    def scan_drive(self, drive: str, make_plan: bool = False, sample_size: Optional[int] = 100,
+                   cancel: Optional[CancellationToken] = None, progress: Optional[Callable[[Dict], None]] = None,
+                   duplicates: bool = False, top_k: int = 10, report: Optional['ReportWriter'] = None) -> Dict:
+        """Scan the cleanup targets and return per-category totals
+
+        file_list/file_details hold at most sample_size records per category
+        (None keeps all); size_histogram and age_histogram (see
+        LogHistogram.buckets) cover every candidate in the category. largest
+        and oldest list the top_k biggest and least recently modified
+        candidates (FileRecords, most extreme first), per category and in
+        results['largest'] / results['oldest'] over all of them. With
+        make_plan every record is kept and results['plan'] is a CleanupPlan
+        over them. progress receives throttled events (see ProgressReporter);
+        if cancel is set the scan stops and the partial results are returned
+        with results['cancelled'] = True.
+
+        With duplicates, results['categories']['duplicates'] reports redundant
+        copies of identical files regardless of age (see _find_duplicates). It
+        is informational: it overlaps the other categories, so it is left out
+        of the totals, file_details and the plan.
+
+        report, a ReportWriter, receives every candidate while the walk runs
+        (duplicates once they are confirmed), whatever sample_size is; the
+        caller writes its summary and closes it.
+        """
         results = {
             'drive': drive, 
             'categories': {}, 
             'total_size': 0, 
             'total_files': 0, 
             'errors': [],
-            'file_details': {}  # New: detailed file information
+            'file_details': {},  # New: detailed file information
+            'largest': [],
+            'oldest': [],
         }
+        # One reference time for the whole scan keeps ages consistent across files
+        now = time.time()
+        started = time.perf_counter()
+        if make_plan:
+            sample_size = None
+        reporter = ProgressReporter(progress, 'scan') if progress is not None else None
         
-        for category, paths in self.cleanup_targets.items():
+        # Duplicate detection needs real stats (inode, mtime_ns) and reads the files anyway
+        walker = self._make_walker(use_index=not duplicates, cancel=cancel)
+        with self.counters.phase('scan.walk'):
+            accumulators, walk_stats = walker.run(self._scan_roots(), lambda: _ScanAccumulator(self, now, sample_size, reporter, duplicates, top_k, report))
+            if self.scan_index is not None:
+                self.scan_index.commit()
+        self.counters.add_walk(walk_stats)
+        # Files and directories the walk had to skip, by symbolic errno
+        results['error_counts'] = dict(walk_stats.error_counts)
+        results['cancelled'] = cancel is not None and cancel.cancelled
+        if reporter is not None:
+            reporter.finish(results['cancelled'])
+        
+        merge_started = time.perf_counter()
+        all_largest, all_oldest = TopFiles(top_k), TopFiles(top_k)
+        for category in self.cleanup_targets:
             cat_size, cat_files = 0, 0
-            cat_files_list = []  # List of actual files
+            cat_files_list = CandidateStore(now)  # Sample of actual files
+            size_histogram, age_histogram = LogHistogram(), LogHistogram()
+            largest, oldest = TopFiles(top_k), TopFiles(top_k)
             
-            for path in paths:
-                if self.is_safe_to_clean(path):
-                    size, files, file_list = self.scan_path_detailed(path)
-                    cat_size += size
-                    cat_files += files
-                    cat_files_list.extend(file_list)
+            for acc in accumulators:
+                totals = acc.categories.get(category)
+                if totals:
+                    cat_size += totals[0]
+                    cat_files += totals[1]
+                    room = None if sample_size is None else sample_size - len(cat_files_list)
+                    cat_files_list.extend(totals[2], room)
+                    size_histogram.merge(totals[3])
+                    age_histogram.merge(totals[4])
+                    largest.merge(totals[5])
+                    oldest.merge(totals[6])
             
             if cat_size > 0:
                 results['categories'][category] = {
                     'size': cat_size, 
                     'files': cat_files,
-                    'file_list': cat_files_list  # Actual file paths
+                    'file_list': cat_files_list,  # Actual file paths
+                    'size_histogram': size_histogram.buckets(),  # Bytes per file size
+                    'age_histogram': age_histogram.buckets(),  # Days since modified
+                    'largest': largest.records(now),
+                    'oldest': oldest.records(now),
                 }
                 results['total_size'] += cat_size
                 results['total_files'] += cat_files
                 results['file_details'][category] = cat_files_list
+                all_largest.merge(largest)
+                all_oldest.merge(oldest)
+        results['largest'] = all_largest.records(now)
+        results['oldest'] = all_oldest.records(now)
+        
+        if make_plan:
+            results['plan'] = CleanupPlan(drive, now, results['file_details'])
+        self.counters.add_phase('scan.merge', time.perf_counter() - merge_started)
         
+        if duplicates and not results['cancelled']:
+            with self.counters.phase('scan.duplicates'):
+                dup_category = self._find_duplicates(accumulators, now, sample_size, cancel, top_k, report)
+            if dup_category['files']:
+                results['categories']['duplicates'] = dup_category
+        results['duration_seconds'] = time.perf_counter() - started
         return results
 
-    def scan_path_detailed(self, path: str) -> Tuple[int, int, List[Dict]]:
-        """Scan path and return detailed file information"""
+    def _find_duplicates(self, accumulators: List[_ScanAccumulator], now: float, sample_size: Optional[int],
+                         cancel: Optional[CancellationToken], top_k: int = 0, report: Optional['ReportWriter'] = None) -> Dict:
+        """Hash the size collisions the walk collected and build the duplicates category"""
+        from quickercleaner.duplicates import HASH_SCHEME, DuplicateFinder
+        from quickercleaner.hash_cache import HashCache
+        identities = FileIdentityStore()
+        for acc in accumulators:
+            identities.extend(acc.identities)
+            acc.identities = None
+        if self.hash_cache is None and self.config.use_hash_cache:
+            self.hash_cache = HashCache(self.config.hash_cache_file, HASH_SCHEME,
+                                        self.config.hash_cache_max_entries, self.config.hash_cache_max_age_days)
+        finder = DuplicateFinder(self.thread_pool_size, self.duplicate_min_size, cancel, self.hash_cache)
+        groups = finder.find(identities)
+        del identities
+        if self.hash_cache is not None:
+            self.hash_cache.commit()
+        self.counters.add_error(finder.errors)
+        
+        copies = CandidateStore(now)
+        size_histogram, age_histogram = LogHistogram(), LogHistogram()
+        largest, oldest = TopFiles(top_k), TopFiles(top_k)
+        wasted, files = 0, 0
+        for group in groups:
+            if report is not None:
+                report.add_candidates('duplicates', [(dirpath, name, st, self.file_rules.category(name))
+                                                     for dirpath, name, st in group.copies], now)
+            for dirpath, name, st in group.copies:
+                wasted += st.st_size
+                files += 1
+                size_histogram.add(st.st_size, st.st_size)
+                age_histogram.add(age_in_days(st.st_mtime, now), st.st_size)
+                file_category = self.file_rules.category(name)
+                if top_k:
+                    largest.offer(st.st_size, dirpath, name, st.st_size, st.st_mtime, file_category)
+                    oldest.offer(-st.st_mtime, dirpath, name, st.st_size, st.st_mtime, file_category)
+                if sample_size is None or len(copies) < sample_size:
+                    copies.add(dirpath, name, st.st_size, st.st_mtime, file_category)
+        return {
+            'size': wasted,
+            'files': files,
+            'file_list': copies,  # Redundant copies; each group keeps its oldest file
+            'size_histogram': size_histogram.buckets(),
+            'age_histogram': age_histogram.buckets(),
+            'largest': largest.records(now),
+            'oldest': oldest.records(now),
+            'groups': groups,  # DuplicateGroup, largest waste first
+            'bytes_hashed': finder.bytes_read,
+        }
+
+    def iter_candidates(self, now: Optional[float] = None, totals: Optional[Dict[str, Dict[str, int]]] = None, use_index: bool = True,
+                        walk_stage: Optional[StageStats] = None, consumer_stage: Optional[StageStats] = None,
+                        cancel: Optional[CancellationToken] = None) -> Iterator[Tuple[str, FileRecord]]:
+        """Yield (cleanup category, FileRecord) for each file old enough to clean
+
+        Candidates are produced while the walk is still running and nothing is
+        retained, so memory stays constant. When a totals dict is given it is
+        kept up to date as {category: {'size': ..., 'files': ...}}. The stage
+        counters are passed through to ParallelWalker.iter_files. Setting
+        cancel ends the iteration early.
+        """
+        if now is None:
+            now = time.time()
+        walker = self._make_walker(use_index, cancel)
+        try:
+            for category, root, name, st in walker.iter_files(self._scan_roots(), walk_stage=walk_stage, consumer_stage=consumer_stage):
+                candidate = self._make_candidate(root, name, st, now)
+                if candidate is None:
+                    continue
+                if totals is not None:
+                    cat_totals = totals.get(category)
+                    if cat_totals is None:
+                        cat_totals = totals[category] = {'size': 0, 'files': 0}
+                    cat_totals['size'] += st.st_size
+                    cat_totals['files'] += 1
+                yield category, candidate
+            if use_index and self.scan_index is not None:
+                self.scan_index.commit()
+        finally:
+            # Also reached when the consumer stops early; the walk has been joined by then
+            if walker.stats is not None:
+                self.counters.add_walk(walker.stats)
+
+    def _scan_roots(self) -> List[Tuple[str, str]]:
+        """(category, directory) of every safe cleanup target, each directory walked once
+
+        Targets are resolved with realpath, and a target inside another is
+        dropped, as is a repeat of one (the first category listed keeps it),
+        keeping the order of cleanup_targets otherwise. On Windows
+        %TEMP% and %LOCALAPPDATA%\\Temp are usually the same directory, which
+        would otherwise be walked, counted and cleaned twice.
+        """
+        resolved = []
+        for category, paths in self.cleanup_targets.items():
+            for path in paths:
+                real = os.path.realpath(path)
+                if self.is_safe_to_clean(real):
+                    resolved.append((category, real, path_components(real)))
+        kept: List[List[str]] = []
+        roots = []
+        # Outermost first, so nested targets find their ancestor already kept
+        for category, real, parts in sorted(resolved, key=lambda root: len(root[2])):
+            if any(parts[:len(outer)] == outer for outer in kept):
+                continue
+            kept.append(parts)
+            roots.append((category, real))
+        position: Dict[str, int] = {}
+        for i, (category, real, parts) in enumerate(resolved):
+            position.setdefault(real, i)
+        return sorted(roots, key=lambda root: position[root[1]])
+
+    def _make_walker(self, use_index: bool, cancel: Optional[CancellationToken] = None) -> ParallelWalker:
+        if use_index and self.scan_index is not None:
+            return ParallelWalker(self.thread_pool_size, self.scan_index.list_dir, cancel, self.protected_trie, self.throttle)
+        return ParallelWalker(self.thread_pool_size, cancel=cancel, protected=self.protected_trie, throttle=self.throttle)
+
+    def scan_path_detailed(self, path: str, now: Optional[float] = None, tree: Optional[DirTree] = None) -> Tuple[int, int, CandidateStore]:
+        """Scan path and return detailed file information
+
+        A DirTree(path) passed as tree is filled with the candidates found
+        (not every file, as with scan_path) and finished.
+        """
+        if now is None:
+            now = time.time()
         total_size = 0
         file_count = 0
-        file_list = []
+        file_list = CandidateStore(now)
+        stats = WalkStats()
         
-        try:
-            for root, dirs, files in os.walk(path):
-                for f in files:
-                    try:
-                        fp = os.path.join(root, f)
-                        if os.path.exists(fp):
-                            file_size = os.path.getsize(fp)
-                            file_age = self.get_file_age(fp)
-                            
-                            # Only include files older than min_age_days
-                            if file_age >= self.min_age_days:
-                                total_size += file_size
-                                file_count += 1
-                                file_list.append({
-                                    'path': fp,
-                                    'size': file_size,
-                                    'age_days': file_age,
-                                    'category': self.get_file_category(fp)
-                                })
-                    except Exception:
-                        continue
-        except Exception:
-            pass
+        with self.counters.phase('scan_path_detailed'):
+            for root, name, st in iter_files(path, stats, self.protected_trie, self.throttle):
+                file_category = self._classify(name, st, now)
+                if file_category is not None:
+                    total_size += st.st_size
+                    file_count += 1
+                    file_list.add(root, name, st.st_size, st.st_mtime, file_category)
+                    if tree is not None:
+                        tree.add(root, st.st_size, st.st_mtime)
+        self.counters.add_walk(stats)
+        if tree is not None:
+            tree.finish()
             
         return total_size, file_count, file_list
 
+    def _classify(self, name: str, st: os.stat_result, now: float) -> Optional[str]:
+        """Category of a cleanup candidate from its name and stat, or None if it is not one"""
+        # Only include files older than min_age_days
+        if age_in_days(st.st_mtime, now) < self.min_age_days:
+            return None
+        return self.rule_category(name, st)
+
+    def rule_category(self, name: str, st: os.stat_result) -> Optional[str]:
+        """Category of a file that will be a candidate once old enough, or None if it never will"""
+        # Files above max_file_size_gb are left for the user to deal with
+        if st.st_size > self._max_file_size_bytes:
+            return None
+        return self.file_rules.classify(name)
+
+    def _make_candidate(self, root: str, name: str, st: os.stat_result, now: float) -> Optional[FileRecord]:
+        """Build the record for a file, or None if it is not a candidate"""
+        file_category = self._classify(name, st, now)
+        if file_category is None:
+            return None
+        return FileRecord(root, name, st.st_size, st.st_mtime, age_in_days(st.st_mtime, now), file_category)
+
     def get_file_age(self, file_path: str) -> int:
         """Get file age in days"""
         try:
-            mtime = os.path.getmtime(file_path)
-            age_seconds = time.time() - mtime
-            return int(age_seconds / (24 * 3600))  # Convert to days
+            return age_in_days(os.path.getmtime(file_path), time.time())
         except:
+            self.counters.add_error()
             return 0
 
     def get_file_category(self, file_path: str) -> str:
         """Categorize file based on extension"""
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext in ['.tmp', '.temp']:
-            return 'temporary'
-        elif ext in ['.log']:
-            return 'log'
-        elif ext in ['.cache']:
-            return 'cache'
-        else:
-            return 'other'
+        return self.file_rules.category(os.path.basename(file_path))
+
+    def clean_drive(self, drive: str, plan: Optional[CleanupPlan] = None,
+                    cancel: Optional[CancellationToken] = None, progress: Optional[Callable[[Dict], None]] = None,
+                    report: Optional['ReportWriter'] = None, journal: Optional['CleanupJournal'] = None,
+                    resume: Optional['JournalState'] = None) -> CleanupResult:
+        """Clean the cleanup targets, or exactly the files of a previewed plan
 
-    def clean_drive(self, drive: str) -> CleanupResult:
+        Files go to the recycle bin, or below move_target when it is set (see
+        Relocator; directory structure is kept). Runs as a pipeline: walker threads (or the plan) feed the verify stage
+        on this thread, which hands chunks of verified files through a bounded
+        queue to delete_workers deleter threads. Per-stage throughput and
+        backpressure end up in CleanupResult.stages. progress receives throttled
+        events for removed files; setting cancel stops every stage and returns
+        a partial result with cancelled = True. report, a ReportWriter, gets an
+        outcome per file as it is decided: removed, failed, skipped (changed
+        since a plan's scan) or dry_run.
+
+        With a journal (walks only, not plans or dry runs) every batch is
+        logged before and after removal, and the walk's progress with it;
+        passing the journal's unfinished() state as resume retries the
+        batches that were in flight and walks only the directories that had
+        not been listed yet. Retried files that are already gone are skipped,
+        like files that vanish before any other batch is removed; neither
+        counts towards the space freed.
+        """
+        if journal is not None and (plan is not None or self.dry_run):
+            raise ValueError("A journal records a walk that removes files; it cannot be used with a plan or a dry run")
+        if resume is not None and journal is None:
+            raise ValueError("Resuming a cleanup needs the journal it was recorded in")
+        move_target = self.move_target if not self.dry_run else None
+        if move_target:
+            from quickercleaner.relocate import prepare_target
+            # Once, here, so an unusable target fails the run before anything starts
+            move_target = prepare_target(move_target)
         start = datetime.now()
-        files_processed = 0
-        space_freed = 0
-        errors = []
-        target_paths = []
+        started = time.perf_counter()
+        files_skipped = 0
+        totals = DeleterTotals()
         
         # SAFETY: Use recycle bin instead of permanent deletion
         use_recycle_bin = True  # Always use recycle bin for safety
         
-        for category, paths in self.cleanup_targets.items():
-            for path in paths:
-                if self.is_safe_to_clean(path):
-                    for root, dirs, files in os.walk(path):
-                        for f in files:
-                            try:
-                                fp = os.path.join(root, f)
-                                
-                                # SAFETY: Check file age again before deletion
-                                if not self.is_file_old_enough(fp):
-                                    continue
-                                
-                                # SAFETY: Double-check protected paths
-                                if not self.is_safe_to_clean(fp):
-                                    continue
-                                
-                                if self.dry_run:
-                                    space_freed += os.path.getsize(fp)
-                                    files_processed += 1
-                                else:
-                                    # SAFETY: Move to recycle bin instead of permanent delete
-                                    if use_recycle_bin:
-                                        try:
-                                            import send2trash
-                                            send2trash.send2trash(fp)
-                                        except ImportError:
-                                            # Fallback to recycle bin via Windows API
-                                            self.move_to_recycle_bin(fp)
-                                    else:
-                                        os.remove(fp)
-                                    
-                                    space_freed += os.path.getsize(fp)
-                                    files_processed += 1
-                                    target_paths.append(fp)
-                            except Exception as e:
-                                errors.append(f"Error with {fp}: {str(e)}")
+        now = time.time()
+        # Deleter failures set stopped to wind the run down; that must not
+        # cancel the caller's token, which may outlive this run (WatchDaemon)
+        stopped = CancellationToken(cancel)
+        reporter = ProgressReporter(progress, 'clean') if progress is not None else None
+        walk_stage = StageStats('walk')
+        verify_stage = StageStats('verify')
+        delete_stage = StageStats('delete')
+        if plan is not None:
+            candidates = self._iter_plan_candidates(plan, now)
+        elif journal is not None:
+            if resume is None:
+                roots = self._scan_roots()
+            else:
+                roots = [] if resume.walked else resume.frontier
+            journal.begin(drive, roots, resume)
+            candidates = self._iter_journaled_candidates(now, roots, journal, walk_stage, verify_stage, stopped)
+        else:
+            candidates = self._iter_walk_candidates(now, walk_stage, verify_stage, stopped)
+        
+        # SAFETY: Move to recycle bin instead of permanent delete, in batches
+        # through one backend handle per deleter for the whole run
+        deleters = None
+        if not self.dry_run:
+            if move_target:
+                from quickercleaner.relocate import Relocator
+                make_backend = lambda: Relocator(move_target)
+            else:
+                make_backend = lambda: TrashBackend(use_recycle_bin)
+            deleters = DeleterPool(
+                self.delete_workers, self.batch_size, make_backend,
+                verify_stage, delete_stage, stopped, reporter, report,
+                journal, resume.next_seq if resume is not None else 0, self.throttle
+            )
         
+        walked = False
+        try:
+            if resume is not None:
+                with self.counters.phase('clean.resume'):
+                    files_skipped += self._retry_journaled(resume, deleters, journal, verify_stage, now)
+            chunk = []
+            # Skipped and dry-run outcomes, reported in batch_size batches
+            outcomes = []
+            for category, fp, size in candidates:
+                if stopped.is_set():
+                    break
+                if len(outcomes) >= self.batch_size:
+                    report.add_outcomes(outcomes)
+                    outcomes = []
+                if size is None:
+                    files_skipped += 1
+                    if report is not None:
+                        outcomes.append((category, fp, None, 'skipped', None))
+                    continue
+                verify_stage.items += 1
+                verify_stage.bytes += size
+                if deleters is None:
+                    totals.add_removed(None, size, category)
+                    if reporter is not None:
+                        reporter.update(1, size, 0, fp)
+                    if report is not None:
+                        outcomes.append((category, fp, size, 'dry_run', None))
+                    continue
+                chunk.append((fp, size, category))
+                if len(chunk) >= self.batch_size:
+                    deleters.submit(chunk)
+                    chunk = []
+            if chunk and not stopped.is_set():
+                deleters.submit(chunk)
+            if report is not None:
+                report.add_outcomes(outcomes)
+            walked = not stopped.is_set()
+            if journal is not None and walked:
+                journal.walked()
+        finally:
+            # Stops the walker threads too if the loop ended early
+            candidates.close()
+            try:
+                if deleters is not None:
+                    with self.counters.phase('clean.drain'):
+                        totals = deleters.close()
+                if journal is not None and walked and not stopped.is_set():
+                    journal.end(totals.files, totals.bytes, len(totals.errors))
+            finally:
+                if journal is not None:
+                    journal.close()
+        cancelled = cancel is not None and cancel.cancelled
+        if reporter is not None:
+            reporter.finish(cancelled)
+        
+        elapsed = time.perf_counter() - started
+        self.counters.add_phase('clean', elapsed)
+        stages = {stage.name: stage.as_dict(elapsed) for stage in (walk_stage, verify_stage, delete_stage)}
         duration = (datetime.now() - start).total_seconds()
-        return CleanupResult(files_processed, space_freed, errors, duration, target_paths)
+        return CleanupResult(totals.files, totals.bytes, totals.errors, duration, totals.removed, files_skipped + totals.skipped, stages, cancelled,
+                             totals.categories, totals.error_counts)
+
+    def _iter_walk_candidates(self, now: float, walk_stage: Optional[StageStats] = None, verify_stage: Optional[StageStats] = None,
+                              cancel: Optional[CancellationToken] = None) -> Iterator[Tuple[str, str, Optional[int]]]:
+        """Walk the cleanup targets and yield (category, path, size) for removable files"""
+        # Never trust cached listings when deleting
+        for category, candidate in self.iter_candidates(now, use_index=False, walk_stage=walk_stage, consumer_stage=verify_stage, cancel=cancel):
+            fp = candidate.path
+            
+            # SAFETY: Double-check protected paths (the walk already pruned them)
+            if self.is_protected(fp):
+                continue
+            
+            yield category, fp, candidate.size
+
+    def _iter_journaled_candidates(self, now: float, roots: List[Tuple[str, str]], journal: 'CleanupJournal',
+                                   walk_stage: StageStats, verify_stage: StageStats,
+                                   cancel: CancellationToken) -> Iterator[Tuple[str, str, Optional[int]]]:
+        """_iter_walk_candidates over roots, passing each directory to the journal once its candidates are out"""
+        walker = self._make_walker(False, cancel)
+        yielded = 0
+        try:
+            for category, dirpath, subdirs, files in walker.iter_listings(roots, walk_stage=walk_stage, consumer_stage=verify_stage):
+                for name, st in files:
+                    candidate = self._make_candidate(dirpath, name, st, now)
+                    # SAFETY: Double-check protected paths (the walk already pruned them)
+                    if candidate is None or self.is_protected(candidate.path):
+                        continue
+                    yielded += 1
+                    yield category, candidate.path, candidate.size
+                journal.listed(dirpath, subdirs, yielded)
+        finally:
+            if walker.stats is not None:
+                self.counters.add_walk(walker.stats)
+
+    def _retry_journaled(self, resume: 'JournalState', deleters: DeleterPool, journal: 'CleanupJournal',
+                         verify_stage: StageStats, now: float) -> int:
+        """Resubmit the batches an interrupted run left in flight and return how many files were skipped
+
+        Each file is checked again like a plan entry; files that changed are
+        journaled as skipped, and so are files that are already gone.
+        """
+        stats = WalkStats()
+        skipped = 0
+        try:
+            for seq, entries in sorted(resume.pending.items()):
+                chunk, changed = [], []
+                for fp, size, category in entries:
+                    stats.stat_calls += 1
+                    self.throttle.scan(1)
+                    try:
+                        st = os.lstat(fp)
+                    except FileNotFoundError:
+                        changed.append(fp)
+                        continue
+                    except OSError as e:
+                        stats.record_error(e)
+                        changed.append(fp)
+                        continue
+                    # SAFETY: Only remove the file exactly as it was journaled
+                    if (st.st_size != size or self._classify(os.path.basename(fp), st, now) is None
+                            or self.is_protected(fp)):
+                        changed.append(fp)
+                        continue
+                    chunk.append((fp, size, category))
+                    verify_stage.items += 1
+                    verify_stage.bytes += size
+                if changed:
+                    journal.skipped(seq, changed)
+                    skipped += len(changed)
+                if chunk:
+                    deleters.submit(chunk, seq)
+                else:
+                    journal.done(seq, 0, 0, [])
+        finally:
+            self.counters.add_walk(stats)
+        return skipped
+
+    def _iter_plan_candidates(self, plan: CleanupPlan, now: float) -> Iterator[Tuple[str, str, Optional[int]]]:
+        """Revalidate plan entries; files changed since the scan yield a size of None"""
+        stats = WalkStats()
+        try:
+            for category, files in plan.file_details.items():
+                for file_info in files:
+                    fp = file_info.path
+                    stats.stat_calls += 1
+                    self.throttle.scan(1)
+                    try:
+                        st = os.lstat(fp)
+                    except OSError as e:
+                        stats.record_error(e)
+                        yield category, fp, None
+                        continue
+                    stats.files_seen += 1
+                    stats.bytes_seen += st.st_size
+                    
+                    # SAFETY: Only remove the file exactly as it was previewed
+                    if st.st_size != file_info.size or st.st_mtime != file_info.mtime:
+                        yield category, fp, None
+                        continue
+                    
+                    # SAFETY: Settings may have changed since the scan
+                    if self._classify(file_info.name, st, now) is None or self.is_protected(fp):
+                        yield category, fp, None
+                        continue
+                    
+                    yield category, fp, st.st_size
+        finally:
+            self.counters.add_walk(stats)
 
     def is_file_old_enough(self, file_path: str) -> bool:
         """Check if file is old enough to be cleaned"""
@@ -214,11 +768,6 @@ class DiskCleaner:
 
     def move_to_recycle_bin(self, file_path: str):
         """Move file to Windows recycle bin using shell API"""
-        try:
-            import win32com.client
-            shell = win32com.client.Dispatch("Shell.Application")
-            folder = shell.NameSpace(os.path.dirname(file_path))
-            folder.MoveHere(os.path.basename(file_path))
-        except:
-            # Fallback: just delete if recycle bin fails
-            os.remove(file_path)
+        error = TrashBackend().remove([file_path])[0]
+        if error is not None:
+            raise error
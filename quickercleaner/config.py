@@ -1,17 +1,64 @@
 import os
 from typing import List, Dict, Optional
-from dotenv import load_dotenv
+
+from quickercleaner.rules import FileRules
+
+_dotenv_loaded = False
+
+def _split_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def _load_dotenv():
+    """Merge .env into os.environ, once per process"""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        # Searching for and parsing .env is most of the cost of a Config
+        from dotenv import load_dotenv
+        load_dotenv()
+        _dotenv_loaded = True
 
 class Config:
-    """Configuration management for QuickerCleaner"""
+    """Configuration management for QuickerCleaner
+
+    Config() reads the environment afresh (.env is only loaded the first
+    time); Config.default() returns one shared instance parsed on first use.
+    """
+    _default: Optional['Config'] = None
+
     def __init__(self):
-        load_dotenv()
+        _load_dotenv()
         self.target_drive = os.getenv('QUICK_CLEANER_TARGET_DRIVE', 'D:')
         self.max_file_size_gb = float(os.getenv('QUICK_CLEANER_MAX_FILE_SIZE_GB', '10.0'))
         self.dry_run = os.getenv('QUICK_CLEANER_DRY_RUN', 'false').lower() == 'true'
         self.confirm_deletions = os.getenv('QUICK_CLEANER_CONFIRM_DELETIONS', 'true').lower() == 'true'
         self.log_level = os.getenv('QUICK_CLEANER_LOG_LEVEL', 'INFO')
         self.log_file = os.getenv('QUICK_CLEANER_LOG_FILE', 'quick_cleaner.log')
+        self.thread_pool_size = int(os.getenv('QUICK_CLEANER_THREAD_POOL_SIZE', '4'))
+        self.batch_size = int(os.getenv('QUICK_CLEANER_BATCH_SIZE', '100'))
+        self.delete_workers = int(os.getenv('QUICK_CLEANER_DELETE_WORKERS', '2'))
+        self.duplicate_min_size = int(os.getenv('QUICK_CLEANER_DUPLICATE_MIN_SIZE', '1024'))
+        self.use_scan_index = os.getenv('QUICK_CLEANER_SCAN_INDEX', 'false').lower() == 'true'
+        default_index_file = os.path.join(os.path.dirname(self.log_file), 'quick_cleaner_index.sqlite')
+        self.scan_index_file = os.getenv('QUICK_CLEANER_SCAN_INDEX_FILE', default_index_file)
+        self.use_hash_cache = os.getenv('QUICK_CLEANER_HASH_CACHE', 'true').lower() == 'true'
+        default_hash_cache_file = os.path.join(os.path.dirname(self.log_file), 'quick_cleaner_hashes.sqlite')
+        self.hash_cache_file = os.getenv('QUICK_CLEANER_HASH_CACHE_FILE', default_hash_cache_file)
+        self.hash_cache_max_entries = int(os.getenv('QUICK_CLEANER_HASH_CACHE_MAX_ENTRIES', '1000000'))
+        self.hash_cache_max_age_days = int(os.getenv('QUICK_CLEANER_HASH_CACHE_MAX_AGE_DAYS', '90'))
+        self.watch_backend = os.getenv('QUICK_CLEANER_WATCH_BACKEND', 'auto').lower()
+        self.watch_poll_seconds = float(os.getenv('QUICK_CLEANER_WATCH_POLL_SECONDS', '5'))
+        # 0 disables the schedule or the threshold
+        self.watch_clean_interval = float(os.getenv('QUICK_CLEANER_WATCH_CLEAN_INTERVAL', '0'))
+        self.watch_clean_above_mb = float(os.getenv('QUICK_CLEANER_WATCH_CLEAN_ABOVE_MB', '0'))
+        self.watch_clean_above_files = int(os.getenv('QUICK_CLEANER_WATCH_CLEAN_ABOVE_FILES', '0'))
+        # Empty disables the cleanup journal
+        self.journal_file = os.getenv('QUICK_CLEANER_JOURNAL_FILE', '')
+        self.journal_fsync_seconds = float(os.getenv('QUICK_CLEANER_JOURNAL_FSYNC_SECONDS', '1'))
+        # I/O limits per second; 0 is unlimited
+        self.max_scan_ops = float(os.getenv('QUICK_CLEANER_MAX_SCAN_OPS', '0'))
+        self.max_remove_ops = float(os.getenv('QUICK_CLEANER_MAX_REMOVE_OPS', '0'))
+        self.max_remove_mb = float(os.getenv('QUICK_CLEANER_MAX_REMOVE_MB', '0'))
+        self.idle_io = os.getenv('QUICK_CLEANER_IDLE_IO', 'false').lower() == 'true'
         protected_paths_str = os.getenv('QUICK_CLEANER_PROTECTED_PATHS', '')
         self.protected_paths = [p.strip() for p in protected_paths_str.split(',') if p.strip()]
         if not self.protected_paths:
@@ -26,12 +73,48 @@ class Config:
                 os.path.expandvars('%PROGRAMFILES%'),
                 os.path.expandvars('%PROGRAMFILES(X86)%')
             ]
+        # Unset means every file in the cleanup targets is eligible
+        temp_patterns_str = os.getenv('QUICK_CLEANER_TEMP_PATTERNS')
+        self.temp_patterns = _split_list(temp_patterns_str) if temp_patterns_str is not None else None
+        self.protected_extensions = _split_list(os.getenv('QUICK_CLEANER_PROTECTED_EXTENSIONS', ''))
+        # Compiled once here and evaluated per file name during walks
+        self.file_rules = FileRules(self.temp_patterns, self.protected_extensions)
+
+    @classmethod
+    def default(cls) -> 'Config':
+        """The process-wide Config; construct a new one to change settings without affecting others"""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
     def validate(self) -> List[str]:
         errors = []
         if self.target_drive and not os.path.exists(self.target_drive):
             errors.append(f"Target drive {self.target_drive} does not exist")
         if self.max_file_size_gb <= 0:
             errors.append("Max file size must be greater than 0")
+        if self.thread_pool_size < 1:
+            errors.append("Thread pool size must be at least 1")
+        if self.batch_size < 1:
+            errors.append("Batch size must be at least 1")
+        if self.delete_workers < 1:
+            errors.append("Delete workers must be at least 1")
+        if self.duplicate_min_size < 1:
+            errors.append("Duplicate min size must be at least 1 byte")
+        if self.hash_cache_max_entries < 1:
+            errors.append("Hash cache max entries must be at least 1")
+        if self.hash_cache_max_age_days < 1:
+            errors.append("Hash cache max age must be at least 1 day")
+        if self.watch_backend not in ('auto', 'inotify', 'poll'):
+            errors.append(f"Invalid watch backend: {self.watch_backend}. Must be auto, inotify or poll")
+        if self.watch_poll_seconds <= 0:
+            errors.append("Watch poll interval must be greater than 0")
+        if self.watch_clean_interval < 0 or self.watch_clean_above_mb < 0 or self.watch_clean_above_files < 0:
+            errors.append("Watch clean interval and thresholds must not be negative")
+        if self.journal_fsync_seconds < 0:
+            errors.append("Journal fsync interval must not be negative")
+        if self.max_scan_ops < 0 or self.max_remove_ops < 0 or self.max_remove_mb < 0:
+            errors.append("I/O limits must not be negative")
         valid_log_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
         if self.log_level not in valid_log_levels:
             errors.append(f"Invalid log level: {self.log_level}. Must be one of {valid_log_levels}")
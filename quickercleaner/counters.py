@@ -0,0 +1,72 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from quickercleaner.walker import WalkStats
+
+class RunCounters:
+    """Always-on counters for the work a DiskCleaner has done
+
+    Walks fill per-worker WalkStats that are merged in here once per run, and
+    phases are timed with one perf_counter pair each, so keeping these on
+    costs nothing measurable. errors counts exceptions that were handled by
+    skipping a file or directory rather than reported to the caller. The
+    throttle.* phases are the time worker threads spent waiting on I/O
+    limits, summed over threads, so they can exceed the run's wall time.
+    """
+    def __init__(self):
+        self.walk = WalkStats()
+        self.errors = 0
+        self.phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_walk(self, stats: WalkStats):
+        with self._lock:
+            self.walk.merge(stats)
+
+    def add_error(self, count: int = 1):
+        with self._lock:
+            self.errors += count
+
+    def add_phase(self, name: str, seconds: float):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the time spent in the with block to phase name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    @property
+    def swallowed_errors(self) -> int:
+        return self.walk.errors + self.errors
+
+    def as_dict(self) -> Dict:
+        return {
+            'dirs_listed': self.walk.dirs_listed,
+            'dirs_cached': self.walk.dirs_cached,
+            'stat_calls': self.walk.stat_calls,
+            'files_evaluated': self.walk.files_seen,
+            'bytes_evaluated': self.walk.bytes_seen,
+            'swallowed_errors': self.swallowed_errors,
+            'error_counts': dict(self.walk.error_counts),
+            'phase_seconds': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+        }
+
+    def summary_rows(self) -> List[Tuple[str, str]]:
+        """(label, value) rows for printing as a table"""
+        rows = [
+            ('directories listed', f"{self.walk.dirs_listed:,}"),
+            ('directories from index', f"{self.walk.dirs_cached:,}"),
+            ('stat calls', f"{self.walk.stat_calls:,}"),
+            ('files evaluated', f"{self.walk.files_seen:,}"),
+            ('bytes evaluated', f"{self.walk.bytes_seen:,}"),
+            ('exceptions swallowed', f"{self.swallowed_errors:,}"),
+        ]
+        rows.extend((f"time in {name}", f"{seconds:.3f}s") for name, seconds in self.phases.items())
+        return rows
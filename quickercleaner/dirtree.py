@@ -0,0 +1,156 @@
+import heapq
+import os
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+class DirTree:
+    """Bottom-up directory totals (du) collected from an ongoing walk
+
+    Directories are nodes in parallel arrays indexed by node number: parent
+    index, size, file count and oldest/newest mtime, plus each directory's
+    basename. A node is created the first time a file below it is added, its
+    missing ancestors first, so a parent always has a lower index than its
+    children and finish() rolls the direct totals up into recursive ones
+    with a single reverse pass. Directories without any file below them are
+    left out. add() takes one file at a time, from a sequential walk.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self.names: List[str] = [root]
+        self.parent = array('q', [-1])
+        self.size = array('q', [0])
+        self.files = array('q', [0])
+        self.oldest = array('d', [float('inf')])
+        self.newest = array('d', [float('-inf')])
+        self.finished = False
+        # Path → node, only needed while the tree is being built
+        self._index: Dict[str, int] = {root: 0}
+        stripped = root.rstrip('\\/')
+        if stripped and stripped != root:
+            self._index[stripped] = 0
+        self._last: Tuple[str, int] = (root, 0)
+
+    def _node(self, dirpath: str) -> int:
+        index = self._index.get(dirpath)
+        if index is not None:
+            return index
+        missing = []
+        path = dirpath
+        while index is None:
+            missing.append(path)
+            parent = os.path.dirname(path)
+            if parent == path:
+                raise ValueError(f"{dirpath} is not below {self.root}")
+            path = parent
+            index = self._index.get(path)
+        for path in reversed(missing):
+            self.names.append(os.path.basename(path))
+            self.parent.append(index)
+            self.size.append(0)
+            self.files.append(0)
+            self.oldest.append(float('inf'))
+            self.newest.append(float('-inf'))
+            index = self._index[path] = len(self.names) - 1
+        return index
+
+    def add(self, dirpath: str, size: int, mtime: float):
+        """Count one file directly inside dirpath"""
+        last_path, index = self._last
+        if dirpath != last_path:
+            index = self._node(dirpath)
+            self._last = (dirpath, index)
+        self.size[index] += size
+        self.files[index] += 1
+        if mtime < self.oldest[index]:
+            self.oldest[index] = mtime
+        if mtime > self.newest[index]:
+            self.newest[index] = mtime
+
+    def finish(self):
+        """Turn the per-directory totals into recursive ones; no more files can be added"""
+        if self.finished:
+            return
+        parent, size, files, oldest, newest = self.parent, self.size, self.files, self.oldest, self.newest
+        for i in range(len(parent) - 1, 0, -1):
+            p = parent[i]
+            size[p] += size[i]
+            files[p] += files[i]
+            if oldest[i] < oldest[p]:
+                oldest[p] = oldest[i]
+            if newest[i] > newest[p]:
+                newest[p] = newest[i]
+        self._index = {}
+        self.finished = True
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def path(self, index: int) -> str:
+        parts = []
+        while index > 0:
+            parts.append(self.names[index])
+            index = self.parent[index]
+        return os.path.join(self.root, *reversed(parts))
+
+    def node(self, index: int) -> Dict:
+        """{'path', 'size', 'files', 'oldest_mtime', 'newest_mtime'} of one directory"""
+        node = {'path': self.path(index)}
+        node.update(self._totals(index))
+        return node
+
+    def _totals(self, index: int) -> Dict:
+        has_files = self.files[index] > 0
+        return {
+            'size': self.size[index],
+            'files': self.files[index],
+            'oldest_mtime': self.oldest[index] if has_files else None,
+            'newest_mtime': self.newest[index] if has_files else None,
+        }
+
+    def heaviest(self, n: int) -> List[Dict]:
+        """The n directories with the most bytes below them, largest first
+
+        Like sorting du output, nested directories are all ranked, so a
+        heavy leaf shows up together with its ancestors.
+        """
+        self.finish()
+        return [self.node(i) for i in heapq.nlargest(n, range(len(self)), key=self.size.__getitem__)]
+
+    def to_treemap(self, max_depth: Optional[int] = None, min_size: int = 0) -> Dict:
+        """Nested {'name', 'size', 'files', 'total_size', 'total_files', 'oldest_mtime', 'newest_mtime', 'children'}
+
+        The format hierarchical treemap tools read: size and files are a
+        node's own share, not counting the children listed, so
+        d3.hierarchy(tree).sum(d => d.size) (or plotly's branchvalues
+        'remainder') adds up to total_size at every node. Subtrees below
+        max_depth or smaller than min_size are left out as nodes, and their
+        bytes and files count as their parent's own. The mtimes cover the
+        whole subtree.
+        """
+        self.finish()
+        children: List[List[int]] = [[] for _ in range(len(self))]
+        for i in range(1, len(self)):
+            children[self.parent[i]].append(i)
+        root = self._treemap_node(0)
+        stack = [(0, root, 0)]
+        while stack:
+            index, node, depth = stack.pop()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for child in sorted(children[index], key=self.size.__getitem__, reverse=True):
+                if self.size[child] < min_size:
+                    continue
+                child_node = self._treemap_node(child)
+                node['children'].append(child_node)
+                node['size'] -= child_node['total_size']
+                node['files'] -= child_node['total_files']
+                stack.append((child, child_node, depth + 1))
+        return root
+
+    def _treemap_node(self, index: int) -> Dict:
+        node = {'name': self.names[index]}
+        node.update(self._totals(index))
+        node['total_size'] = node['size']
+        node['total_files'] = node['files']
+        node['children'] = []
+        return node
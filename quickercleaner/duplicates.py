@@ -0,0 +1,210 @@
+import hashlib
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from quickercleaner.candidates import FileIdentityStore, FileStat
+from quickercleaner.hash_cache import HashCache, hash_key
+
+# Bytes hashed from each end of a file in the partial pass
+EDGE_BYTES = 16 * 1024
+# Identifies digests in a HashCache; change it whenever hashing changes
+HASH_SCHEME = f"blake2b-160/edges-{EDGE_BYTES}"
+# Read size when a file cannot be mapped
+_READ_CHUNK = 1024 * 1024
+
+# (dirpath, name, stat); the stat is a FileStat unless the file had to be stat'ed again
+FileEntry = Tuple[str, str, Union[FileStat, os.stat_result]]
+
+def _new_hash():
+    return hashlib.blake2b(digest_size=20)
+
+class DuplicateGroup:
+    """Byte-identical files: keep is the copy to leave in place, copies the redundant ones"""
+    __slots__ = ('size', 'digest', 'keep', 'copies')
+
+    def __init__(self, size: int, digest: str, keep: FileEntry, copies: List[FileEntry]):
+        self.size = size
+        self.digest = digest
+        self.keep = keep
+        self.copies = copies
+
+    @property
+    def wasted(self) -> int:
+        return self.size * len(self.copies)
+
+    def paths(self) -> List[str]:
+        return [os.path.join(dirpath, name) for dirpath, name, st in [self.keep] + self.copies]
+
+    def to_dict(self) -> Dict:
+        return {'size': self.size, 'digest': self.digest, 'wasted': self.wasted, 'paths': self.paths()}
+
+class DuplicateFinder:
+    """Finds byte-identical files with a size → partial hash → full hash cascade
+
+    Files are first grouped by size, which needs nothing beyond the walk's
+    stat. Only sizes shared by two or more files are read at all, and then only
+    EDGE_BYTES from each end; a file is hashed in full (through mmap) only if
+    another file of its size has the same edges. Files small enough for the
+    edges to cover them entirely are never read twice. Hashing runs on a
+    thread pool, since hashlib releases the GIL on large buffers.
+
+    Hard links to one inode count as one file. bytes_read records how much
+    data was actually hashed. With a HashCache, digests of files whose
+    identity and mtime are unchanged are reused without reading them.
+    """
+    def __init__(self, workers: int = 4, min_size: int = 1, cancel: Optional[threading.Event] = None,
+                 cache: Optional[HashCache] = None):
+        self.workers = max(1, workers)
+        self.min_size = max(1, min_size)
+        self.cancel = cancel
+        self.cache = cache
+        self.bytes_read = 0
+        self.files_read = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def find(self, files: FileIdentityStore) -> List[DuplicateGroup]:
+        """Return groups of identical files, largest waste first"""
+        groups = []
+        for size, indices in files.shared_sizes(self.min_size).items():
+            entries = self._distinct_inodes(self._with_inodes([files.entry(i) for i in indices]))
+            if len(entries) > 1:
+                groups.append((size, entries))
+        with ThreadPoolExecutor(self.workers) as pool:
+            groups = self._split(pool, groups, self._partial_digest)
+            # Files no bigger than both edges were hashed whole already
+            final = [(size, digest, entries) for size, digest, entries in groups if size <= 2 * EDGE_BYTES]
+            pending = [(size, entries) for size, digest, entries in groups if size > 2 * EDGE_BYTES]
+            final.extend(self._split(pool, pending, self._full_digest))
+
+        result = []
+        for size, digest, entries in final:
+            # Keep the oldest copy, it is the most likely original
+            entries.sort(key=lambda e: (e[2].st_mtime, e[0], e[1]))
+            result.append(DuplicateGroup(size, digest, entries[0], entries[1:]))
+        result.sort(key=lambda g: (-g.wasted, g.paths()[0]))
+        return result
+
+    def _with_inodes(self, entries: List[FileEntry]) -> List[FileEntry]:
+        """Re-stat entries whose walk stat has no inode (DirEntry.stat on Windows)
+
+        Only files sharing a size get here, so this is one extra stat for a
+        small fraction of files, and it enables both hard link detection and
+        the hash cache.
+        """
+        if all(st.st_ino for dirpath, name, st in entries):
+            return entries
+        restated = []
+        for dirpath, name, st in entries:
+            if not st.st_ino:
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    self._failed()
+                    continue
+            restated.append((dirpath, name, st))
+        return restated
+
+    @staticmethod
+    def _distinct_inodes(entries: List[FileEntry]) -> List[FileEntry]:
+        seen = set()
+        distinct = []
+        for entry in entries:
+            st = entry[2]
+            # st_ino is 0 where the walk's stat does not report it (Windows)
+            if st.st_ino:
+                key = (st.st_dev, st.st_ino)
+                if key in seen:
+                    continue
+                seen.add(key)
+            distinct.append(entry)
+        return distinct
+
+    def _split(self, pool: ThreadPoolExecutor, groups: List[Tuple[int, List[FileEntry]]], digest_fn) -> List[Tuple[int, str, List[FileEntry]]]:
+        """Hash every file of the groups and regroup them by (size, digest)"""
+        jobs = [(size, entry) for size, entries in groups for entry in entries]
+        digests = pool.map(lambda job: digest_fn(job[1], job[0]), jobs)
+        regrouped: Dict[Tuple[int, str], List[FileEntry]] = {}
+        for (size, entry), digest in zip(jobs, digests):
+            if digest is not None:
+                regrouped.setdefault((size, digest), []).append(entry)
+        return [(size, digest, entries) for (size, digest), entries in regrouped.items() if len(entries) > 1]
+
+    def _cancelled(self) -> bool:
+        return self.cancel is not None and self.cancel.is_set()
+
+    def _count(self, nbytes: int):
+        with self._lock:
+            self.bytes_read += nbytes
+            self.files_read += 1
+
+    def _failed(self):
+        with self._lock:
+            self.errors += 1
+
+    def _partial_digest(self, entry: FileEntry, size: int) -> Optional[str]:
+        if self._cancelled():
+            return None
+        key = hash_key(entry[2]) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)[0]
+            if cached is not None:
+                return cached
+        path = os.path.join(entry[0], entry[1])
+        h = _new_hash()
+        try:
+            with open(path, 'rb') as f:
+                if size <= 2 * EDGE_BYTES:
+                    data = f.read()
+                    h.update(data)
+                    self._count(len(data))
+                else:
+                    head = f.read(EDGE_BYTES)
+                    f.seek(size - EDGE_BYTES)
+                    tail = f.read(EDGE_BYTES)
+                    h.update(head)
+                    h.update(tail)
+                    self._count(len(head) + len(tail))
+        except OSError:
+            self._failed()
+            return None
+        digest = h.hexdigest()
+        if key is not None:
+            self.cache.put(key, partial=digest)
+        return digest
+
+    def _full_digest(self, entry: FileEntry, size: int) -> Optional[str]:
+        if self._cancelled():
+            return None
+        key = hash_key(entry[2]) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)[1]
+            if cached is not None:
+                return cached
+        path = os.path.join(entry[0], entry[1])
+        h = _new_hash()
+        try:
+            with open(path, 'rb') as f:
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                        h.update(m)
+                        read = len(m)
+                except (ValueError, OSError):
+                    # Not mappable (empty, special or network file); read it instead
+                    f.seek(0)
+                    h = _new_hash()
+                    read = 0
+                    for chunk in iter(lambda: f.read(_READ_CHUNK), b''):
+                        h.update(chunk)
+                        read += len(chunk)
+        except OSError:
+            self._failed()
+            return None
+        self._count(read)
+        digest = h.hexdigest()
+        if key is not None:
+            self.cache.put(key, full=digest)
+        return digest
@@ -1,7 +1,8 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, filedialog
+from tkinter import ttk, messagebox, scrolledtext
 import threading
 import os
+import shutil
 import sys
 
 # Import datetime with fallback for exe builds
@@ -12,8 +13,6 @@ except ImportError:
     import datetime as dt
     datetime = dt.datetime
 
-import psutil
-
 # Ensure running from project root for relative imports
 if __name__ == "__main__":
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -21,29 +20,38 @@ if __name__ == "__main__":
         sys.path.insert(0, project_root)
     try:
         from quickercleaner.cleaner import DiskCleaner
-        from quickercleaner.config import Config
+        from quickercleaner.histogram import format_bytes
+        from quickercleaner.progress import CancellationToken
+        from quickercleaner.throttle import set_idle_io_priority
     except ImportError as e:
         print("[ERROR] Could not import QuickerCleaner modules. Please run this script from the project root directory (where README.md is located).\nDetails:", e)
         sys.exit(1)
 else:
     from quickercleaner.cleaner import DiskCleaner
-    from quickercleaner.config import Config
+    from quickercleaner.histogram import format_bytes
+    from quickercleaner.progress import CancellationToken
+    from quickercleaner.throttle import set_idle_io_priority
 
 class QuickerCleanerGUI:
     def __init__(self):
         self.root = tk.Tk()
         self.setup_window()
         self.cleaner = DiskCleaner()
-        self.config = Config()
+        self.config = self.cleaner.config
+        if self.config.idle_io:
+            # Scan and clean threads started later inherit the priority
+            set_idle_io_priority()
         self.scanning = False
         self.cleaning = False
+        self.cancel_token = CancellationToken()
         
         # Drive selection variables
         self.source_drive = tk.StringVar(value="C:")
         self.destination_drive = tk.StringVar(value="D:")
         
         self.create_widgets()
-        self.update_disk_info()
+        # Query the disk once the window is up rather than before it appears
+        self.root.after_idle(self.update_disk_info)
 
     def setup_window(self):
         """Setup the main window with elite styling"""
@@ -440,7 +448,7 @@ class QuickerCleanerGUI:
     def update_disk_info(self):
         """Update disk information display"""
         try:
-            disk_usage = psutil.disk_usage('C:\\')
+            disk_usage = shutil.disk_usage('C:\\')
             total_gb = disk_usage.total / (1024**3)
             free_gb = disk_usage.free / (1024**3)
             used_gb = disk_usage.used / (1024**3)
@@ -478,7 +486,7 @@ class QuickerCleanerGUI:
 
         def scan_thread():
             try:
-                results = self.cleaner.scan_drive(source)
+                results = self.cleaner.scan_drive(source, progress=self.report_progress)
                 self.root.after(0, self.update_scan_results, results)
             except Exception as e:
                 self.root.after(0, self.handle_error, f"Scan error: {str(e)}")
@@ -502,6 +510,11 @@ class QuickerCleanerGUI:
                 files = data.get('files', 0)
                 size_mb = data.get('size', 0) / (1024**2)
                 self.output.insert(tk.END, f"📁 {category.replace('_', ' ').title()}: {files:,} files, {size_mb:.2f} MB\n")
+                # Where the bytes are, by file size, from the scan's own histogram
+                for bucket in data.get('size_histogram', []):
+                    share = bucket['bytes'] / data['size'] * 100 if data.get('size') else 0
+                    self.output.insert(tk.END, f"    {format_bytes(bucket['low'])} - {format_bytes(bucket['high'])}: "
+                                               f"{bucket['files']:,} files, {bucket['bytes']/(1024**2):.2f} MB ({share:.0f}%)\n")
             
             self.output.insert(tk.END, f"\n🎯 Total: {total_files:,} files, {total_size/(1024**2):.2f} MB\n")
             self.output.insert(tk.END, f"{'='*50}\n\n")
@@ -529,7 +542,7 @@ class QuickerCleanerGUI:
         
         # Get cleanup preview
         try:
-            preview_results = self.cleaner.scan_drive(source)
+            preview_results = self.cleaner.scan_drive(source, make_plan=True)
             total_files = preview_results.get('total_files', 0)
             total_size_mb = preview_results.get('total_size', 0) / (1024**2)
         except Exception as e:
@@ -549,7 +562,7 @@ Destination: {destination}
 • File age filter: {self.cleaner.min_age_days} days minimum
 
 🛡️ SAFETY FEATURES:
-• Files will be moved to Recycle Bin (recoverable)
+• Files will be {'moved to ' + destination + ' (folder structure kept)' if destination != source else 'moved to Recycle Bin (recoverable)'}
 • Protected paths will never be touched
 • Double verification before deletion
 • Emergency stop available during cleanup
@@ -577,6 +590,8 @@ Are you absolutely sure you want to proceed?
         self.emergency_stop_btn.config(state=tk.NORMAL)
 
         self.cleaning = True
+        self.cancel_token = CancellationToken()
+        plan = preview_results['plan']
         self.clean_btn.config(state=tk.DISABLED)
         self.status_label.config(text=f"Cleaning {source}... (Click STOP to cancel)")
         self.progress_var.set(0)
@@ -586,10 +601,13 @@ Are you absolutely sure you want to proceed?
 
         def clean_thread():
             try:
-                # Set destination if different from source
-                if destination != source:
-                    self.cleaner.move_target = destination
-                result = self.cleaner.clean_drive(source)
+                # Move files to the destination if it differs from the source
+                self.cleaner.move_target = destination if destination != source else None
+                # Execute exactly the files shown in the safety confirmation
+                result = self.cleaner.clean_drive(
+                    source, plan=plan, cancel=self.cancel_token,
+                    progress=lambda event: self.report_progress(event, plan.total_files)
+                )
                 self.root.after(0, self.update_clean_results, result)
             except Exception as e:
                 self.root.after(0, self.handle_error, f"Cleanup error: {str(e)}")
@@ -602,6 +620,8 @@ Are you absolutely sure you want to proceed?
         """Emergency stop cleanup operation"""
         if self.cleaning:
             self.cleaning = False
+            # The cleanup pipeline checks this between files and batches
+            self.cancel_token.cancel()
             self.emergency_stop_btn.config(state=tk.DISABLED)
             self.emergency_stop_btn.pack_forget()  # Hide the button
             self.clean_btn.config(state=tk.NORMAL)
@@ -611,19 +631,43 @@ Are you absolutely sure you want to proceed?
             self.output.see(tk.END)
             messagebox.showwarning("Emergency Stop", "Cleanup operation has been stopped. Some files may have already been processed.")
 
+    def report_progress(self, event, total_files=None):
+        """Progress callback for DiskCleaner; runs on the worker thread"""
+        self.root.after(0, self.update_progress, event, total_files)
+
+    def update_progress(self, event, total_files=None):
+        """Show a throttled progress event from a scan or cleanup"""
+        if event.get('done') or not (self.scanning or self.cleaning):
+            return
+        files = event.get('files', 0)
+        size_mb = event.get('bytes', 0) / (1024**2)
+        if event.get('phase') == 'clean':
+            text = f"Cleaning... {files:,} files, {size_mb:.2f} MB freed (Click STOP to cancel)"
+            if total_files:
+                self.progress_var.set(min(100, files * 100 / total_files))
+        else:
+            text = f"Scanning... {files:,} files, {event.get('dirs', 0):,} folders, {size_mb:.2f} MB"
+        self.status_label.config(text=text)
+
     def update_clean_results(self, result):
         """Update cleanup results display"""
-        self.output.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] ✅ Cleanup completed!\n\n")
+        if getattr(result, 'cancelled', False):
+            self.output.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] 🛑 Cleanup stopped - partial results:\n\n")
+        else:
+            self.output.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] ✅ Cleanup completed!\n\n")
         
         if result:
             files_processed = getattr(result, 'files_processed', 0)
             space_freed_mb = getattr(result, 'space_freed_bytes', 0) / (1024**2)
             duration = getattr(result, 'duration_seconds', 0)
             errors = getattr(result, 'errors', [])
+            files_skipped = getattr(result, 'files_skipped', 0)
             
             self.output.insert(tk.END, f"🎉 Cleanup Results:\n")
             self.output.insert(tk.END, f"{'='*50}\n")
             self.output.insert(tk.END, f"📁 Files processed: {files_processed:,}\n")
+            if files_skipped:
+                self.output.insert(tk.END, f"⏭️ Skipped (changed since preview): {files_skipped:,}\n")
             self.output.insert(tk.END, f"💾 Space freed: {space_freed_mb:.2f} MB\n")
             self.output.insert(tk.END, f"⏱️ Duration: {duration:.2f} seconds\n")
             self.output.insert(tk.END, f"{'='*50}\n\n")
@@ -666,15 +710,15 @@ Are you absolutely sure you want to proceed?
         """Open settings dialog"""
         settings_window = tk.Toplevel(self.root)
         settings_window.title("Settings - QuickerCleaner Elite")
-        settings_window.geometry("500x400")
+        settings_window.geometry("500x520")
         settings_window.configure(bg='#1e1e1e')
         settings_window.resizable(False, False)
         
         # Center the window
         settings_window.update_idletasks()
         x = (settings_window.winfo_screenwidth() // 2) - (500 // 2)
-        y = (settings_window.winfo_screenheight() // 2) - (400 // 2)
-        settings_window.geometry(f"500x400+{x}+{y}")
+        y = (settings_window.winfo_screenheight() // 2) - (520 // 2)
+        settings_window.geometry(f"500x520+{x}+{y}")
         
         # Make it modal
         settings_window.transient(self.root)
@@ -743,6 +787,37 @@ Are you absolutely sure you want to proceed?
         paths_text.pack(fill=tk.X, pady=(5, 0))
         paths_text.insert(tk.END, "\n".join(self.cleaner.protected_paths))
         
+        # I/O limits, applied at once even to a scan or cleanup in progress
+        limits = self.cleaner.throttle.limits
+        limit_vars = {}
+        for key, text, value in (
+            ('max_scan_ops', "Max scan ops per second (0 = unlimited):", limits['max_scan_ops']),
+            ('max_remove_ops', "Max removals per second (0 = unlimited):", limits['max_remove_ops']),
+            ('max_remove_mb', "Max removed MB per second (0 = unlimited):", limits['max_remove_bytes'] / (1024 * 1024)),
+        ):
+            limit_frame = tk.Frame(settings_frame, bg='#1e1e1e')
+            limit_frame.pack(fill=tk.X, pady=5)
+            
+            tk.Label(
+                limit_frame,
+                text=text,
+                font=("Segoe UI", 10, "bold"),
+                fg='#ffffff',
+                bg='#1e1e1e'
+            ).pack(side=tk.LEFT)
+            
+            limit_vars[key] = tk.StringVar(value=f"{value:g}")
+            tk.Entry(
+                limit_frame,
+                textvariable=limit_vars[key],
+                font=("Segoe UI", 10),
+                bg='#3b3b3b',
+                fg='#ffffff',
+                relief=tk.SUNKEN,
+                bd=2,
+                width=10
+            ).pack(side=tk.RIGHT)
+        
         # Buttons
         button_frame = tk.Frame(settings_window, bg='#1e1e1e')
         button_frame.pack(fill=tk.X, padx=20, pady=20)
@@ -760,6 +835,15 @@ Are you absolutely sure you want to proceed?
                 new_paths = [p.strip() for p in new_paths if p.strip()]
                 self.cleaner.protected_paths = new_paths
                 
+                # Update I/O limits
+                new_limits = {key: float(var.get() or 0) for key, var in limit_vars.items()}
+                if any(limit < 0 for limit in new_limits.values()):
+                    raise ValueError("I/O limits must not be negative")
+                self.cleaner.throttle.set_limits(
+                    new_limits['max_scan_ops'], new_limits['max_remove_ops'],
+                    new_limits['max_remove_mb'] * 1024 * 1024
+                )
+                
                 messagebox.showinfo("Success", "Settings saved successfully!")
                 settings_window.destroy()
             except ValueError as e:
@@ -906,6 +990,7 @@ Built by Tony Technologies LLC
 
     def choose_source_drive(self):
         """Open file dialog to choose source drive/folder"""
+        from tkinter import filedialog
         folder = filedialog.askdirectory(
             title="Choose Source Drive/Folder",
             initialdir=self.source_drive.get()
@@ -915,6 +1000,7 @@ Built by Tony Technologies LLC
 
     def choose_destination_drive(self):
         """Open file dialog to choose destination drive/folder"""
+        from tkinter import filedialog
         folder = filedialog.askdirectory(
             title="Choose Destination Drive/Folder",
             initialdir=self.destination_drive.get()
@@ -938,7 +1024,8 @@ Built by Tony Technologies LLC
             try:
                 # Enable dry run mode
                 self.cleaner.dry_run = True
-                results = self.cleaner.scan_drive(self.source_drive.get())
+                # The preview only lists the largest files, so skip the discovery-order sample
+                results = self.cleaner.scan_drive(self.source_drive.get(), sample_size=0, progress=self.report_progress)
                 self.root.after(0, self.update_dry_run_results, results)
             except Exception as e:
                 self.root.after(0, self.handle_error, f"Dry run error: {str(e)}")
@@ -968,22 +1055,24 @@ Built by Tony Technologies LLC
             self.output.insert(tk.END, f"💾 Total space that would be freed: {total_size/(1024**2):.2f} MB\n")
             self.output.insert(tk.END, f"{'='*60}\n\n")
             
-            # Show detailed file information
-            if 'file_details' in results and results['file_details']:
-                self.output.insert(tk.END, f"📋 DETAILED FILE LIST:\n")
+            # Show the largest files per category; the heaps cover every candidate
+            if any(data.get('largest') for data in results['categories'].values()):
+                self.output.insert(tk.END, f"📋 LARGEST FILES:\n")
                 self.output.insert(tk.END, f"{'='*60}\n")
                 
-                for category, file_list in results['file_details'].items():
-                    if file_list:
+                for category, data in results['categories'].items():
+                    largest = data.get('largest')
+                    if largest:
                         self.output.insert(tk.END, f"\n📂 {category.replace('_', ' ').title()}:\n")
-                        for file_info in file_list[:10]:  # Show first 10 files per category
+                        for file_info in largest:
                             path = file_info['path']
                             size_kb = file_info['size'] / 1024
                             age = file_info['age_days']
                             self.output.insert(tk.END, f"   • {os.path.basename(path)} ({size_kb:.1f} KB, {age} days old)\n")
                         
-                        if len(file_list) > 10:
-                            self.output.insert(tk.END, f"   ... and {len(file_list) - 10} more files\n")
+                        category_files = data.get('files', len(largest))
+                        if category_files > len(largest):
+                            self.output.insert(tk.END, f"   ... and {category_files - len(largest):,} smaller files\n")
                 
                 self.output.insert(tk.END, f"\n{'='*60}\n")
             
@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from quickercleaner.scan_index import RACY_WINDOW_SECONDS
+
+HashKey = Tuple[int, int, int, int]
+
+def _as_int64(value: int) -> Optional[int]:
+    """value as the signed 64-bit integer SQLite stores, or None if it needs more bits
+
+    Unsigned 64-bit values (NTFS file ids with a high sequence number) wrap
+    around to negative ones, which keeps them distinct.
+    """
+    if value < 1 << 63:
+        return value
+    if value < 1 << 64:
+        return value - (1 << 64)
+    return None
+
+def hash_key(st: os.stat_result) -> Optional[HashKey]:
+    """(st_dev, st_ino, st_size, st_mtime_ns), or None if the file cannot be cached
+
+    That is when the stat has no inode, or when the device or inode needs
+    more than 64 bits (ReFS 128-bit file ids).
+    """
+    if not st.st_ino:
+        return None
+    dev, ino = _as_int64(st.st_dev), _as_int64(st.st_ino)
+    if dev is None or ino is None:
+        return None
+    return (dev, ino, st.st_size, st.st_mtime_ns)
+
+class HashCache:
+    """Persistent partial and full content digests keyed by file identity
+
+    A file keeps its device, inode, size and mtime_ns for as long as its
+    content is unchanged, so a cached digest can be reused after just the stat
+    the walk already made. Files modified within RACY_WINDOW_SECONDS are not
+    cached, since a further write in the same mtime tick would go unnoticed.
+
+    scheme names the digest algorithm and partial-hash layout; a cache written
+    under a different scheme is discarded. Entries unused for max_age_days
+    are dropped on commit, then the least recently used ones until at most
+    max_entries remain.
+    """
+    def __init__(self, path: str, scheme: str, max_entries: int = 1000000, max_age_days: int = 90):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Digests computed this run, written on commit
+        self._pending: Dict[HashKey, List] = {}
+        self._used: List[Tuple[float, int, int, int, int]] = []
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'scheme'").fetchone()
+        if row is None or row[0] != scheme:
+            self._conn.execute("DROP TABLE IF EXISTS hashes")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scheme', ?)", (scheme,))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " dev INTEGER NOT NULL,"
+            " ino INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " partial TEXT,"
+            " full TEXT,"
+            " used REAL NOT NULL,"
+            " PRIMARY KEY (dev, ino, size, mtime_ns))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS hashes_used ON hashes (used)")
+        self._conn.commit()
+
+    def get(self, key: HashKey) -> Tuple[Optional[str], Optional[str]]:
+        """Cached (partial, full) digests for a file; either may be None"""
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending[0], pending[1]
+            row = self._conn.execute(
+                "SELECT partial, full FROM hashes WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+                key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None, None
+            self.hits += 1
+            self._used.append((time.time(),) + key)
+            return row[0], row[1]
+
+    def put(self, key: HashKey, partial: Optional[str] = None, full: Optional[str] = None):
+        """Remember a digest for a file; the other digest, if cached, is kept"""
+        now = time.time()
+        if now - key[3] / 1e9 < RACY_WINDOW_SECONDS:
+            return
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT partial, full FROM hashes WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+                    key
+                ).fetchone()
+                entry = self._pending[key] = list(row) if row is not None else [None, None]
+            if partial is not None:
+                entry[0] = partial
+            if full is not None:
+                entry[1] = full
+
+    def commit(self):
+        """Write new digests and usage times, then apply age and size eviction"""
+        now = time.time()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            used, self._used = self._used, []
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hashes (dev, ino, size, mtime_ns, partial, full, used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [key + (partial, full, now) for key, (partial, full) in pending.items()]
+            )
+            self._conn.executemany(
+                "UPDATE hashes SET used = ? WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+                used
+            )
+            self._conn.execute("DELETE FROM hashes WHERE used < ?", (now - self.max_age_days * 24 * 3600,))
+            count = self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM hashes WHERE rowid IN (SELECT rowid FROM hashes ORDER BY used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def close(self):
+        self.commit()
+        self._conn.close()
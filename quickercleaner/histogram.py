@@ -0,0 +1,53 @@
+from typing import Dict, List
+
+class LogHistogram:
+    """File counts and bytes in power-of-two buckets of some integer value
+
+    Bucket 0 holds the value 0 and bucket b holds values in [2**(b-1), 2**b),
+    so adding a file is one bit_length() and two list increments, and a whole
+    drive fits in a few dozen buckets whatever the number of files.
+    """
+    __slots__ = ('files', 'bytes')
+
+    def __init__(self):
+        self.files: List[int] = []
+        self.bytes: List[int] = []
+
+    def add(self, value: int, size: int):
+        bucket = value.bit_length() if value > 0 else 0
+        if bucket >= len(self.files):
+            grow = bucket + 1 - len(self.files)
+            self.files.extend([0] * grow)
+            self.bytes.extend([0] * grow)
+        self.files[bucket] += 1
+        self.bytes[bucket] += size
+
+    def merge(self, other: 'LogHistogram'):
+        for bucket, (files, size) in enumerate(zip(other.files, other.bytes)):
+            if files:
+                if bucket >= len(self.files):
+                    grow = bucket + 1 - len(self.files)
+                    self.files.extend([0] * grow)
+                    self.bytes.extend([0] * grow)
+                self.files[bucket] += files
+                self.bytes[bucket] += size
+
+    def buckets(self) -> List[Dict[str, int]]:
+        """Non-empty buckets as {'low', 'high', 'files', 'bytes'}, high exclusive"""
+        return [
+            {
+                'low': 1 << (bucket - 1) if bucket else 0,
+                'high': 1 << bucket,
+                'files': files,
+                'bytes': self.bytes[bucket],
+            }
+            for bucket, files in enumerate(self.files)
+            if files
+        ]
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.0f} TB"
@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# (path, size, cleanup category), as handed to DeleterPool.submit
+JournalEntry = Tuple[str, int, str]
+
+class JournalState:
+    """The unfinished work of an interrupted cleanup, read back from its journal
+
+    pending holds the batches that were handed to the deleters but never
+    reported done, by sequence number; frontier the directories (with their
+    category) found by the walk but never listed. When walked is set the
+    walk itself had finished and only pending is left.
+    """
+    def __init__(self, drive: str, started: float, roots: List[Tuple[str, str]]):
+        self.drive = drive
+        self.started = started
+        self.roots = roots
+        self.walked = False
+        self.finished = False
+        self.pending: Dict[int, List[JournalEntry]] = {}
+        self.next_seq = 0
+        # Totals over all the runs recorded so far
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        # dirpath → category of every directory seen but not yet listed
+        self._unlisted: Dict[str, str] = dict((path, category) for category, path in roots)
+
+    @property
+    def frontier(self) -> List[Tuple[str, str]]:
+        """(category, dirpath) roots that walk exactly the part of the tree not yet listed"""
+        return [(category, path) for path, category in self._unlisted.items()]
+
+class CleanupJournal:
+    """Append-only write-ahead log of a clean_drive run
+
+    One compact JSON array per line:
+
+    - ["begin", {drive, started, roots, resumed}] starts a run, or continues
+      the previous one when resumed is true
+    - ["intent", seq, [[path, size, category], ...]] is written before a
+      batch is handed to the deleters, ["done", seq, files, bytes,
+      [[path, error], ...]] once it has been removed (failures listed), and
+      ["skip", seq, [path, ...]] for files a resumed run found changed
+    - ["dir", dirpath, [subdir names]] marks a directory whose candidates
+      are all in earlier intent records; together they are the walk cursor
+    - ["walked"] once the walk is over and ["end", {...}] when the run
+      finished, so a journal without an end belongs to an unfinished run
+
+    intent and done records reach the OS before the call returns, so killing
+    the process loses at most buffered dir records; fsync runs at most every
+    fsync_seconds, bounding what a power failure can lose. Records are
+    written in order, and a line cut short by a crash is ignored when reading
+    back (begin() ends it first), so the file always describes a consistent
+    prefix of each run. Together
+    the records are also a complete audit of what was removed.
+    """
+    def __init__(self, path: str, fsync_seconds: float = 1.0):
+        self.path = path
+        self.fsync_seconds = fsync_seconds
+        self._file = None
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        # dir records waiting for the intents of their files: (candidates yielded before, record)
+        self._pending_dirs: List[Tuple[int, str]] = []
+        self._intended = 0
+
+    def unfinished(self) -> Optional[JournalState]:
+        """State of the last run in the journal if it did not finish, otherwise None"""
+        if not os.path.exists(self.path):
+            return None
+        state: Optional[JournalState] = None
+        with open(self.path, 'r', encoding='ascii') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The tail of a run that died mid-write; begin() ended
+                    # the line, so a resumed run may follow
+                    continue
+                op = record[0]
+                if state is None and op != 'begin':
+                    continue
+                if op == 'intent':
+                    state.pending[record[1]] = [tuple(entry) for entry in record[2]]
+                    state.next_seq = max(state.next_seq, record[1] + 1)
+                elif op == 'done':
+                    state.pending.pop(record[1], None)
+                    state.files += record[2]
+                    state.bytes += record[3]
+                    state.failed += len(record[4])
+                elif op == 'dir':
+                    category = state._unlisted.pop(record[1], None)
+                    if category is not None:
+                        for name in record[2]:
+                            state._unlisted[os.path.join(record[1], name)] = category
+                elif op == 'skip':
+                    entries = state.pending.get(record[1])
+                    if entries is not None:
+                        skipped = set(record[2])
+                        state.pending[record[1]] = [entry for entry in entries if entry[0] not in skipped]
+                elif op == 'begin':
+                    info = record[1]
+                    if not info['resumed'] or state is None:
+                        state = JournalState(info['drive'], info['started'], [tuple(root) for root in info['roots']])
+                elif op == 'walked':
+                    state.walked = True
+                    state._unlisted.clear()
+                elif op == 'end':
+                    state.finished = True
+        if state is None or state.finished:
+            return None
+        return state
+
+    def begin(self, drive: str, roots: List[Tuple[str, str]], resumed: Optional[JournalState] = None):
+        """Open the journal for appending and record the start of a run or of its resumption"""
+        self._file = open(self.path, 'a', encoding='ascii')
+        if self._file.tell() and not self._ends_with_newline():
+            # Keep a record cut short by a crash from running into ours
+            self._file.write('\n')
+        self._pending_dirs = []
+        self._intended = 0
+        started = resumed.started if resumed is not None else time.time()
+        self._write(['begin', {'drive': drive, 'started': started, 'roots': roots, 'resumed': resumed is not None}], True)
+
+    def intent(self, seq: int, chunk: List[JournalEntry]):
+        """Record a batch about to be removed; dir records it completes follow it"""
+        records = [self._encode(['intent', seq, chunk])]
+        with self._lock:
+            self._intended += len(chunk)
+            ready = 0
+            while ready < len(self._pending_dirs) and self._pending_dirs[ready][0] <= self._intended:
+                ready += 1
+            records.extend(record for yielded, record in self._pending_dirs[:ready])
+            del self._pending_dirs[:ready]
+            self._write_locked(records, True)
+
+    def listed(self, dirpath: str, subdirs: List[str], yielded: int):
+        """Record a listed directory once the first yielded candidates of the walk are intended
+
+        yielded counts every candidate the walk had produced up to and
+        including this directory's; the record is held back until that many
+        have been written as intents, since a resumed walk will not list the
+        directory again.
+        """
+        record = self._encode(['dir', dirpath, [os.path.basename(d) for d in subdirs]])
+        with self._lock:
+            if yielded <= self._intended and not self._pending_dirs:
+                self._write_locked([record], False)
+            else:
+                self._pending_dirs.append((yielded, record))
+
+    def done(self, seq: int, files: int, size: int, failures: List[Tuple[str, str]]):
+        self._write(['done', seq, files, size, failures], True)
+
+    def skipped(self, seq: int, paths: List[str]):
+        self._write(['skip', seq, paths], True)
+
+    def walked(self):
+        """The walk is over: every candidate is in an intent record"""
+        with self._lock:
+            self._pending_dirs = []
+        self._write(['walked'], True)
+
+    def end(self, files: int, size: int, errors: int):
+        self._write(['end', {'finished': time.time(), 'files': files, 'bytes': size, 'errors': errors}], True)
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    @staticmethod
+    def _encode(record: List) -> str:
+        # ASCII-only, so undecodable file names round-trip as escaped surrogates
+        return json.dumps(record, separators=(',', ':')) + '\n'
+
+    def _write(self, record: List, flush: bool):
+        line = self._encode(record)
+        with self._lock:
+            self._write_locked([line], flush)
+
+    def _write_locked(self, lines: List[str], flush: bool):
+        self._file.write(''.join(lines))
+        if not flush:
+            return
+        self._file.flush()
+        now = time.monotonic()
+        if now - self._last_sync >= self.fsync_seconds:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
@@ -1,7 +1,9 @@
 import argparse
-import logging
+import contextlib
 import sys
 import os
+import time
+from typing import TYPE_CHECKING, Dict, Optional
 
 # Ensure running from project root for relative imports
 if __name__ == "__main__":
@@ -9,48 +11,262 @@ if __name__ == "__main__":
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
     try:
-        from quickercleaner.cleaner import DiskCleaner
-        from quickercleaner.config import Config
+        from quickercleaner.metrics import METRICS_FORMATS
+        from quickercleaner.report import REPORT_FORMATS
     except ImportError as e:
         print("[ERROR] Could not import QuickerCleaner modules. Please run this script from the project root directory (where README.md is located).\nDetails:", e)
         sys.exit(1)
 else:
+    from quickercleaner.metrics import METRICS_FORMATS
+    from quickercleaner.report import REPORT_FORMATS
+
+# The engine is imported once the arguments are known to be valid, and each
+# command imports what it needs, so --help and usage errors return at once
+if TYPE_CHECKING:
     from quickercleaner.cleaner import DiskCleaner
-    from quickercleaner.config import Config
+    from quickercleaner.report import ReportWriter
+
+def run_command(cleaner: 'DiskCleaner', args: argparse.Namespace, report: Optional['ReportWriter'] = None) -> Dict:
+    """Run the --scan, --du or --clean operation, print its results and return its metrics
+
+    Per-file records of --scan and --clean are streamed to report, ending
+    with the metrics as its summary.
+    """
+    from quickercleaner.histogram import format_bytes
+    from quickercleaner.metrics import cleanup_metrics, scan_metrics, write_atomic
+    if args.du:
+        import json
+        from quickercleaner.dirtree import DirTree
+        tree = DirTree(args.du)
+        started = time.perf_counter()
+        total_size, total_files = cleaner.scan_path(args.du, tree)
+        duration = time.perf_counter() - started
+        print(f"Disk usage of {args.du}: {total_files} files, {total_size/1024/1024:.2f} MB in {len(tree)} directories")
+        for node in tree.heaviest(args.top):
+            print(f"  {format_bytes(node['size']):>7} {node['files']:>9} files  {node['path']}")
+        if args.treemap:
+            write_atomic(args.treemap, json.dumps(tree.to_treemap()) + '\n')
+            print(f"Treemap written to {args.treemap}")
+        results = {'drive': args.du, 'categories': {}, 'total_size': total_size, 'total_files': total_files,
+                   'duration_seconds': duration}
+        return scan_metrics(results, cleaner.counters)
+    elif args.scan:
+        results = cleaner.scan_drive(args.scan, duplicates=args.duplicates, top_k=args.top, report=report)
+        print(f"Scan Results for {args.scan}:")
+        for cat, data in results['categories'].items():
+            print(f"  {cat}: {data['files']} files, {data['size']/1024/1024:.2f} MB")
+            if args.verbose:
+                for bucket in data['size_histogram']:
+                    print(f"    {format_bytes(bucket['low']):>7} - {format_bytes(bucket['high']):<7} "
+                          f"{bucket['files']:>8} files {bucket['bytes']/1024/1024:>10.2f} MB")
+                for bucket in data['age_histogram']:
+                    print(f"    {bucket['low']:>5} - {bucket['high']:<5} days "
+                          f"{bucket['files']:>8} files {bucket['bytes']/1024/1024:>10.2f} MB")
+        print(f"Total: {results['total_files']} files, {results['total_size']/1024/1024:.2f} MB")
+        if results['largest']:
+            print(f"Largest {len(results['largest'])} files:")
+            for record in results['largest']:
+                print(f"  {format_bytes(record.size):>7}  {record.path}")
+            print(f"Oldest {len(results['oldest'])} files:")
+            for record in results['oldest']:
+                print(f"  {record.age_days:>5} days  {record.path}")
+        duplicates = results['categories'].get('duplicates')
+        if duplicates:
+            print(f"Duplicates: {len(duplicates['groups'])} groups, {duplicates['size']/1024/1024:.2f} MB in redundant copies "
+                  f"({duplicates['bytes_hashed']/1024/1024:.2f} MB read to confirm)")
+            for group in duplicates['groups'][:10 if args.verbose else 3]:
+                paths = group.paths()
+                print(f"  {group.wasted/1024/1024:.2f} MB: {paths[0]} (+{len(paths) - 1} copies)")
+        metrics = scan_metrics(results, cleaner.counters)
+    else:
+        journal, resume = None, None
+        journal_file = args.journal or cleaner.config.journal_file
+        if journal_file and not cleaner.dry_run:
+            from quickercleaner.journal import CleanupJournal
+            journal = CleanupJournal(journal_file, cleaner.config.journal_fsync_seconds)
+            if args.resume:
+                resume = journal.unfinished()
+                if resume is None:
+                    print(f"No unfinished cleanup in {journal_file}; starting a new one")
+                else:
+                    print(f"Resuming the cleanup of {resume.drive} started {time.ctime(resume.started)}: "
+                          f"{resume.files} files already removed, {len(resume.pending)} batches to retry, "
+                          f"{'walk complete' if resume.walked else f'{len(resume.frontier)} directories left to walk'}")
+        result = cleaner.clean_drive(args.clean, report=report, journal=journal, resume=resume)
+        print(f"Cleaned {result.files_processed} files, freed {result.space_freed_bytes/1024/1024:.2f} MB in {result.duration_seconds:.2f}s")
+        if args.verbose:
+            for stage, data in result.stages.items():
+                print(f"  {stage}: {data['items']} files at {data['items_per_second']:.0f}/s, "
+                      f"blocked {data['blocked_seconds']:.2f}s, starved {data['starved_seconds']:.2f}s")
+        if result.errors:
+            print("Errors:")
+            for e in result.errors:
+                print(f"  {e}")
+        metrics = cleanup_metrics(args.clean, result, cleaner.counters)
+    if report is not None:
+        report.write_summary(metrics)
+        print(f"Report: {report.records} records written to {args.output}")
+    return metrics
+
+def run_watch(cleaner: 'DiskCleaner', args: argparse.Namespace):
+    """Run the --watch daemon until interrupted, writing metrics after every cleanup"""
+    from quickercleaner.metrics import cleanup_metrics, write_metrics
+    from quickercleaner.watch import WatchDaemon
+    config = cleaner.config
+    clean_interval = args.clean_every if args.clean_every is not None else config.watch_clean_interval
+    above_mb = args.clean_above_mb if args.clean_above_mb is not None else config.watch_clean_above_mb
+    above_files = args.clean_above_files if args.clean_above_files is not None else config.watch_clean_above_files
+
+    def cleaned(result):
+        if args.metrics:
+            write_metrics(args.metrics, cleanup_metrics(args.watch, result, cleaner.counters), args.metrics_format)
+
+    daemon = WatchDaemon(cleaner, args.watch, config.watch_poll_seconds, clean_interval,
+                         int(above_mb * 1024 * 1024), above_files, config.watch_backend, cleaned)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    status = daemon.reclaimable()
+    print(f"Stopped after {daemon.cleanups} cleanups; {status['total_files']} files, "
+          f"{status['total_size']/1024/1024:.2f} MB reclaimable")
+
+def print_counters(cleaner: 'DiskCleaner'):
+    rows = cleaner.counters.summary_rows()
+    width = max(len(label) for label, value in rows)
+    print("\nCounters:")
+    for label, value in rows:
+        print(f"  {label:<{width}}  {value:>16}")
 
 def main():
     parser = argparse.ArgumentParser(description="QuickerCleaner - Elite Windows Disk Cleanup Tool by Tony Technologies LLC")
     parser.add_argument('--scan', metavar='DRIVE', help='Scan drive for cleanup opportunities')
     parser.add_argument('--clean', metavar='DRIVE', help='Clean specified drive')
+    parser.add_argument('--watch', metavar='DRIVE', help='Keep watching the cleanup targets and clean on a schedule or threshold')
+    parser.add_argument('--clean-every', metavar='SECONDS', type=float,
+                        help='With --watch, clean every SECONDS (default QUICK_CLEANER_WATCH_CLEAN_INTERVAL)')
+    parser.add_argument('--clean-above-mb', metavar='MB', type=float,
+                        help='With --watch, clean once MB are reclaimable (default QUICK_CLEANER_WATCH_CLEAN_ABOVE_MB)')
+    parser.add_argument('--clean-above-files', metavar='N', type=int,
+                        help='With --watch, clean once N files are reclaimable (default QUICK_CLEANER_WATCH_CLEAN_ABOVE_FILES)')
+    parser.add_argument('--du', metavar='PATH', help='Show the directories below PATH holding the most data')
+    parser.add_argument('--treemap', metavar='FILE', help='With --du, write the directory tree as nested JSON for a treemap')
     parser.add_argument('--dry-run', action='store_true', help='Preview only, do not delete files')
+    parser.add_argument('--journal', metavar='FILE',
+                        help='With --clean, log every batch to FILE so the run can be resumed (default QUICK_CLEANER_JOURNAL_FILE)')
+    parser.add_argument('--resume', action='store_true',
+                        help='With --clean, continue the unfinished cleanup recorded in the journal, if there is one')
+    parser.add_argument('--max-scan-ops', metavar='N', type=float,
+                        help='Limit directory listings plus file stats to N per second (default QUICK_CLEANER_MAX_SCAN_OPS, 0 = unlimited)')
+    parser.add_argument('--max-remove-ops', metavar='N', type=float,
+                        help='Limit removals to N files per second (default QUICK_CLEANER_MAX_REMOVE_OPS, 0 = unlimited)')
+    parser.add_argument('--max-remove-mb', metavar='MB', type=float,
+                        help='Limit removals to MB per second (default QUICK_CLEANER_MAX_REMOVE_MB, 0 = unlimited)')
+    parser.add_argument('--throttle-file', metavar='FILE',
+                        help='Apply the QUICK_CLEANER_MAX_* limits in FILE whenever it changes, to adjust a running operation')
+    parser.add_argument('--idle-io', action='store_true',
+                        help='Run at idle I/O priority (default QUICK_CLEANER_IDLE_IO)')
     parser.add_argument('--min-age', type=int, default=365, help='Minimum file age in days')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    parser.add_argument('--duplicates', action='store_true', help='With --scan, also find byte-identical files of any age')
+    parser.add_argument('--top', metavar='N', type=int, default=10,
+                        help='With --scan, list the N largest and N oldest candidates; with --du, the N heaviest directories (0 to skip)')
+    parser.add_argument('--profile', metavar='FILE', nargs='?', const='quicker_cleaner.prof',
+                        help='Run under cProfile and write the stats to FILE (default quicker_cleaner.prof)')
+    parser.add_argument('--metrics', metavar='FILE', help='Write run metrics to FILE, replacing it atomically')
+    parser.add_argument('--metrics-format', choices=METRICS_FORMATS,
+                        help='Metrics file format (default: prometheus for *.prom, otherwise json)')
+    parser.add_argument('--output', metavar='PATH',
+                        help='With --scan or --clean, stream a record per file and a closing summary to PATH '
+                             '(gzip compressed for *.gz, - for stdout)')
+    parser.add_argument('--format', choices=REPORT_FORMATS,
+                        help='Format of --output (default: csv for *.csv and *.csv.gz, otherwise ndjson)')
     args = parser.parse_args()
 
-    config = Config()
+    if not (args.scan or args.du or args.clean or args.watch):
+        parser.print_help()
+        return
+    if args.duplicates and not args.scan:
+        parser.error('--duplicates requires --scan')
+    watch_options = (args.clean_every, args.clean_above_mb, args.clean_above_files)
+    if not args.watch and any(option is not None for option in watch_options):
+        parser.error('--clean-every, --clean-above-mb and --clean-above-files require --watch')
+    if args.treemap and not args.du:
+        parser.error('--treemap requires --du')
+    if args.top < 0:
+        parser.error('--top must not be negative')
+    if args.output and not (args.scan or args.clean):
+        parser.error('--output requires --scan or --clean')
+    if args.format and not args.output:
+        parser.error('--format requires --output')
+    if (args.journal or args.resume) and not args.clean:
+        parser.error('--journal and --resume require --clean')
+    if (args.journal or args.resume) and args.dry_run:
+        parser.error('--journal and --resume cannot be combined with --dry-run')
+    limits = (args.max_scan_ops, args.max_remove_ops, args.max_remove_mb)
+    if any(limit is not None and limit < 0 for limit in limits):
+        parser.error('--max-scan-ops, --max-remove-ops and --max-remove-mb must not be negative')
+
+    import logging
+    from quickercleaner.cleaner import DiskCleaner
+    from quickercleaner.config import Config
+    config = Config.default()
     if args.dry_run:
         config.dry_run = True
-    cleaner = DiskCleaner(config)
+    if args.resume and not (args.journal or config.journal_file):
+        parser.error('--resume requires --journal or QUICK_CLEANER_JOURNAL_FILE')
+    if args.max_scan_ops is not None:
+        config.max_scan_ops = args.max_scan_ops
+    if args.max_remove_ops is not None:
+        config.max_remove_ops = args.max_remove_ops
+    if args.max_remove_mb is not None:
+        config.max_remove_mb = args.max_remove_mb
     if args.verbose:
         logging.basicConfig(level=logging.DEBUG)
     else:
         logging.basicConfig(level=logging.INFO)
+    if args.idle_io or config.idle_io:
+        from quickercleaner.throttle import set_idle_io_priority
+        # Before any worker thread starts, so they all inherit it
+        if not set_idle_io_priority():
+            print("Idle I/O priority is not supported here; running at normal priority", file=sys.stderr)
+    cleaner = DiskCleaner(config)
+    if args.throttle_file:
+        from quickercleaner.throttle import LimitsFileWatcher
+        LimitsFileWatcher(cleaner.throttle, args.throttle_file).start()
 
-    if args.scan:
-        results = cleaner.scan_drive(args.scan)
-        print(f"Scan Results for {args.scan}:")
-        for cat, data in results['categories'].items():
-            print(f"  {cat}: {data['files']} files, {data['size']/1024/1024:.2f} MB")
-        print(f"Total: {results['total_files']} files, {results['total_size']/1024/1024:.2f} MB")
-    elif args.clean:
-        result = cleaner.clean_drive(args.clean)
-        print(f"Cleaned {result.files_processed} files, freed {result.space_freed_bytes/1024/1024:.2f} MB in {result.duration_seconds:.2f}s")
-        if result.errors:
-            print("Errors:")
-            for e in result.errors:
-                print(f"  {e}")
-    else:
-        parser.print_help()
+    if args.watch:
+        run_watch(cleaner, args)
+        if args.verbose:
+            print_counters(cleaner)
+        return
+
+    report = None
+    if args.output:
+        from quickercleaner.report import ReportWriter
+        report = ReportWriter(args.output, args.format)
+    # With the report on stdout, everything else goes to stderr
+    console = contextlib.redirect_stdout(sys.stderr) if args.output == '-' else contextlib.nullcontext()
+    try:
+        with console:
+            if args.profile:
+                import cProfile
+                import pstats
+                profiler = cProfile.Profile()
+                metrics = profiler.runcall(run_command, cleaner, args, report)
+                profiler.dump_stats(args.profile)
+                print(f"\nProfile written to {args.profile}; top functions by cumulative time:")
+                pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+            else:
+                metrics = run_command(cleaner, args, report)
+            if args.profile or args.verbose:
+                print_counters(cleaner)
+    finally:
+        if report is not None:
+            report.close()
+    if args.metrics:
+        from quickercleaner.metrics import write_metrics
+        write_metrics(args.metrics, metrics, args.metrics_format)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,130 @@
+import os
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+# Only annotations; main imports METRICS_FORMATS before parsing arguments
+if TYPE_CHECKING:
+    from quickercleaner.counters import RunCounters
+
+METRICS_FORMATS = ('json', 'prometheus')
+
+def _document(operation: str, drive: str, files: int, size: int, duration: float, cancelled: bool,
+              categories: Dict[str, Dict[str, int]], error_counts: Dict[str, int],
+              counters: Optional['RunCounters']) -> Dict:
+    walk = counters.as_dict() if counters is not None else {}
+    return {
+        'operation': operation,
+        'drive': drive,
+        'timestamp': time.time(),
+        'cancelled': cancelled,
+        'duration_seconds': duration,
+        'files': files,
+        'bytes': size,
+        'files_per_second': files / duration if duration > 0 else 0.0,
+        'bytes_per_second': size / duration if duration > 0 else 0.0,
+        'categories': categories,
+        'phase_seconds': walk.get('phase_seconds', {}),
+        'errors': {
+            'total': sum(error_counts.values()),
+            'by_errno': error_counts,
+            # OSErrors the walk skipped over rather than reported
+            'skipped_by_errno': walk.get('error_counts', {}),
+        },
+        'walk': {key: value for key, value in walk.items() if key not in ('phase_seconds', 'error_counts')},
+    }
+
+def scan_metrics(results: Dict, counters: Optional['RunCounters'] = None) -> Dict:
+    """Metrics document for the results of DiskCleaner.scan_drive"""
+    categories = {
+        category: {'files': data['files'], 'bytes': data['size']}
+        for category, data in results['categories'].items()
+    }
+    return _document('scan', results['drive'], results['total_files'], results['total_size'],
+                     results.get('duration_seconds', 0.0), results.get('cancelled', False),
+                     categories, results.get('error_counts', {}), counters)
+
+def cleanup_metrics(drive: str, result, counters: Optional['RunCounters'] = None) -> Dict:
+    """Metrics document for a CleanupResult; stage throughput is included as well"""
+    doc = _document('clean', drive, result.files_processed, result.space_freed_bytes,
+                    result.duration_seconds, result.cancelled, result.categories, result.error_counts, counters)
+    doc['files_skipped'] = result.files_skipped
+    doc['stages'] = result.stages
+    return doc
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels: Dict[str, str]) -> str:
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+def to_prometheus(doc: Dict) -> str:
+    """Render a metrics document in the node-exporter textfile format"""
+    base = {'operation': doc['operation'], 'drive': doc['drive']}
+    lines: List[str] = []
+
+    def metric(name: str, help_text: str, samples: List):
+        lines.append(f"# HELP quickercleaner_{name} {help_text}")
+        lines.append(f"# TYPE quickercleaner_{name} gauge")
+        for extra, value in samples:
+            lines.append(f"quickercleaner_{name}{{{_labels(dict(base, **extra))}}} {value}")
+
+    metric('last_run_timestamp_seconds', 'Unix time the run finished', [({}, doc['timestamp'])])
+    metric('duration_seconds', 'Wall time of the run', [({}, doc['duration_seconds'])])
+    metric('cancelled', '1 if the run was stopped early', [({}, int(doc['cancelled']))])
+    metric('files', 'Files found (scan) or removed (clean)', [({}, doc['files'])])
+    metric('bytes', 'Bytes found (scan) or freed (clean)', [({}, doc['bytes'])])
+    metric('files_per_second', 'Files per second over the whole run', [({}, doc['files_per_second'])])
+    metric('bytes_per_second', 'Bytes per second over the whole run', [({}, doc['bytes_per_second'])])
+    metric('category_files', 'Files per cleanup category',
+           [({'category': c}, data['files']) for c, data in doc['categories'].items()])
+    metric('category_bytes', 'Bytes per cleanup category',
+           [({'category': c}, data['bytes']) for c, data in doc['categories'].items()])
+    metric('phase_seconds', 'Time spent per phase',
+           [({'phase': p}, seconds) for p, seconds in doc['phase_seconds'].items()])
+    metric('errors', 'Failures reported for the run, by errno',
+           [({'errno': e}, count) for e, count in doc['errors']['by_errno'].items()])
+    metric('skipped_errors', 'Errors the walk skipped over, by errno',
+           [({'errno': e}, count) for e, count in doc['errors']['skipped_by_errno'].items()])
+    metric('walk', 'Traversal counters',
+           [({'counter': c}, value) for c, value in doc['walk'].items()])
+    if 'stages' in doc:
+        metric('stage_items_per_second', 'Throughput of each cleanup pipeline stage',
+               [({'stage': s}, data['items_per_second']) for s, data in doc['stages'].items()])
+    return '\n'.join(lines) + '\n'
+
+def write_atomic(path: str, text: str):
+    """Write text so readers see either the old file or the complete new one
+
+    The data goes to a temporary file in the same directory, is fsynced, and
+    then renamed over path, which is atomic on both POSIX and Windows.
+    """
+    import tempfile
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file 0600; collectors usually run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def write_metrics(path: str, doc: Dict, fmt: Optional[str] = None):
+    """Write a metrics document as JSON or Prometheus text (from a .prom suffix by default)"""
+    if fmt is None:
+        fmt = 'prometheus' if path.endswith('.prom') else 'json'
+    if fmt not in METRICS_FORMATS:
+        raise ValueError(f"Unknown metrics format {fmt!r}, expected one of {METRICS_FORMATS}")
+    if fmt == 'prometheus':
+        text = to_prometheus(doc)
+    else:
+        import json
+        text = json.dumps(doc, indent=2) + '\n'
+    write_atomic(path, text)
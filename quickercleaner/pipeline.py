@@ -0,0 +1,73 @@
+import queue
+import threading
+import time
+from typing import Dict
+
+class StageStats:
+    """Throughput and backpressure counters for one pipeline stage
+
+    blocked_seconds is time spent waiting for room in the downstream queue (the
+    next stage is the bottleneck); starved_seconds is time spent waiting for
+    input (the previous stage is the bottleneck).
+    """
+    __slots__ = ('name', 'items', 'bytes', 'blocked_seconds', 'starved_seconds')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.bytes = 0
+        self.blocked_seconds = 0.0
+        self.starved_seconds = 0.0
+
+    def as_dict(self, elapsed: float) -> Dict:
+        return {
+            'items': self.items,
+            'bytes': self.bytes,
+            'items_per_second': self.items / elapsed if elapsed > 0 else 0.0,
+            'blocked_seconds': round(self.blocked_seconds, 6),
+            'starved_seconds': round(self.starved_seconds, 6),
+        }
+
+class StageQueue:
+    """Bounded hand-off between two stages that records time spent waiting
+
+    put() gives up once stopped is set, so a producer never hangs on a consumer
+    that has gone away.
+    """
+    def __init__(self, maxsize: int, producer: StageStats, consumer: StageStats, stopped: threading.Event):
+        self._queue: 'queue.Queue' = queue.Queue(maxsize)
+        self.producer = producer
+        self.consumer = consumer
+        self.stopped = stopped
+
+    def put(self, item) -> bool:
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        waited = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                try:
+                    self._queue.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.producer.blocked_seconds += time.perf_counter() - waited
+
+    def put_final(self, item):
+        """Queue an end-of-stream marker, waiting for room regardless of stop"""
+        self._queue.put(item)
+
+    def get(self):
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        waited = time.perf_counter()
+        item = self._queue.get()
+        self.consumer.starved_seconds += time.perf_counter() - waited
+        return item
@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+class CancellationToken(threading.Event):
+    """Set from another thread (e.g. the GUI's STOP button) to stop a running scan or cleanup
+
+    Walkers check it once per directory and the cleanup pipeline once per file
+    and per batch, so a stop takes effect almost immediately and the caller gets
+    back a partial result.
+
+    A token made with a parent also reads as set once the parent is, while
+    setting it leaves the parent alone; a run stops itself through one
+    without cancelling its caller. Only is_set() follows the parent, which
+    is all the stages poll.
+    """
+    def __init__(self, parent: Optional[threading.Event] = None):
+        super().__init__()
+        self.parent = parent
+
+    def is_set(self) -> bool:
+        return super().is_set() or (self.parent is not None and self.parent.is_set())
+
+    def cancel(self):
+        self.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.is_set()
+
+class ProgressReporter:
+    """Accumulates progress counters and forwards them to a callback at a bounded rate
+
+    update() may be called from any thread and as often as convenient; the
+    callback receives at most max_rate events per second, plus one final event
+    from finish(). Events are dicts with phase, files, bytes, dirs and path.
+    """
+    def __init__(self, callback: Callable[[Dict], None], phase: str, max_rate: float = 20.0):
+        self.callback = callback
+        self.phase = phase
+        self.files = 0
+        self.bytes = 0
+        self.dirs = 0
+        self.path: Optional[str] = None
+        self._interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._next_emit = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, files: int = 0, bytes: int = 0, dirs: int = 0, path: Optional[str] = None):
+        with self._lock:
+            self.files += files
+            self.bytes += bytes
+            self.dirs += dirs
+            if path is not None:
+                self.path = path
+            now = time.perf_counter()
+            if now < self._next_emit:
+                return
+            self._next_emit = now + self._interval
+            event = self._event(False)
+        self.callback(event)
+
+    def finish(self, cancelled: bool = False):
+        with self._lock:
+            event = self._event(True)
+            event['cancelled'] = cancelled
+        self.callback(event)
+
+    def _event(self, done: bool) -> Dict:
+        return {
+            'phase': self.phase,
+            'files': self.files,
+            'bytes': self.bytes,
+            'dirs': self.dirs,
+            'path': self.path,
+            'done': done,
+        }
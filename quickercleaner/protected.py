@@ -0,0 +1,65 @@
+import os
+from typing import Dict, Iterable, List, Optional
+
+class ProtectedNode:
+    """One path component in a ProtectedPathTrie"""
+    __slots__ = ('children', 'protected')
+
+    def __init__(self):
+        self.children: Dict[str, 'ProtectedNode'] = {}
+        self.protected = False
+
+    def child(self, name: str) -> Optional['ProtectedNode']:
+        """Node for an entry of this directory, or None if nothing below it is protected"""
+        return self.children.get(os.path.normcase(name))
+
+def path_components(path: str) -> List[str]:
+    """Split a path into normalised components, anchored at its drive or root"""
+    path = os.path.normcase(os.path.abspath(path))
+    drive, rest = os.path.splitdrive(path)
+    return [drive or os.sep] + [part for part in rest.split(os.sep) if part]
+
+class ProtectedPathTrie:
+    """Protected paths normalised once into a component-wise prefix trie
+
+    Lookups walk one node per path component, so they cost O(depth) however
+    many paths are protected, and match whole components only: protecting
+    C:\\Temp does not protect C:\\Temp2. Walkers keep the node of the directory
+    they are listing, which lets them drop protected entries by name and skip
+    all checks in subtrees with nothing protected below them. A path that
+    goes through a symlink is protected under its resolved form too, since
+    walks start from resolved roots.
+    """
+    def __init__(self, paths: Iterable[str]):
+        self.root = ProtectedNode()
+        for path in paths:
+            if not path:
+                continue
+            for form in {path, os.path.realpath(path)}:
+                node = self.root
+                for part in path_components(form):
+                    node = node.children.setdefault(part, ProtectedNode())
+                node.protected = True
+
+    def is_protected(self, path: str) -> bool:
+        node = self.root
+        for part in path_components(path):
+            node = node.children.get(part)
+            if node is None:
+                return False
+            if node.protected:
+                return True
+        return False
+
+    def node_for(self, path: str) -> Optional[ProtectedNode]:
+        """Trie node for a directory a walk starts from
+
+        Returns None when nothing at or below path is protected; the returned
+        node has protected set when path itself lies inside a protected path.
+        """
+        node = self.root
+        for part in path_components(path):
+            node = node.children.get(part)
+            if node is None or node.protected:
+                return node
+        return node
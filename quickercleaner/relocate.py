@@ -0,0 +1,232 @@
+import errno
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+# Per-call copy size for copy_file_range/sendfile; large enough that the
+# Python loop around them costs nothing next to the I/O
+_COPY_CHUNK = 64 * 1024 * 1024
+_READ_CHUNK = 1024 * 1024
+
+def relocated_path(path: str, target: str) -> str:
+    """Where path goes below target, keeping its full directory structure
+
+    The source drive becomes the first component, so C:\\Users\\x\\a.tmp moved
+    to D:\\Moved ends up at D:\\Moved\\C\\Users\\x\\a.tmp and files from
+    different drives cannot collide.
+    """
+    drive, rest = os.path.splitdrive(os.path.abspath(path))
+    drive = drive.replace(':', '').strip('\\/').replace('\\', '_').replace('/', '_')
+    parts = [target]
+    if drive:
+        parts.append(drive)
+    parts.append(rest.lstrip('\\/'))
+    return os.path.join(*parts)
+
+def prepare_target(target: str) -> str:
+    """Create target if needed and return its absolute path; raises OSError if files cannot go there"""
+    target = os.path.abspath(target)
+    os.makedirs(target, exist_ok=True)
+    if not os.access(target, os.W_OK | os.X_OK):
+        raise PermissionError(errno.EACCES, "Cannot write to the move target", target)
+    return target
+
+def _short_copy(copied: int, size: int) -> OSError:
+    return OSError(errno.EIO, f"Source ended after {copied} of {size} bytes")
+
+def copy_fd(src_fd: int, dst_fd: int, size: int):
+    """Copy size bytes between descriptors, in the kernel where possible
+
+    Tries copy_file_range (which can share extents on filesystems that
+    support it), then sendfile, then a plain read/write loop (Windows).
+    Raises OSError(EIO) if the source ends before size bytes, e.g. because
+    it was truncated while being copied, rather than leave a short copy.
+    """
+    offset = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while offset < size:
+                copied = os.copy_file_range(src_fd, dst_fd, min(_COPY_CHUNK, size - offset))
+                if not copied:
+                    break
+                offset += copied
+            if offset == size:
+                return
+        except OSError as e:
+            # Older kernels refuse cross-filesystem copies; fall through
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP) or offset:
+                raise
+        if offset:
+            raise _short_copy(offset, size)
+        # Some filesystems report 0 copied instead of an error; let the
+        # next method decide whether the source is really empty
+    if hasattr(os, 'sendfile') and os.name == 'posix':
+        try:
+            while offset < size:
+                sent = os.sendfile(dst_fd, src_fd, offset, min(_COPY_CHUNK, size - offset))
+                if not sent:
+                    break
+                offset += sent
+            if offset == size:
+                return
+        except OSError as e:
+            if e.errno not in (errno.ENOSYS, errno.EINVAL) or offset:
+                raise
+        if offset:
+            raise _short_copy(offset, size)
+    os.lseek(src_fd, 0, os.SEEK_SET)
+    while offset < size:
+        chunk = os.read(src_fd, min(_READ_CHUNK, size - offset))
+        if not chunk:
+            raise _short_copy(offset, size)
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(dst_fd, view):]
+        offset += len(chunk)
+
+class Relocator:
+    """Moves files below target instead of deleting them (DiskCleaner.move_target)
+
+    Has the TrashBackend interface, so RemovalBatcher and DeleterPool drive it
+    exactly like the recycle bin: bounded deleter threads, per-directory
+    batches, per-file outcomes. Within a batch, files on the target's device
+    are renamed. Others are copied kernel-side, all copies of the batch are
+    fsynced together (plus their directories once), and only then are the
+    sources removed, so a crash never loses a file. Existing files at the
+    destination are never overwritten. target must already exist (see
+    prepare_target).
+    """
+    def __init__(self, target: str):
+        self.target = os.path.abspath(target)
+        self.name = 'relocate'
+        self._target_dev = os.stat(self.target).st_dev
+        self._made_dirs: Dict[str, bool] = {}
+
+    def remove(self, paths: List[str]) -> List[Optional[Exception]]:
+        """Relocate a batch of paths, returning the error (or None) for each
+
+        Files that failed are left at their source with nothing created at
+        the destination, so they can be retried.
+        """
+        errors: List[Optional[Exception]] = [None] * len(paths)
+        if not paths:
+            return errors
+        try:
+            same_device = os.stat(os.path.dirname(paths[0])).st_dev == self._target_dev
+        except OSError:
+            same_device = False
+        # (index, source, destination, open destination descriptor or -1)
+        copied: List[Tuple[int, str, str, int]] = []
+        try:
+            for i, path in enumerate(paths):
+                dest = relocated_path(path, self.target)
+                try:
+                    self._make_parent(dest)
+                    if os.path.lexists(dest):
+                        raise FileExistsError(errno.EEXIST, "Destination already exists", dest)
+                    if same_device:
+                        try:
+                            os.rename(path, dest)
+                            continue
+                        except OSError as e:
+                            if e.errno != errno.EXDEV:
+                                raise
+                    copied.append((i, path, dest, self._copy(path, dest)))
+                except Exception as e:
+                    errors[i] = e
+            self._finish(copied, errors)
+        except BaseException:
+            # Undo the copies whose source is still in place so a retry can start clean
+            for i, path, dest, fd in copied:
+                self._discard(dest, fd)
+            raise
+        return errors
+
+    def _make_parent(self, dest: str):
+        parent = os.path.dirname(dest)
+        if parent not in self._made_dirs:
+            os.makedirs(parent, exist_ok=True)
+            self._made_dirs[parent] = True
+
+    def _copy(self, path: str, dest: str) -> int:
+        """Copy one file and return the still-open destination descriptor"""
+        src_fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            st = os.fstat(src_fd)
+            dst_fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600)
+            try:
+                copy_fd(src_fd, dst_fd, st.st_size)
+                shutil.copystat(path, dest)
+            except BaseException:
+                self._discard(dest, dst_fd)
+                raise
+        finally:
+            os.close(src_fd)
+        return dst_fd
+
+    def _finish(self, copied: List[Tuple[int, str, str, int]], errors: List[Optional[Exception]]):
+        """Make a batch of copies durable, then remove their sources
+
+        A copy that cannot be made durable, or whose source cannot be
+        removed, is discarded and its error recorded in errors. Entries
+        leave copied once they are settled either way, so a failure that
+        escapes only rolls back copies whose source still exists.
+        """
+        if not copied:
+            return
+        # One fsync per file issued back to back lets the disk write them out
+        # together, instead of waiting for each file before copying the next
+        failed = []
+        for entry in copied:
+            try:
+                os.fsync(entry[3])
+            except OSError as e:
+                failed.append((entry, e))
+        for entry, e in failed:
+            self._fail(copied, entry, errors, e)
+        failed = []
+        for k, (i, path, dest, fd) in enumerate(copied):
+            copied[k] = (i, path, dest, -1)
+            try:
+                os.close(fd)
+            except OSError as e:
+                failed.append((copied[k], e))
+        for entry, e in failed:
+            self._fail(copied, entry, errors, e)
+        if os.name == 'posix':
+            for parent in {os.path.dirname(dest) for i, path, dest, fd in copied}:
+                try:
+                    dir_fd = os.open(parent, os.O_RDONLY)
+                    try:
+                        os.fsync(dir_fd)
+                    finally:
+                        os.close(dir_fd)
+                except OSError as e:
+                    for entry in [entry for entry in copied if os.path.dirname(entry[2]) == parent]:
+                        self._fail(copied, entry, errors, e)
+        while copied:
+            entry = copied[-1]
+            try:
+                os.remove(entry[1])
+            except OSError as e:
+                self._fail(copied, entry, errors, e)
+            else:
+                copied.pop()
+
+    def _fail(self, copied: List[Tuple[int, str, str, int]], entry: Tuple[int, str, str, int],
+              errors: List[Optional[Exception]], error: Exception):
+        copied.remove(entry)
+        errors[entry[0]] = error
+        self._discard(entry[2], entry[3])
+
+    @staticmethod
+    def _discard(dest: str, fd: int):
+        if fd >= 0:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        try:
+            os.remove(dest)
+        except OSError:
+            pass
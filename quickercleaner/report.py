@@ -0,0 +1,145 @@
+import io
+import os
+import sys
+import threading
+from typing import IO, Dict, List, Optional, Tuple
+
+# main lists REPORT_FORMATS before parsing arguments, so csv, json and the
+# walker are only imported by the methods that use them
+REPORT_FORMATS = ('ndjson', 'csv')
+
+CSV_COLUMNS = ('record', 'category', 'file_category', 'path', 'size', 'mtime', 'age_days', 'status', 'error', 'files')
+
+# (dirpath, name, stat, file category) of a scan candidate
+Candidate = Tuple[str, str, os.stat_result, str]
+# (cleanup category, path, size or None, status, error message or None) of a cleanup outcome
+Outcome = Tuple[str, str, Optional[int], str, Optional[str]]
+
+def report_format(path: str) -> str:
+    """The format implied by a report path: csv for *.csv(.gz), otherwise ndjson"""
+    if path.endswith('.gz'):
+        path = path[:-3]
+    return 'csv' if path.endswith('.csv') else 'ndjson'
+
+class ReportWriter:
+    """Per-file scan or cleanup records streamed to NDJSON or CSV as they are produced
+
+    Records arrive a directory listing or deleter chunk at a time, possibly
+    from several threads; each batch is formatted outside the lock and
+    written with one call into a large write buffer, so nothing is kept in
+    memory. A path ending in .gz is gzip compressed and '-' writes to
+    stdout. The last record is a summary (the run's metrics document in
+    NDJSON, per-category and total rows in CSV), so a report without one
+    comes from a run that did not finish.
+    """
+    def __init__(self, path: str, fmt: Optional[str] = None, buffer_size: int = 1024 * 1024, compresslevel: int = 6):
+        if fmt is None:
+            fmt = report_format(path)
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format {fmt!r}, expected one of {REPORT_FORMATS}")
+        self.path = path
+        self.format = fmt
+        self.records = 0
+        self._lock = threading.Lock()
+        self._owned: List[IO[bytes]] = []
+        if path == '-':
+            raw = sys.stdout.buffer
+        else:
+            raw = open(path, 'wb')
+            self._owned.append(raw)
+        if path.endswith('.gz'):
+            import gzip
+            # mtime=0 keeps the output identical for identical records
+            raw = gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=compresslevel, mtime=0)
+            self._owned.insert(0, raw)
+        self._stream: Optional[io.BufferedWriter] = io.BufferedWriter(raw, buffer_size)
+        if fmt == 'csv':
+            self._write_rows([CSV_COLUMNS], 0)
+
+    def add_candidates(self, category: str, files: List[Candidate], now: float):
+        """Record scan candidates found for a cleanup category"""
+        if not files:
+            return
+        from quickercleaner.walker import age_in_days
+        if self.format == 'csv':
+            self._write_rows([
+                ('file', category, file_category, os.path.join(dirpath, name), st.st_size, st.st_mtime,
+                 age_in_days(st.st_mtime, now), '', '', 1)
+                for dirpath, name, st, file_category in files
+            ], len(files))
+        else:
+            from json.encoder import encode_basestring_ascii as quote
+            # Fixed fields, so only the strings need json's escaping
+            prefix = f'{{"record": "file", "category": {quote(category)}, '
+            self._write_lines([
+                f'{prefix}"file_category": {quote(file_category)}, "path": {quote(os.path.join(dirpath, name))}, '
+                f'"size": {st.st_size}, "mtime": {st.st_mtime!r}, "age_days": {age_in_days(st.st_mtime, now)}}}'
+                for dirpath, name, st, file_category in files
+            ])
+
+    def add_outcomes(self, outcomes: List[Outcome]):
+        """Record what a cleanup did with each file: removed, failed, skipped or dry_run"""
+        if not outcomes:
+            return
+        if self.format == 'csv':
+            self._write_rows([
+                ('file', category, '', path, '' if size is None else size, '', '', status, error or '', 1)
+                for category, path, size, status, error in outcomes
+            ], len(outcomes))
+        else:
+            import json
+            self._write_lines([
+                json.dumps({'record': 'file', 'category': category, 'path': path, 'size': size,
+                            'status': status, 'error': error})
+                for category, path, size, status, error in outcomes
+            ])
+
+    def write_summary(self, doc: Dict):
+        """Write the closing record from a metrics document (see quickercleaner.metrics)"""
+        if self.format == 'csv':
+            status = 'cancelled' if doc['cancelled'] else 'complete'
+            rows = [('summary', category, '', '', data['bytes'], '', '', status, '', data['files'])
+                    for category, data in doc['categories'].items()]
+            rows.append(('summary', '', '', doc['drive'], doc['bytes'], '', '', status,
+                         doc['errors']['total'] or '', doc['files']))
+            self._write_rows(rows, 0)
+        else:
+            import json
+            summary = {'record': 'summary'}
+            summary.update(doc)
+            self._write_lines([json.dumps(summary)], 0)
+
+    def close(self):
+        """Flush everything; the underlying file is closed unless it is stdout"""
+        with self._lock:
+            if self._stream is None:
+                return
+            self._stream.flush()
+            # Detached, so stdout is never closed with the buffer
+            self._stream.detach()
+            self._stream = None
+            for stream in self._owned:
+                stream.close()
+            self._owned = []
+
+    def __enter__(self) -> 'ReportWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_lines(self, lines: List[str], records: Optional[int] = None):
+        # json.dumps escapes non-ASCII, including undecodable file names
+        self._write('\n'.join(lines).encode('ascii') + b'\n', len(lines) if records is None else records)
+
+    def _write_rows(self, rows: List[Tuple], records: int):
+        import csv
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        # Undecodable file names are written back as their original bytes
+        self._write(buffer.getvalue().encode('utf-8', 'surrogateescape'), records)
+
+    def _write(self, data: bytes, records: int):
+        with self._lock:
+            self._stream.write(data)
+            self.records += records
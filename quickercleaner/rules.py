@@ -0,0 +1,97 @@
+import re
+from fnmatch import translate
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+# Built-in categorisation; '*.ext' rules are checked before other globs
+DEFAULT_CATEGORY_PATTERNS: List[Tuple[str, List[str]]] = [
+    ('temporary', ['*.tmp', '*.temp']),
+    ('log', ['*.log']),
+    ('cache', ['*.cache']),
+]
+DEFAULT_CATEGORY = 'other'
+
+_WILDCARDS = set('*?[]')
+
+def _simple_extension(pattern: str) -> Optional[str]:
+    """'.ext' for patterns of the form '*.ext', None for anything needing a regex"""
+    if not pattern.startswith('*.'):
+        return None
+    ext = pattern[1:]
+    if '.' in ext[1:] or _WILDCARDS.intersection(ext):
+        return None
+    return ext.lower()
+
+def _extension(name: str) -> str:
+    # Same result as os.path.splitext(name)[1].lower() for a bare file name
+    dot = name.rfind('.')
+    return name[dot:].lower() if dot > 0 else ''
+
+class FileRules:
+    """Include/exclude and category rules compiled once into hash sets and a regex
+
+    Patterns of the form '*.ext' become a set (or dict) lookup on the lower-cased
+    extension; any other globs are merged into one case-insensitive regex, so a
+    name is classified with one hash lookup and at most one regex match however
+    many patterns are configured. Rules apply to file names, not full paths.
+
+    include_patterns of None means every file is included.
+    """
+    def __init__(self, include_patterns: Optional[Iterable[str]] = None,
+                 exclude_extensions: Iterable[str] = (),
+                 category_patterns: List[Tuple[str, List[str]]] = DEFAULT_CATEGORY_PATTERNS):
+        self.exclude_extensions: Set[str] = {
+            (ext if ext.startswith('.') else '.' + ext).lower()
+            for ext in (e.strip() for e in exclude_extensions) if ext
+        }
+
+        self.include_all = include_patterns is None
+        self.include_extensions: Set[str] = set()
+        include_globs = []
+        for pattern in include_patterns or ():
+            ext = _simple_extension(pattern)
+            if ext is not None:
+                self.include_extensions.add(ext)
+            else:
+                include_globs.append(translate(pattern))
+        self.include_regex: Optional[Pattern] = (
+            re.compile('|'.join(include_globs), re.IGNORECASE) if include_globs else None
+        )
+
+        self.category_by_extension: Dict[str, str] = {}
+        category_globs = []
+        self._category_groups: Dict[str, str] = {}
+        for category, patterns in category_patterns:
+            for pattern in patterns:
+                ext = _simple_extension(pattern)
+                if ext is not None:
+                    self.category_by_extension.setdefault(ext, category)
+                else:
+                    group = f"c{len(self._category_groups)}"
+                    self._category_groups[group] = category
+                    category_globs.append(f"(?P<{group}>{translate(pattern)})")
+        self.category_regex: Optional[Pattern] = (
+            re.compile('|'.join(category_globs), re.IGNORECASE) if category_globs else None
+        )
+
+    def classify(self, name: str) -> Optional[str]:
+        """Category of a file name, or None if the rules exclude it"""
+        ext = _extension(name)
+        if ext in self.exclude_extensions:
+            return None
+        if not self.include_all and ext not in self.include_extensions:
+            if self.include_regex is None or self.include_regex.match(name) is None:
+                return None
+        return self.category(name, ext)
+
+    def category(self, name: str, ext: Optional[str] = None) -> str:
+        """Category of a file name regardless of include/exclude rules"""
+        if ext is None:
+            ext = _extension(name)
+        category = self.category_by_extension.get(ext)
+        if category is not None:
+            return category
+        if self.category_regex is not None:
+            match = self.category_regex.match(name)
+            if match is not None:
+                return self._category_groups[match.lastgroup]
+        return DEFAULT_CATEGORY
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, NamedTuple, Optional, Tuple
+
+from quickercleaner.walker import WalkStats, list_dir
+
+# A directory modified this recently may still change within the same mtime
+# tick (2s on FAT), so its listing is not trusted for reuse
+RACY_WINDOW_SECONDS = 2.0
+
+# Rows for directories not visited for this long are dropped on commit
+EXPIRE_SECONDS = 30 * 24 * 3600
+
+# Stored in PRAGMA user_version; an index written with another layout is discarded
+SCHEMA_VERSION = 1
+
+class CachedStat(NamedTuple):
+    """The subset of os.stat_result the scanners read, rebuilt from the index"""
+    st_size: int
+    st_mtime: float
+
+class ScanIndex:
+    """Persistent per-directory listing cache keyed by directory mtime
+
+    A directory's mtime changes whenever an entry is added, removed or renamed
+    in it, so an unchanged mtime means the cached listing is still complete and
+    the directory costs one stat instead of a listing plus a stat per file.
+    In-place writes to a file do not touch the directory mtime, so cached sizes
+    and mtimes may be stale; anything that deletes must revalidate on disk
+    (as clean_drive does for plans) rather than trust the index. Paths and
+    names are stored as os.fsencode() bytes, so names that are not valid in
+    the file system encoding round-trip unchanged.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple] = []
+        self._seen: List[Tuple[float, bytes]] = []
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS dirs")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " path BLOB PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " seen REAL NOT NULL,"
+            " subdirs BLOB NOT NULL,"
+            " names BLOB NOT NULL,"
+            " sizes BLOB NOT NULL,"
+            " mtimes BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def list_dir(self, dirpath: str, stats: Optional[WalkStats] = None) -> Tuple[List[str], List[Tuple[str, CachedStat]]]:
+        """Drop-in replacement for walker.list_dir that reuses unchanged listings"""
+        return self._list(dirpath, stats, reuse=True)
+
+    def refresh(self, dirpath: str, stats: Optional[WalkStats] = None) -> Tuple[List[str], List[Tuple[str, os.stat_result]]]:
+        """List dirpath from disk even if its mtime is unchanged, and store the listing
+
+        For callers that know a file inside changed in place (watch mode),
+        which the directory mtime does not reflect.
+        """
+        return self._list(dirpath, stats, reuse=False)
+
+    def _list(self, dirpath: str, stats: Optional[WalkStats], reuse: bool) -> Tuple[List[str], List[Tuple]]:
+        try:
+            dir_st = os.stat(dirpath)
+        except OSError as e:
+            if stats is not None:
+                stats.record_error(e)
+            return [], []
+        if stats is not None:
+            stats.stat_calls += 1
+        now = time.time()
+
+        row = None
+        if reuse:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT mtime_ns, subdirs, names, sizes, mtimes FROM dirs WHERE path = ?",
+                    (os.fsencode(dirpath),)
+                ).fetchone()
+        if row is not None and row[0] == dir_st.st_mtime_ns:
+            if stats is not None:
+                stats.dirs_cached += 1
+            self._seen.append((now, os.fsencode(dirpath)))
+            return self._decode(dirpath, row)
+
+        # The directory mtime was taken before listing, so a change made while
+        # listing leaves a mismatch and forces a re-list next time
+        subdirs, files = list_dir(dirpath, stats)
+        if now - dir_st.st_mtime >= RACY_WINDOW_SECONDS:
+            self._pending.append(self._encode(dirpath, dir_st.st_mtime_ns, now, subdirs, files))
+        return subdirs, files
+
+    def commit(self):
+        """Write listings gathered since the last commit and expire stale rows"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            seen, self._seen = self._seen, []
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, seen, subdirs, names, sizes, mtimes)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                pending
+            )
+            self._conn.executemany("UPDATE dirs SET seen = ? WHERE path = ?", seen)
+            self._conn.execute("DELETE FROM dirs WHERE seen < ?", (time.time() - EXPIRE_SECONDS,))
+            self._conn.commit()
+
+    def close(self):
+        self.commit()
+        self._conn.close()
+
+    @staticmethod
+    def _encode(dirpath: str, mtime_ns: int, now: float, subdirs: List[str], files: List[Tuple[str, os.stat_result]]) -> Tuple:
+        # Names are NUL-separated (NUL cannot occur in a file name) and numbers
+        # are packed arrays, so a directory is one compact row
+        return (
+            os.fsencode(dirpath),
+            mtime_ns,
+            now,
+            b'\0'.join(os.fsencode(os.path.basename(d)) for d in subdirs),
+            b'\0'.join(os.fsencode(name) for name, st in files),
+            array('q', (st.st_size for name, st in files)).tobytes(),
+            array('d', (st.st_mtime for name, st in files)).tobytes(),
+        )
+
+    @staticmethod
+    def _decode(dirpath: str, row: Tuple) -> Tuple[List[str], List[Tuple[str, CachedStat]]]:
+        _, subdir_names, names, size_bytes, mtime_bytes = row
+        subdirs = [os.path.join(dirpath, os.fsdecode(d)) for d in subdir_names.split(b'\0')] if subdir_names else []
+        if not names:
+            return subdirs, []
+        sizes = array('q')
+        sizes.frombytes(size_bytes)
+        mtimes = array('d')
+        mtimes.frombytes(mtime_bytes)
+        files = [
+            (name, CachedStat(size, mtime))
+            for name, size, mtime in zip(map(os.fsdecode, names.split(b'\0')), sizes, mtimes)
+        ]
+        return subdirs, files
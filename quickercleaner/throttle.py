@@ -0,0 +1,216 @@
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("QuickerCleaner")
+
+# Keys of a limits file, the same names as the environment settings
+LIMIT_KEYS = {
+    'QUICK_CLEANER_MAX_SCAN_OPS': 'max_scan_ops',
+    'QUICK_CLEANER_MAX_REMOVE_OPS': 'max_remove_ops',
+    'QUICK_CLEANER_MAX_REMOVE_MB': 'max_remove_mb',
+}
+
+# ioprio_set syscall numbers by machine; the call has no libc wrapper
+_IOPRIO_SET = {'x86_64': 251, 'amd64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'arm64': 30,
+               'riscv64': 30, 'armv7l': 314, 'ppc64le': 273, 's390x': 282}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+# SetPriorityClass mode that also drops the process to very low I/O priority
+_PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+
+class TokenBucket:
+    """Rate limit shared by any number of threads; a rate of 0 means unlimited
+
+    Holds at most one second of tokens, so an idle period allows a short
+    burst and no more. acquire() takes what it needs even when that leaves
+    the bucket in debt (one listing can cost thousands of stats), then
+    sleeps until the debt is paid back, so large and small requests are
+    both limited to the rate on average. set_rate() takes effect for
+    threads that are already waiting.
+    """
+    def __init__(self, rate: float = 0.0):
+        self.rate = rate
+        self._tokens = self._capacity()
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _capacity(self) -> float:
+        return max(self.rate, 1.0)
+
+    def _refill(self, now: float):
+        self._tokens = min(self._capacity(), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self._tokens = min(self._tokens, self._capacity())
+
+    def acquire(self, amount: float, should_stop: Optional[Callable[[], bool]] = None) -> float:
+        """Take amount tokens, sleeping while the bucket is in debt; returns the seconds slept"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                if self.rate <= 0:
+                    break
+                self._refill(time.monotonic())
+                if self._tokens >= 0:
+                    break
+                delay = -self._tokens / self.rate
+            if should_stop is not None and should_stop():
+                break
+            # Short naps, so rate changes and stops are noticed promptly
+            time.sleep(min(delay, 0.1))
+        return time.monotonic() - started
+
+class IOThrottle:
+    """Limits on the file system work of every scan and cleanup of a DiskCleaner
+
+    One bucket each for stat and listing calls, removals and removed bytes,
+    shared by all walker and deleter threads. on_wait(bucket, seconds) is
+    told about every wait, e.g. to add it to RunCounters. Limits of 0 are
+    unlimited and cost a single comparison per call.
+    """
+    def __init__(self, max_scan_ops: float = 0, max_remove_ops: float = 0, max_remove_bytes: float = 0,
+                 on_wait: Optional[Callable[[str, float], None]] = None):
+        self.scan_ops = TokenBucket(max_scan_ops)
+        self.remove_ops = TokenBucket(max_remove_ops)
+        self.remove_bytes = TokenBucket(max_remove_bytes)
+        self.on_wait = on_wait
+
+    def set_limits(self, max_scan_ops: Optional[float] = None, max_remove_ops: Optional[float] = None,
+                   max_remove_bytes: Optional[float] = None):
+        """Change limits (None keeps one) for runs in progress and later ones"""
+        if max_scan_ops is not None:
+            self.scan_ops.set_rate(max_scan_ops)
+        if max_remove_ops is not None:
+            self.remove_ops.set_rate(max_remove_ops)
+        if max_remove_bytes is not None:
+            self.remove_bytes.set_rate(max_remove_bytes)
+
+    @property
+    def limits(self) -> Dict[str, float]:
+        return {
+            'max_scan_ops': self.scan_ops.rate,
+            'max_remove_ops': self.remove_ops.rate,
+            'max_remove_bytes': self.remove_bytes.rate,
+        }
+
+    def scan(self, ops: int, should_stop: Optional[Callable[[], bool]] = None):
+        """Account for ops stat or listing calls"""
+        if self.scan_ops.rate > 0:
+            self._waited('throttle.scan', self.scan_ops.acquire(ops, should_stop))
+
+    def remove(self, files: int, size: int, should_stop: Optional[Callable[[], bool]] = None):
+        """Account for removing files totalling size bytes"""
+        if self.remove_ops.rate > 0:
+            self._waited('throttle.remove_ops', self.remove_ops.acquire(files, should_stop))
+        if self.remove_bytes.rate > 0:
+            self._waited('throttle.remove_bytes', self.remove_bytes.acquire(size, should_stop))
+
+    def _waited(self, bucket: str, seconds: float):
+        if seconds and self.on_wait is not None:
+            self.on_wait(bucket, seconds)
+
+def read_limits(path: str) -> Dict[str, float]:
+    """set_limits() arguments from a KEY=value file using the LIMIT_KEYS names
+
+    Blank lines, comments and unknown keys are ignored; keys that are
+    missing are left unchanged. MB are converted to bytes.
+    """
+    limits: Dict[str, float] = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            key, sep, value = line.partition('=')
+            key = key.strip()
+            if not sep or key.startswith('#') or key not in LIMIT_KEYS:
+                continue
+            limits[LIMIT_KEYS[key]] = float(value.strip() or 0)
+    if 'max_remove_mb' in limits:
+        limits['max_remove_bytes'] = limits.pop('max_remove_mb') * 1024 * 1024
+    return limits
+
+class LimitsFileWatcher:
+    """Applies a limits file (see read_limits) to an IOThrottle whenever it changes
+
+    Lets an operator slow down or speed up a cleanup that is already
+    running by editing one file. The file is checked every interval seconds
+    on a daemon thread; an unreadable or invalid file keeps the limits as
+    they are.
+    """
+    def __init__(self, throttle: IOThrottle, path: str, interval: float = 1.0):
+        self.throttle = throttle
+        self.path = path
+        self.interval = interval
+        self._mtime_ns: Optional[int] = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> 'LimitsFileWatcher':
+        self.check()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def check(self) -> bool:
+        """Apply the file if it changed since the last check; True if the limits were updated"""
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime_ns == self._mtime_ns:
+            return False
+        self._mtime_ns = mtime_ns
+        try:
+            limits = read_limits(self.path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring limits file {self.path}: {e}")
+            return False
+        self.throttle.set_limits(**limits)
+        logger.info(f"I/O limits from {self.path}: {self.throttle.limits}")
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+def set_idle_io_priority() -> bool:
+    """Make this process yield the disk to everything else, if the platform allows
+
+    Linux: the idle I/O scheduling class (ioprio_set), honoured by the BFQ
+    scheduler; threads started afterwards inherit it. Windows: background
+    processing mode, which lowers I/O and memory priority. Returns whether
+    the priority was changed.
+    """
+    import ctypes
+    if sys.platform.startswith('linux'):
+        import ctypes.util
+        import platform
+        number = _IOPRIO_SET.get(platform.machine().lower())
+        if number is None:
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        except OSError:
+            return False
+        # pid 0 is the calling thread
+        return libc.syscall(number, _IOPRIO_WHO_PROCESS, 0, _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT) == 0
+    if sys.platform == 'win32':
+        kernel32 = ctypes.windll.kernel32
+        return bool(kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), _PROCESS_MODE_BACKGROUND_BEGIN))
+    return False
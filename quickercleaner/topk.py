@@ -0,0 +1,42 @@
+import heapq
+from typing import List, Tuple
+
+from quickercleaner.candidates import FileRecord
+from quickercleaner.walker import age_in_days
+
+# (key, dirpath, name, size, mtime, category); dirpath and name break ties
+_Entry = Tuple[float, str, str, int, float, str]
+
+class TopFiles:
+    """The k files with the largest key seen so far, in O(k) memory
+
+    A bounded min-heap: its root is the smallest key still in the top k, so a
+    file that does not make the cut costs one comparison. Use key=size for
+    the largest files and key=-mtime for the oldest.
+    """
+    __slots__ = ('k', '_heap')
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[_Entry] = []
+
+    def offer(self, key: float, dirpath: str, name: str, size: int, mtime: float, category: str):
+        heap = self._heap
+        if len(heap) < self.k:
+            heapq.heappush(heap, (key, dirpath, name, size, mtime, category))
+        elif heap and key > heap[0][0]:
+            heapq.heapreplace(heap, (key, dirpath, name, size, mtime, category))
+
+    def merge(self, other: 'TopFiles'):
+        for entry in other._heap:
+            self.offer(*entry)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def records(self, now: float) -> List[FileRecord]:
+        """The kept files as FileRecords, largest key first"""
+        return [
+            FileRecord(dirpath, name, size, mtime, age_in_days(mtime, now), category)
+            for key, dirpath, name, size, mtime, category in sorted(self._heap, reverse=True)
+        ]
@@ -0,0 +1,289 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from quickercleaner.candidates import PathStore
+from quickercleaner.pipeline import StageQueue, StageStats
+from quickercleaner.progress import ProgressReporter
+from quickercleaner.throttle import IOThrottle
+from quickercleaner.walker import error_key
+
+if TYPE_CHECKING:
+    from quickercleaner.journal import CleanupJournal
+    from quickercleaner.report import ReportWriter
+
+# Shell special folder id of the Recycle Bin (ssfBITBUCKET)
+_RECYCLE_BIN_FOLDER = 10
+
+# (path, size, error); size is None for a file that was gone before it could be removed
+Outcome = Tuple[str, Optional[int], Optional[Exception]]
+
+class DeleterTotals:
+    """What a DeleterPool removed: totals, per-category totals and failures"""
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        # Files already gone when their batch was removed
+        self.skipped = 0
+        self.errors: List[str] = []
+        self.error_counts: Dict[str, int] = {}
+        self.removed = PathStore()
+        # {category: {'files': ..., 'bytes': ...}}
+        self.categories: Dict[str, Dict[str, int]] = {}
+
+    def add_removed(self, path: Optional[str], size: int, category: str):
+        """Count a removed file; a path of None counts it without recording the path (dry run)"""
+        self.files += 1
+        self.bytes += size
+        if path is not None:
+            self.removed.append(path)
+        cat_totals = self.categories.get(category)
+        if cat_totals is None:
+            cat_totals = self.categories[category] = {'files': 0, 'bytes': 0}
+        cat_totals['files'] += 1
+        cat_totals['bytes'] += size
+
+    def add_error(self, path: str, error: Exception):
+        self.errors.append(f"Error with {path}: {str(error)}")
+        key = error_key(error)
+        self.error_counts[key] = self.error_counts.get(key, 0) + 1
+
+    def merge(self, other: 'DeleterTotals'):
+        self.files += other.files
+        self.bytes += other.bytes
+        self.skipped += other.skipped
+        self.errors.extend(other.errors)
+        for key, count in other.error_counts.items():
+            self.error_counts[key] = self.error_counts.get(key, 0) + count
+        self.removed.extend(other.removed)
+        for category, totals in other.categories.items():
+            cat_totals = self.categories.setdefault(category, {'files': 0, 'bytes': 0})
+            cat_totals['files'] += totals['files']
+            cat_totals['bytes'] += totals['bytes']
+
+class TrashBackend:
+    """Moves files to the recycle bin, holding one backend handle for a whole run
+
+    Uses send2trash when available (it accepts lists), otherwise the Windows
+    shell's Recycle Bin folder through a single Shell.Application dispatch.
+    With use_recycle_bin=False files are deleted permanently.
+    """
+    def __init__(self, use_recycle_bin: bool = True):
+        self.name = 'delete'
+        self._send2trash = None
+        self._recycle_bin = None
+        if not use_recycle_bin:
+            return
+        try:
+            import send2trash
+            self._send2trash = send2trash.send2trash
+            self.name = 'send2trash'
+            return
+        except ImportError:
+            pass
+        try:
+            import win32com.client
+            shell = win32com.client.Dispatch("Shell.Application")
+            self._recycle_bin = shell.NameSpace(_RECYCLE_BIN_FOLDER)
+            self.name = 'shell'
+        except Exception:
+            # Fallback: just delete if recycle bin is unavailable
+            pass
+
+    def remove(self, paths: List[str]) -> List[Optional[Exception]]:
+        """Remove a batch of paths, returning the error (or None) for each
+
+        send2trash takes the whole list in one call but stops at the first
+        failure. Files it already trashed are gone by then and count as
+        removed; the ones still in place are retried one by one, so every
+        failure is attributed to its own file.
+        """
+        if self._send2trash is not None:
+            try:
+                self._send2trash(paths)
+                return [None] * len(paths)
+            except Exception:
+                pass
+            errors: List[Optional[Exception]] = []
+            for path in paths:
+                if os.path.lexists(path):
+                    errors.append(self._remove_one(self._send2trash, path))
+                else:
+                    errors.append(None)
+            return errors
+        if self._recycle_bin is not None:
+            return [self._remove_one(self._recycle_bin.MoveHere, path) for path in paths]
+        return [self._remove_one(os.remove, path) for path in paths]
+
+    @staticmethod
+    def _remove_one(remove: Callable[[str], None], path: str) -> Optional[Exception]:
+        try:
+            remove(path)
+        except Exception as e:
+            return e
+        return None
+
+class RemovalBatcher:
+    """Groups files per directory and hands them to a TrashBackend in batches
+
+    Once batch_size files are pending every directory group is flushed as one
+    backend call, and the outcome (path, size, error or None) of each file is
+    reported; a file that was no longer there gets a size of None, as
+    nothing was freed by removing it. Each group is charged to throttle
+    before it is removed.
+    """
+    def __init__(self, backend: TrashBackend, batch_size: int, throttle: Optional[IOThrottle] = None,
+                 should_stop: Optional[Callable[[], bool]] = None):
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.throttle = throttle
+        self.should_stop = should_stop
+        self._groups: Dict[str, List[Tuple[str, int]]] = {}
+        self._pending = 0
+
+    def add(self, path: str, size: int) -> List[Outcome]:
+        """Queue a file; returns the outcomes of any batches this flushed"""
+        self._groups.setdefault(os.path.dirname(path), []).append((path, size))
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[Outcome]:
+        """Remove everything still pending and return the outcomes"""
+        outcomes: List[Outcome] = []
+        groups, self._groups, self._pending = self._groups, {}, 0
+        for entries in groups.values():
+            if self.throttle is not None:
+                self.throttle.remove(len(entries), sum(size for path, size in entries), self.should_stop)
+            errors = self.backend.remove([path for path, size in entries])
+            for (path, size), error in zip(entries, errors):
+                if isinstance(error, FileNotFoundError) and not os.path.lexists(path):
+                    outcomes.append((path, None, None))
+                else:
+                    outcomes.append((path, size, error))
+        return outcomes
+
+def _outcome_status(size: Optional[int], error: Optional[Exception]) -> str:
+    if error is not None:
+        return 'failed'
+    return 'skipped' if size is None else 'removed'
+
+class DeleterPool:
+    """Deleter stage: worker threads draining a bounded queue of file chunks
+
+    Each worker owns its TrashBackend (COM handles are per-thread on Windows)
+    and RemovalBatcher, and accumulates its own DeleterTotals until close().
+    Once stopped is set, chunks still queued are dropped instead of removed.
+    The outcome of every file of a chunk goes to report, if given. With a
+    journal, each chunk gets a sequence number and is recorded as an intent
+    before it is queued and as done once its files are gone.
+
+    A worker that fails (backend, report or journal) sets stopped, so the
+    rest of the run winds down, and keeps draining the queue so producers
+    never block; close() then raises the first such error.
+    """
+    _DONE = object()
+
+    def __init__(self, workers: int, batch_size: int, make_backend: Callable[[], TrashBackend],
+                 upstream: StageStats, stage: StageStats, stopped: threading.Event,
+                 progress: Optional[ProgressReporter] = None, report: Optional['ReportWriter'] = None,
+                 journal: Optional['CleanupJournal'] = None, first_seq: int = 0, throttle: Optional[IOThrottle] = None):
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.make_backend = make_backend
+        self.stage = stage
+        self.stopped = stopped
+        self.progress = progress
+        self.report = report
+        self.journal = journal
+        self.next_seq = first_seq
+        self.throttle = throttle
+        self._queue = StageQueue(self.workers * 2, upstream, stage, stopped)
+        self._results: List[DeleterTotals] = []
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, chunk: List[Tuple[str, int, str]], seq: Optional[int] = None) -> bool:
+        """Queue (path, size, category) entries for removal; blocks while the deleters are busy
+
+        seq is only given when retrying a chunk a journal already holds as an
+        intent; new chunks are numbered and journaled here.
+        """
+        if seq is None:
+            seq = self.next_seq
+            self.next_seq += 1
+            if self.journal is not None:
+                self.journal.intent(seq, chunk)
+        return self._queue.put((seq, chunk))
+
+    def close(self) -> DeleterTotals:
+        """Wait for the deleters and return their combined totals; raises the error a deleter failed with"""
+        for _ in self._threads:
+            self._queue.put_final(self._DONE)
+        for t in self._threads:
+            t.join()
+        if self._error is not None:
+            raise self._error
+        totals = DeleterTotals()
+        for worker_totals in self._results:
+            totals.merge(worker_totals)
+        return totals
+
+    def _work(self):
+        totals = DeleterTotals()
+        batcher = None
+        try:
+            batcher = RemovalBatcher(self.make_backend(), self.batch_size, self.throttle, self.stopped.is_set)
+        except Exception as e:
+            self._fail(e)
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                break
+            if self.stopped.is_set():
+                continue
+            try:
+                self._remove_chunk(batcher, totals, *item)
+            except Exception as e:
+                self._fail(e)
+        with self._lock:
+            self.stage.items += totals.files
+            self.stage.bytes += totals.bytes
+            self._results.append(totals)
+
+    def _fail(self, error: Exception):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self.stopped.set()
+
+    def _remove_chunk(self, batcher: RemovalBatcher, totals: DeleterTotals, seq: int, chunk: List[Tuple[str, int, str]]):
+        outcomes = []
+        categories = {}
+        for fp, size, category in chunk:
+            categories[fp] = category
+            outcomes.extend(batcher.add(fp, size))
+        outcomes.extend(batcher.flush())
+        files_before, bytes_before = totals.files, totals.bytes
+        for fp, size, error in outcomes:
+            if error is not None:
+                totals.add_error(fp, error)
+            elif size is None:
+                totals.skipped += 1
+            else:
+                totals.add_removed(fp, size, categories[fp])
+        if self.journal is not None:
+            self.journal.done(seq, totals.files - files_before, totals.bytes - bytes_before,
+                              [(fp, str(error)) for fp, size, error in outcomes if error is not None])
+        if self.report is not None:
+            self.report.add_outcomes([
+                (categories[fp], fp, size, _outcome_status(size, error), None if error is None else str(error))
+                for fp, size, error in outcomes
+            ])
+        if self.progress is not None:
+            self.progress.update(totals.files - files_before, totals.bytes - bytes_before,
+                                 len({os.path.dirname(entry[0]) for entry in chunk}), chunk[-1][0])
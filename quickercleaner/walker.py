@@ -0,0 +1,344 @@
+import errno
+import os
+import stat
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from quickercleaner.pipeline import StageQueue, StageStats
+from quickercleaner.protected import ProtectedNode, ProtectedPathTrie
+from quickercleaner.throttle import IOThrottle
+
+SECONDS_PER_DAY = 24 * 3600
+
+def error_key(error: BaseException) -> str:
+    """Symbolic errno (e.g. 'EACCES') of an error, or its class name if it has none"""
+    code = getattr(error, 'errno', None)
+    if isinstance(code, int):
+        return errno.errorcode.get(code, str(code))
+    return type(error).__name__
+
+class WalkStats:
+    """Counters for the work done by a traversal
+
+    errors counts the OSErrors the walk skipped over (unreadable directories,
+    files that vanished between listing and stat), broken down by error_key in
+    error_counts. files_seen and bytes_seen cover every regular file handed
+    on, before any age or rule filtering.
+    """
+    __slots__ = ('dirs_listed', 'dirs_cached', 'stat_calls', 'errors', 'files_seen', 'bytes_seen', 'error_counts')
+
+    def __init__(self):
+        self.dirs_listed = 0
+        self.dirs_cached = 0
+        self.stat_calls = 0
+        self.errors = 0
+        self.files_seen = 0
+        self.bytes_seen = 0
+        self.error_counts: Dict[str, int] = {}
+
+    def record_error(self, error: OSError):
+        self.errors += 1
+        key = error_key(error)
+        self.error_counts[key] = self.error_counts.get(key, 0) + 1
+
+    def merge(self, other: 'WalkStats'):
+        for attr in self.__slots__:
+            if attr == 'error_counts':
+                for key, count in other.error_counts.items():
+                    self.error_counts[key] = self.error_counts.get(key, 0) + count
+            else:
+                setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+
+def _count_files(stats: WalkStats, files: List[Tuple[str, os.stat_result]]):
+    stats.files_seen += len(files)
+    stats.bytes_seen += sum(st.st_size for name, st in files)
+
+def age_in_days(mtime: float, now: float) -> int:
+    """Age in whole days of a modification time relative to a reference 'now'"""
+    return int((now - mtime) / SECONDS_PER_DAY)
+
+def list_dir(dirpath: str, stats: Optional[WalkStats] = None) -> Tuple[List[str], List[Tuple[str, os.stat_result]]]:
+    """List one directory and return (subdirectories, [(file name, stat)])
+
+    Directory detection uses the type reported by the directory listing, so the
+    only stat issued is the single DirEntry.stat() per regular file. Symlinks are
+    never followed, which keeps the walk inside the target tree.
+    """
+    subdirs = []
+    files = []
+    try:
+        it = os.scandir(dirpath)
+    except OSError as e:
+        if stats is not None:
+            stats.record_error(e)
+        return subdirs, files
+    if stats is not None:
+        stats.dirs_listed += 1
+    with it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError as e:
+                if stats is not None:
+                    stats.record_error(e)
+                continue
+            if stats is not None:
+                stats.stat_calls += 1
+            if stat.S_ISREG(st.st_mode):
+                files.append((entry.name, st))
+    return subdirs, files
+
+def prune_protected(node: ProtectedNode, subdirs: List[str], files: List[Tuple[str, os.stat_result]]) -> Tuple[List[Tuple[str, Optional[ProtectedNode]]], List[Tuple[str, os.stat_result]]]:
+    """Drop the protected entries of one directory
+
+    Returns the remaining subdirectories paired with their trie node (None when
+    nothing below them is protected) and the remaining files.
+    """
+    kept_dirs = []
+    for d in subdirs:
+        child = node.child(os.path.basename(d))
+        if child is None or not child.protected:
+            kept_dirs.append((d, child))
+    kept_files = []
+    for name, st in files:
+        child = node.child(name)
+        if child is None or not child.protected:
+            kept_files.append((name, st))
+    return kept_dirs, kept_files
+
+def iter_files(root: str, stats: Optional[WalkStats] = None, protected: Optional[ProtectedPathTrie] = None,
+               throttle: Optional[IOThrottle] = None) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """Yield (directory, file name, stat) for every regular file below root
+
+    Protected subtrees are pruned without ever being listed. Each listing
+    and its stats are charged to throttle.
+    """
+    stats = stats if stats is not None or throttle is None else WalkStats()
+    root_node = protected.node_for(root) if protected is not None else None
+    if root_node is not None and root_node.protected:
+        return
+    stack = [(root, root_node)]
+    while stack:
+        dirpath, node = stack.pop()
+        stat_calls = stats.stat_calls if stats is not None else 0
+        subdirs, files = list_dir(dirpath, stats)
+        if throttle is not None:
+            throttle.scan(1 + stats.stat_calls - stat_calls)
+        if node is None:
+            children = [(d, None) for d in subdirs]
+        else:
+            children, files = prune_protected(node, subdirs, files)
+        if stats is not None:
+            _count_files(stats, files)
+        for name, st in files:
+            yield dirpath, name, st
+        # Reversed so that popping visits subdirectories in listing order
+        stack.extend(reversed(children))
+
+class ParallelWalker:
+    """Work-stealing directory walker over a fixed pool of threads
+
+    Each worker owns a deque of pending directories. It pops its own newest
+    entry (depth-first, good locality) and, when empty, steals the oldest entry
+    of another worker, which tends to be the largest unexplored subtree. Files
+    are handed to a per-worker accumulator, so the only shared state is the
+    pending-directory counter, touched once per directory.
+
+    lister replaces list_dir, e.g. with ScanIndex.list_dir to reuse listings.
+    Setting the optional cancel event stops the walk between directories.
+    Subtrees in protected are pruned and never listed. Every listing is
+    charged to throttle as one op plus one per stat call it made.
+    """
+    def __init__(self, workers: int, lister: Callable = list_dir, cancel: Optional[threading.Event] = None,
+                 protected: Optional[ProtectedPathTrie] = None, throttle: Optional[IOThrottle] = None):
+        self.workers = max(1, workers)
+        self.lister = lister
+        self.cancel = cancel
+        self.protected = protected
+        self.throttle = throttle
+        self._queues: List[Deque[Tuple[object, str, Optional[ProtectedNode]]]] = []
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._error: Optional[BaseException] = None
+        self._stopped = threading.Event()
+        self._listings = False
+        # Totals of the last completed run(), including the walk behind iter_files()
+        self.stats: Optional[WalkStats] = None
+
+    def stop(self):
+        """Ask all workers to finish after their current directory"""
+        self._stopped.set()
+
+    def run(self, roots: List[Tuple[object, str]], make_accumulator: Callable[[], object],
+            listings: bool = False) -> Tuple[List[object], WalkStats]:
+        """Walk (tag, root) pairs and return the per-worker accumulators
+
+        Accumulators must provide add_files(tag, dirpath, [(name, stat)]), called
+        once per directory; the tag of the root the directory was found under is
+        passed through unchanged. With listings, add_listing(tag, dirpath,
+        subdirs, files) is called instead, subdirs being the subdirectories
+        that will be walked.
+        """
+        self._queues = [deque() for _ in range(self.workers)]
+        queued = 0
+        for tag, root in roots:
+            node = self.protected.node_for(root) if self.protected is not None else None
+            if node is not None and node.protected:
+                continue
+            self._queues[queued % self.workers].append((tag, root, node))
+            queued += 1
+        self._pending = queued
+        self._listings = listings
+        self._error = None
+        self._stopped.clear()
+        accumulators = [make_accumulator() for _ in range(self.workers)]
+        stats = [WalkStats() for _ in range(self.workers)]
+
+        if self.workers == 1:
+            self._work(0, accumulators[0], stats[0])
+        else:
+            threads = [
+                threading.Thread(target=self._work, args=(i, accumulators[i], stats[i]), daemon=True)
+                for i in range(self.workers)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        if self._error is not None:
+            raise self._error
+
+        total = WalkStats()
+        for s in stats:
+            total.merge(s)
+        self.stats = total
+        return accumulators, total
+
+    def iter_files(self, roots: List[Tuple[object, str]], max_pending_dirs: int = 256,
+                   walk_stage: Optional[StageStats] = None, consumer_stage: Optional[StageStats] = None) -> Iterator[Tuple[object, str, str, os.stat_result]]:
+        """Walk (tag, root) pairs in the background and yield (tag, dirpath, name, stat)
+
+        Workers hand over one batch per directory through a bounded queue, so
+        memory stays constant however large the tree is. Closing the generator
+        early stops the workers. The optional stage counters record files
+        produced and time spent waiting on either side of the queue.
+        """
+        listings = self._iter_batches(roots, False, max_pending_dirs, walk_stage, consumer_stage)
+        try:
+            for tag, dirpath, subdirs, files in listings:
+                for name, st in files:
+                    yield tag, dirpath, name, st
+        finally:
+            listings.close()
+
+    def iter_listings(self, roots: List[Tuple[object, str]], max_pending_dirs: int = 256,
+                      walk_stage: Optional[StageStats] = None, consumer_stage: Optional[StageStats] = None) -> Iterator[Tuple[object, str, List[str], List[Tuple[str, os.stat_result]]]]:
+        """Like iter_files, but yield (tag, dirpath, subdirs, [(name, stat)]) once per directory
+
+        Every directory listed is yielded, with or without files, after the
+        directory it was found in, so a consumer can tell which part of the
+        tree it has seen completely.
+        """
+        return self._iter_batches(roots, True, max_pending_dirs, walk_stage, consumer_stage)
+
+    def _iter_batches(self, roots: List[Tuple[object, str]], listings: bool, max_pending_dirs: int,
+                      walk_stage: Optional[StageStats], consumer_stage: Optional[StageStats]) -> Iterator[Tuple[object, str, Optional[List[str]], List[Tuple[str, os.stat_result]]]]:
+        walk_stage = walk_stage or StageStats('walk')
+        consumer_stage = consumer_stage or StageStats('consume')
+        batches = StageQueue(max_pending_dirs, walk_stage, consumer_stage, self._stopped)
+        done = object()
+        failure: List[BaseException] = []
+
+        class _QueueSink:
+            def add_files(self, tag, dirpath, files):
+                if files:
+                    batches.put((tag, dirpath, None, files))
+
+            def add_listing(self, tag, dirpath, subdirs, files):
+                batches.put((tag, dirpath, subdirs, files))
+
+        def produce():
+            try:
+                self.run(roots, _QueueSink, listings)
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                batches.put(done)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is done:
+                    break
+                walk_stage.items += len(item[3])
+                walk_stage.bytes += sum(st.st_size for name, st in item[3])
+                yield item
+        finally:
+            self.stop()
+            producer.join()
+        if failure:
+            raise failure[0]
+
+    def _should_stop(self) -> bool:
+        return self._stopped.is_set() or (self.cancel is not None and self.cancel.is_set())
+
+    def _next_item(self, index: int) -> Optional[Tuple[object, str, Optional[ProtectedNode]]]:
+        try:
+            return self._queues[index].pop()
+        except IndexError:
+            pass
+        for offset in range(1, self.workers):
+            try:
+                return self._queues[(index + offset) % self.workers].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _work(self, index: int, accumulator, stats: WalkStats):
+        local = self._queues[index]
+        while not self._should_stop():
+            item = self._next_item(index)
+            if item is None:
+                with self._cond:
+                    if not self._pending:
+                        self._cond.notify_all()
+                        return
+                    self._cond.wait(0.01)
+                continue
+            tag, dirpath, node = item
+            children: List[Tuple[str, Optional[ProtectedNode]]] = []
+            try:
+                stat_calls = stats.stat_calls
+                subdirs, files = self.lister(dirpath, stats)
+                if self.throttle is not None:
+                    self.throttle.scan(1 + stats.stat_calls - stat_calls, self._should_stop)
+                if node is None:
+                    children = [(d, None) for d in subdirs]
+                else:
+                    children, files = prune_protected(node, subdirs, files)
+                _count_files(stats, files)
+                if self._listings:
+                    accumulator.add_listing(tag, dirpath, [d for d, child in children], files)
+                else:
+                    accumulator.add_files(tag, dirpath, files)
+            except Exception as e:
+                # Keep draining so the other workers can terminate; run() re-raises
+                self._error = self._error or e
+                children = []
+            # Count the new directories before publishing them, so the counter
+            # can never reach zero while work is still being handed out
+            with self._cond:
+                self._pending += len(children) - 1
+                if not self._pending:
+                    self._cond.notify_all()
+            if children:
+                local.extend((tag, d, child) for d, child in children)
+                if self.workers > 1:
+                    with self._cond:
+                        self._cond.notify_all()
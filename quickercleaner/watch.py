@@ -0,0 +1,525 @@
+import ctypes
+import ctypes.util
+import errno
+import heapq
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from quickercleaner.candidates import CandidateStore
+from quickercleaner.cleaner import CleanupPlan, CleanupResult, DiskCleaner
+from quickercleaner.progress import CancellationToken
+from quickercleaner.walker import SECONDS_PER_DAY, WalkStats, list_dir, prune_protected
+
+WATCH_BACKENDS = ('auto', 'inotify', 'poll')
+
+logger = logging.getLogger("QuickerCleaner")
+
+class _Dir:
+    __slots__ = ('category', 'files', 'subdirs')
+
+    def __init__(self, category: str):
+        self.category = category
+        # name -> (size, mtime, file category, counted in the totals)
+        self.files: Dict[str, Tuple[int, float, str, bool]] = {}
+        self.subdirs: Set[str] = set()
+
+class CandidateModel:
+    """The cleanup candidates below the targets, kept current one directory at a time
+
+    Every file the rules could ever clean (see DiskCleaner.rule_category) is
+    tracked per directory with its size and mtime. Files already older than
+    min_age_days count towards the totals; younger ones wait in a heap keyed
+    by the moment they come of age, and advance() promotes them, so the totals
+    stay exact as files age without anything being listed again. total_size,
+    total_files and totals() are therefore lookups, not traversals. A file
+    that changes again before it is due leaves a stale heap entry behind; the
+    heap is rebuilt from the tracked files once stale entries outnumber live
+    ones, so its size follows the number of files, not of changes.
+
+    rescan() replaces what is known about one directory with a fresh listing;
+    the caller decides which directories need it (WatchDaemon).
+    """
+    def __init__(self, cleaner: DiskCleaner, lister: Callable = list_dir):
+        self.cleaner = cleaner
+        self.lister = lister
+        self.stats = WalkStats()
+        self.total_size = 0
+        self.total_files = 0
+        self._dirs: Dict[str, _Dir] = {}
+        self._totals: Dict[str, List[int]] = {}
+        # (due time, dirpath, name, mtime) of files not yet old enough
+        self._maturing: List[Tuple[float, str, str, float]] = []
+        # Tracked files not yet counted: the live entries of _maturing
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def category(self, dirpath: str) -> Optional[str]:
+        """Cleanup category of a tracked directory, or None if it is not tracked"""
+        entry = self._dirs.get(dirpath)
+        return entry.category if entry is not None else None
+
+    def __contains__(self, dirpath: str) -> bool:
+        return dirpath in self._dirs
+
+    def __len__(self) -> int:
+        return len(self._dirs)
+
+    def totals(self) -> Dict[str, Dict[str, int]]:
+        """{category: {'size': ..., 'files': ...}} of the files cleanable right now"""
+        with self._lock:
+            return {category: {'size': size, 'files': files} for category, (size, files) in self._totals.items() if files}
+
+    def rescan(self, category: str, dirpath: str, now: float, every_subdir: bool = False) -> Tuple[List[str], List[str]]:
+        """List one directory again; returns (subdirectories to visit, directories no longer there)
+
+        The subdirectories to visit are the ones not tracked yet, or with
+        every_subdir all of them, for a caller that has to re-list a whole
+        tree because it may have missed changes anywhere in it.
+        """
+        node = self.cleaner.protected_trie.node_for(dirpath)
+        if node is not None and node.protected:
+            subdirs, files = [], []
+        else:
+            subdirs, files = self.lister(dirpath, self.stats)
+            if node is not None:
+                children, files = prune_protected(node, subdirs, files)
+                subdirs = [d for d, child in children]
+        cutoff = self.cleaner.min_age_days * SECONDS_PER_DAY
+        with self._lock:
+            entry = self._dirs.get(dirpath)
+            if entry is None:
+                entry = self._dirs[dirpath] = _Dir(category)
+            old_files, entry.files = entry.files, {}
+            for size, mtime, file_category, counted in old_files.values():
+                if counted:
+                    self._count(entry.category, -size, -1)
+                else:
+                    self._waiting -= 1
+            for name, st in files:
+                file_category = self.cleaner.rule_category(name, st)
+                if file_category is None:
+                    continue
+                due = st.st_mtime + cutoff
+                counted = due <= now
+                if counted:
+                    self._count(entry.category, st.st_size, 1)
+                else:
+                    self._waiting += 1
+                    previous = old_files.get(name)
+                    # Already waiting in the heap unless its mtime changed
+                    if previous is None or previous[1] != st.st_mtime:
+                        heapq.heappush(self._maturing, (due, dirpath, name, st.st_mtime))
+                entry.files[name] = (st.st_size, st.st_mtime, file_category, counted)
+            new_subdirs = set(subdirs)
+            if every_subdir:
+                added = list(subdirs)
+            else:
+                added = [d for d in subdirs if d not in entry.subdirs and d not in self._dirs]
+            removed = []
+            for d in entry.subdirs - new_subdirs:
+                removed.extend(self._forget(d))
+            entry.subdirs = new_subdirs
+            if len(self._maturing) > 2 * self._waiting + 1024:
+                self._rebuild_maturing()
+        return added, removed
+
+    def _rebuild_maturing(self):
+        cutoff = self.cleaner.min_age_days * SECONDS_PER_DAY
+        self._maturing = [
+            (mtime + cutoff, dirpath, name, mtime)
+            for dirpath, entry in self._dirs.items()
+            for name, (size, mtime, file_category, counted) in entry.files.items()
+            if not counted
+        ]
+        heapq.heapify(self._maturing)
+
+    def _forget(self, dirpath: str) -> List[str]:
+        dropped = []
+        stack = [dirpath]
+        while stack:
+            path = stack.pop()
+            entry = self._dirs.pop(path, None)
+            if entry is None:
+                continue
+            dropped.append(path)
+            for size, mtime, file_category, counted in entry.files.values():
+                if counted:
+                    self._count(entry.category, -size, -1)
+                else:
+                    self._waiting -= 1
+            stack.extend(entry.subdirs)
+        return dropped
+
+    def advance(self, now: float) -> int:
+        """Count the files that have come of age since the last call; returns how many"""
+        promoted = 0
+        with self._lock:
+            maturing = self._maturing
+            while maturing and maturing[0][0] <= now:
+                due, dirpath, name, mtime = heapq.heappop(maturing)
+                entry = self._dirs.get(dirpath)
+                info = entry.files.get(name) if entry is not None else None
+                # Stale if the file went away or changed since it was queued
+                if info is None or info[3] or info[1] != mtime:
+                    continue
+                entry.files[name] = info[:3] + (True,)
+                self._waiting -= 1
+                self._count(entry.category, info[0], 1)
+                promoted += 1
+        return promoted
+
+    def plan(self, drive: str, now: float) -> CleanupPlan:
+        """A CleanupPlan of every file cleanable right now; clean_drive revalidates each one"""
+        file_details: Dict[str, CandidateStore] = {}
+        with self._lock:
+            for dirpath, entry in self._dirs.items():
+                for name, (size, mtime, file_category, counted) in entry.files.items():
+                    if counted:
+                        store = file_details.get(entry.category)
+                        if store is None:
+                            store = file_details[entry.category] = CandidateStore(now)
+                        store.add(dirpath, name, size, mtime, file_category)
+        return CleanupPlan(drive, now, file_details)
+
+    def _count(self, category: str, size: int, files: int):
+        totals = self._totals.get(category)
+        if totals is None:
+            totals = self._totals[category] = [0, 0]
+        totals[0] += size
+        totals[1] += files
+        self.total_size += size
+        self.total_files += files
+
+class PollingWatcher:
+    """Finds changed directories by comparing their mtime on every poll
+
+    Costs one stat per tracked directory per poll instead of a listing plus a
+    stat per file. Like the scan index it cannot see files rewritten in place,
+    since those leave the directory mtime alone; such files are still
+    revalidated before anything is removed.
+    """
+    name = 'poll'
+
+    def __init__(self):
+        self._mtimes: Dict[str, Optional[int]] = {}
+
+    def add(self, dirpath: str):
+        try:
+            self._mtimes[dirpath] = os.stat(dirpath).st_mtime_ns
+        except OSError:
+            self._mtimes[dirpath] = None
+
+    def remove(self, dirpath: str):
+        self._mtimes.pop(dirpath, None)
+
+    def changed(self) -> Set[str]:
+        dirty = set()
+        for dirpath, mtime in self._mtimes.items():
+            try:
+                current: Optional[int] = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                self._mtimes[dirpath] = current
+                dirty.add(dirpath)
+        return dirty
+
+    def poll(self, timeout: float, cancel: threading.Event) -> Optional[Set[str]]:
+        """Wait up to timeout, then return the directories that changed"""
+        cancel.wait(timeout)
+        return self.changed()
+
+    def close(self):
+        self._mtimes.clear()
+
+# From <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+# No IN_MODIFY: a file being appended to would re-list its directory on
+# every write; IN_CLOSE_WRITE reports it once the writer is done
+_WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+               | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+_EVENT = struct.Struct('iIII')
+
+def _libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, 'inotify_init1') else None
+
+class InotifyWatcher:
+    """Linux inotify watches on every tracked directory
+
+    The kernel queues an event whenever an entry of a watched directory is
+    created, removed, renamed, closed after writing or touched, so an idle
+    tree costs nothing at all. Events are reduced to the set of directories
+    to re-list. Directories that cannot get a watch
+    (fs.inotify.max_user_watches exhausted) fall back to a PollingWatcher.
+    A queue overflow returns None: events were lost and everything must be
+    rescanned.
+    """
+    name = 'inotify'
+
+    def __init__(self):
+        self._libc = _libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        self._dirs: Dict[int, str] = {}
+        self._watches: Dict[str, int] = {}
+        self._fallback = PollingWatcher()
+        self._warned = False
+
+    @staticmethod
+    def available() -> bool:
+        return _libc() is not None
+
+    def add(self, dirpath: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), _WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code in (errno.ENOSPC, errno.ENOMEM):
+                if not self._warned:
+                    logger.warning("Out of inotify watches, polling the remaining directories "
+                                   "(raise fs.inotify.max_user_watches to avoid this)")
+                    self._warned = True
+                self._fallback.add(dirpath)
+            # Otherwise it vanished or is unreadable; its parent's listing will tell
+            return
+        self._dirs[wd] = dirpath
+        self._watches[dirpath] = wd
+
+    def remove(self, dirpath: str):
+        self._fallback.remove(dirpath)
+        wd = self._watches.pop(dirpath, None)
+        if wd is not None:
+            self._dirs.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def poll(self, timeout: float, cancel: threading.Event) -> Optional[Set[str]]:
+        """Wait up to timeout for events, then return the directories to re-list"""
+        deadline = time.monotonic() + timeout
+        # Short select slices keep the wait responsive to cancel
+        while not cancel.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([self._fd], [], [], min(remaining, 0.5))
+            if readable:
+                break
+        dirty = self._read()
+        if dirty is not None:
+            dirty |= self._fallback.changed()
+        return dirty
+
+    def _read(self) -> Optional[Set[str]]:
+        dirty: Set[str] = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                dirpath = self._dirs.get(wd)
+                if dirpath is None:
+                    continue
+                dirty.add(dirpath)
+                if mask & IN_IGNORED:
+                    # The kernel dropped the watch (directory deleted, replaced or
+                    # unmounted); re-listing it re-adds the watch if it is back
+                    del self._dirs[wd]
+                    if self._watches.get(dirpath) == wd:
+                        del self._watches[dirpath]
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    dirty.add(os.path.dirname(dirpath))
+        return None if overflow else dirty
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._fallback.close()
+
+def make_watcher(backend: str = 'auto'):
+    """An InotifyWatcher where available (or required), otherwise a PollingWatcher"""
+    if backend not in WATCH_BACKENDS:
+        raise ValueError(f"Unknown watch backend {backend!r}, expected one of {WATCH_BACKENDS}")
+    if backend == 'inotify' or (backend == 'auto' and InotifyWatcher.available()):
+        return InotifyWatcher()
+    return PollingWatcher()
+
+class WatchDaemon:
+    """Keeps a CandidateModel of the cleanup targets current and cleans when due
+
+    The targets are walked once at start, registering a watch on every
+    directory before listing it, so nothing created during the walk is
+    missed. After that only directories the watcher reports are listed again
+    (through the scan index when enabled, keeping it warm for --scan), and
+    "what is reclaimable right now" is reclaimable(), a lookup.
+
+    A cleanup runs every clean_interval seconds and/or as soon as the
+    reclaimable bytes or files reach clean_above_bytes / clean_above_files;
+    threshold cleanups are at least min_clean_gap seconds apart so a run that
+    frees nothing (dry run, locked files) is not repeated every poll. Each
+    cleanup executes a plan built from the model, so no traversal is needed;
+    clean_drive still revalidates every file on disk first.
+    """
+    def __init__(self, cleaner: DiskCleaner, drive: str, poll_seconds: float = 5.0,
+                 clean_interval: Optional[float] = None, clean_above_bytes: Optional[int] = None,
+                 clean_above_files: Optional[int] = None, backend: str = 'auto',
+                 on_clean: Optional[Callable[[CleanupResult], None]] = None, min_clean_gap: float = 60.0):
+        self.cleaner = cleaner
+        self.drive = drive
+        self.poll_seconds = poll_seconds
+        self.clean_interval = clean_interval or None
+        self.clean_above_bytes = clean_above_bytes or None
+        self.clean_above_files = clean_above_files or None
+        self.on_clean = on_clean
+        self.min_clean_gap = min_clean_gap
+        lister = cleaner.scan_index.refresh if cleaner.scan_index is not None else list_dir
+        self.model = CandidateModel(cleaner, lister)
+        self.watcher = make_watcher(backend)
+        self.cleanups = 0
+        self._next_clean: Optional[float] = None
+        self._last_clean = float('-inf')
+
+    def reclaimable(self) -> Dict:
+        """Bytes and files cleanable right now, overall and per category"""
+        return {
+            'total_size': self.model.total_size,
+            'total_files': self.model.total_files,
+            'categories': self.model.totals(),
+        }
+
+    def resync(self):
+        """List every directory of the cleanup targets again, e.g. after lost events
+
+        Uses the same roots as scan and clean (DiskCleaner._scan_roots), so
+        a directory reachable from two targets is tracked once.
+        """
+        now = time.time()
+        with self.cleaner.counters.phase('watch.sync'):
+            for category, root in self.cleaner._scan_roots():
+                self._sync(category, root, now, every_subdir=True)
+            self._commit_index()
+        self.model.advance(now)
+
+    def run(self, cancel: Optional[CancellationToken] = None):
+        """Watch and clean until cancel is set"""
+        cancel = cancel if cancel is not None else CancellationToken()
+        try:
+            self.resync()
+            logger.info(f"Watching {len(self.model)} directories with {self.watcher.name}: "
+                        f"{self.model.total_files} files, {self.model.total_size/1024/1024:.2f} MB reclaimable")
+            if self.clean_interval:
+                self._next_clean = time.monotonic() + self.clean_interval
+            while not cancel.is_set():
+                dirty = self.watcher.poll(self.poll_seconds, cancel)
+                if cancel.is_set():
+                    break
+                if dirty is None:
+                    logger.warning("Watch events were lost, rescanning the cleanup targets")
+                    self.resync()
+                else:
+                    self.update(dirty)
+                reason = self._clean_reason()
+                if reason:
+                    self.clean(reason, cancel)
+        finally:
+            self.watcher.close()
+
+    def update(self, dirty: Set[str]):
+        """Re-list the given directories and promote files that came of age"""
+        now = time.time()
+        if dirty:
+            with self.cleaner.counters.phase('watch.update'):
+                for dirpath in dirty:
+                    category = self.model.category(dirpath)
+                    if category is not None:
+                        self._sync(category, dirpath, now)
+                self._commit_index()
+        self.model.advance(now)
+
+    def clean(self, reason: str, cancel: Optional[CancellationToken] = None) -> CleanupResult:
+        """Clean everything reclaimable now, then re-list the directories touched"""
+        logger.info(f"Cleaning {self.model.total_files} files, {self.model.total_size/1024/1024:.2f} MB ({reason})")
+        now = time.time()
+        result = self.cleaner.clean_drive(self.drive, plan=self.model.plan(self.drive, now), cancel=cancel)
+        self.cleanups += 1
+        self._last_clean = time.monotonic()
+        if self.clean_interval:
+            self._next_clean = self._last_clean + self.clean_interval
+        # Don't wait for the watcher: the totals should drop as soon as the run ends
+        self.update({os.path.dirname(path) for path in result.target_paths})
+        logger.info(f"Cleaned {result.files_processed} files, freed {result.space_freed_bytes/1024/1024:.2f} MB "
+                    f"in {result.duration_seconds:.2f}s")
+        if self.on_clean is not None:
+            self.on_clean(result)
+        return result
+
+    def _clean_reason(self) -> Optional[str]:
+        now = time.monotonic()
+        if self._next_clean is not None and now >= self._next_clean:
+            self._next_clean = now + self.clean_interval
+            if self.model.total_files:
+                return 'schedule'
+        if not self.model.total_files:
+            return None
+        if now - self._last_clean < self.min_clean_gap:
+            return None
+        if self.clean_above_bytes is not None and self.model.total_size >= self.clean_above_bytes:
+            return 'size threshold'
+        if self.clean_above_files is not None and self.model.total_files >= self.clean_above_files:
+            return 'file threshold'
+        return None
+
+    def _sync(self, category: str, root: str, now: float, every_subdir: bool = False):
+        stack = [root]
+        while stack:
+            dirpath = stack.pop()
+            # Watch first, then list: a change made in between triggers a re-list
+            self.watcher.add(dirpath)
+            added, removed = self.model.rescan(category, dirpath, now, every_subdir)
+            for gone in removed:
+                self.watcher.remove(gone)
+            stack.extend(added)
+
+    def _commit_index(self):
+        if self.cleaner.scan_index is not None:
+            self.cleaner.scan_index.commit()
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from quickercleaner import cleaner as cleaner_module
+from quickercleaner.cleaner import DiskCleaner
+from quickercleaner.trash import TrashBackend
+
+@pytest.fixture
+def cleaner(tmp_path, monkeypatch):
+    """A DiskCleaner with default settings, no protected paths and no cleanup targets
+
+    Cleanups delete files instead of filling the user's recycle bin.
+    """
+    # State files (hash cache, scan index) land in the test's directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cleaner_module, 'TrashBackend', lambda use_recycle_bin=True: TrashBackend(False))
+    for key in list(os.environ):
+        if key.startswith('QUICK_CLEANER_'):
+            monkeypatch.delenv(key)
+    cleaner = DiskCleaner()
+    cleaner.protected_paths = []
+    cleaner.cleanup_targets = {}
+    cleaner.dry_run = False
+    return cleaner
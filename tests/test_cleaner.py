@@ -0,0 +1,100 @@
+import os
+import time
+
+import pytest
+
+from quickercleaner import cleaner as cleaner_module
+from quickercleaner.progress import CancellationToken
+
+OLD = time.time() - 400 * 86400
+
+def make_old_file(path, size=100):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    os.utime(path, (OLD, OLD))
+    return path
+
+def test_linked_token_follows_parent():
+    parent = CancellationToken()
+    child = CancellationToken(parent)
+    assert not child.is_set()
+    parent.cancel()
+    assert child.is_set() and child.cancelled
+
+def test_linked_token_leaves_parent_alone():
+    parent = CancellationToken()
+    child = CancellationToken(parent)
+    child.set()
+    assert child.is_set()
+    assert not parent.is_set()
+
+def test_deleter_failure_does_not_cancel_caller(tmp_path, cleaner, monkeypatch):
+    make_old_file(str(tmp_path / 'temp' / 'a.tmp'))
+    cleaner.cleanup_targets = {'temp_files': [str(tmp_path / 'temp')]}
+
+    class BrokenBackend:
+        def __init__(self, use_recycle_bin=True):
+            raise OSError('no recycle bin')
+    monkeypatch.setattr(cleaner_module, 'TrashBackend', BrokenBackend)
+    cancel = CancellationToken()
+    with pytest.raises(OSError):
+        cleaner.clean_drive('C:', cancel=cancel)
+    assert not cancel.is_set()
+
+def test_cancelled_before_start(tmp_path, cleaner):
+    path = make_old_file(str(tmp_path / 'temp' / 'a.tmp'))
+    cleaner.cleanup_targets = {'temp_files': [str(tmp_path / 'temp')]}
+    cancel = CancellationToken()
+    cancel.cancel()
+    result = cleaner.clean_drive('C:', cancel=cancel)
+    assert result.cancelled
+    assert result.files_processed == 0
+    assert os.path.exists(path)
+
+def make_plan(tmp_path, cleaner, names):
+    paths = [make_old_file(str(tmp_path / 'temp' / name)) for name in names]
+    cleaner.cleanup_targets = {'temp_files': [str(tmp_path / 'temp')]}
+    plan = cleaner.scan_drive('C:', make_plan=True)['plan']
+    assert plan.total_files == len(names)
+    return paths, plan
+
+def test_plan_removes_unchanged_files(tmp_path, cleaner):
+    paths, plan = make_plan(tmp_path, cleaner, ['a.tmp', 'b.tmp'])
+    result = cleaner.clean_drive('C:', plan=plan)
+    assert result.files_processed == 2
+    assert result.space_freed_bytes == 200
+    assert result.files_skipped == 0
+    assert not any(os.path.exists(path) for path in paths)
+
+def test_plan_skips_files_changed_since_scan(tmp_path, cleaner):
+    paths, plan = make_plan(tmp_path, cleaner, ['a.tmp', 'grown.tmp', 'touched.tmp', 'gone.tmp'])
+    with open(paths[1], 'ab') as f:
+        f.write(b'more')
+    os.utime(paths[1], (OLD, OLD))
+    os.utime(paths[2], (OLD - 86400, OLD - 86400))
+    os.remove(paths[3])
+    result = cleaner.clean_drive('C:', plan=plan)
+    assert result.files_processed == 1
+    assert result.space_freed_bytes == 100
+    assert result.files_skipped == 3
+    assert not os.path.exists(paths[0])
+    assert os.path.getsize(paths[1]) == 104
+    assert os.path.exists(paths[2])
+
+def test_plan_skips_files_protected_since_scan(tmp_path, cleaner):
+    paths, plan = make_plan(tmp_path, cleaner, ['a.tmp', os.path.join('keep', 'b.tmp')])
+    cleaner.protected_paths = [str(tmp_path / 'temp' / 'keep')]
+    result = cleaner.clean_drive('C:', plan=plan)
+    assert result.files_processed == 1
+    assert result.files_skipped == 1
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[1])
+
+def test_plan_rechecks_age(tmp_path, cleaner):
+    paths, plan = make_plan(tmp_path, cleaner, ['a.tmp'])
+    cleaner.min_age_days = 1000
+    result = cleaner.clean_drive('C:', plan=plan)
+    assert result.files_processed == 0
+    assert result.files_skipped == 1
+    assert os.path.exists(paths[0])
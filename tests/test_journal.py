@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+from quickercleaner.journal import CleanupJournal
+
+ROOTS = [('temp_files', '/r')]
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'cleanup.journal')
+
+def test_no_journal(path):
+    assert CleanupJournal(path).unfinished() is None
+
+def test_finished_run(path):
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.intent(0, [('/r/a', 1, 'temp_files')])
+    journal.done(0, 1, 1, [])
+    journal.walked()
+    journal.end(1, 1, 0)
+    journal.close()
+    assert CleanupJournal(path).unfinished() is None
+
+def test_pending_batches_and_totals(path):
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.intent(0, [('/r/a', 10, 'temp_files'), ('/r/b', 20, 'temp_files')])
+    journal.intent(1, [('/r/c', 30, 'temp_files')])
+    journal.done(0, 1, 10, [['/r/b', 'denied']])
+    journal.close()
+    state = CleanupJournal(path).unfinished()
+    assert state.drive == 'C:'
+    assert state.roots == ROOTS
+    assert state.pending == {1: [('/r/c', 30, 'temp_files')]}
+    assert state.next_seq == 2
+    assert (state.files, state.bytes, state.failed) == (1, 10, 1)
+    assert not state.walked
+
+def test_skip_drops_entries_from_pending(path):
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.intent(0, [('/r/a', 1, 'temp_files'), ('/r/b', 2, 'temp_files')])
+    journal.skipped(0, ['/r/a'])
+    journal.close()
+    assert CleanupJournal(path).unfinished().pending == {0: [('/r/b', 2, 'temp_files')]}
+
+def test_frontier_follows_listed_directories(path):
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.listed('/r', ['/r/x', '/r/y'], 0)
+    journal.listed('/r/x', [], 0)
+    journal.close()
+    state = CleanupJournal(path).unfinished()
+    assert sorted(state.frontier) == [('temp_files', os.path.join('/r', 'y'))]
+
+def test_dir_record_waits_for_its_candidates(path):
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.listed('/r', ['/r/x'], 2)
+    journal._file.flush()
+    # Its two candidates are not journaled yet, so /r must still be walked
+    assert CleanupJournal(path).unfinished().frontier == ROOTS
+    journal.intent(0, [('/r/a', 1, 'temp_files'), ('/r/b', 1, 'temp_files')])
+    journal.close()
+    assert CleanupJournal(path).unfinished().frontier == [('temp_files', os.path.join('/r', 'x'))]
+
+def test_walked_clears_frontier(path):
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.intent(0, [('/r/a', 1, 'temp_files')])
+    journal.walked()
+    journal.close()
+    state = CleanupJournal(path).unfinished()
+    assert state.walked
+    assert state.frontier == []
+    assert 0 in state.pending
+
+def test_truncated_last_line_is_ignored(path):
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.intent(0, [('/r/a', 1, 'temp_files')])
+    journal.close()
+    with open(path, 'a') as f:
+        f.write('["done",0,1,')
+    state = CleanupJournal(path).unfinished()
+    assert state.pending == {0: [('/r/a', 1, 'temp_files')]}
+    assert state.files == 0
+
+def test_resume_after_truncated_line(path):
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.intent(0, [('/r/a', 1, 'temp_files')])
+    journal.intent(1, [('/r/b', 2, 'temp_files')])
+    journal.close()
+    with open(path, 'a') as f:
+        f.write('["done",0,1,')
+
+    state = CleanupJournal(path).unfinished()
+    journal = CleanupJournal(path)
+    journal.begin('C:', state.roots, state)
+    journal.done(0, 1, 1, [])
+    journal.intent(2, [('/r/c', 3, 'temp_files')])
+    journal.close()
+
+    resumed = CleanupJournal(path).unfinished()
+    assert resumed.started == state.started
+    assert resumed.pending == {1: [('/r/b', 2, 'temp_files')], 2: [('/r/c', 3, 'temp_files')]}
+    assert resumed.next_seq == 3
+    assert resumed.files == 1
+
+def test_new_run_replaces_unfinished_one(path):
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.intent(0, [('/r/a', 1, 'temp_files')])
+    journal.close()
+    journal = CleanupJournal(path)
+    journal.begin('D:', [('cache_files', '/c')])
+    journal.close()
+    state = CleanupJournal(path).unfinished()
+    assert state.drive == 'D:'
+    assert state.pending == {}
+    assert state.frontier == [('cache_files', '/c')]
+
+def test_undecodable_names_round_trip(path):
+    name = os.fsdecode(b'/r/\xff.tmp')
+    journal = CleanupJournal(path)
+    journal.begin('C:', ROOTS)
+    journal.intent(0, [(name, 1, 'temp_files')])
+    journal.close()
+    assert CleanupJournal(path).unfinished().pending[0][0][0] == name
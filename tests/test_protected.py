@@ -0,0 +1,98 @@
+import os
+
+from quickercleaner import walker
+from quickercleaner.protected import ProtectedPathTrie, path_components
+from quickercleaner.walker import ParallelWalker, iter_files, list_dir
+
+def make_tree(root, paths):
+    for path in paths:
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, 'wb') as f:
+            f.write(b'x')
+
+def test_path_components():
+    assert path_components('/a/b/../c/') == [os.sep, 'a', 'c']
+
+def test_matches_whole_components(tmp_path):
+    temp = str(tmp_path / 'Temp')
+    trie = ProtectedPathTrie([temp])
+    assert trie.is_protected(temp)
+    assert trie.is_protected(temp + os.sep)
+    assert trie.is_protected(os.path.join(temp, 'a', 'b.tmp'))
+    assert not trie.is_protected(str(tmp_path / 'Temp2'))
+    assert not trie.is_protected(str(tmp_path / 'Temp2' / 'a.tmp'))
+    assert not trie.is_protected(str(tmp_path / 'Tem'))
+    assert not trie.is_protected(str(tmp_path))
+
+def test_normalises_protected_paths(tmp_path):
+    trie = ProtectedPathTrie([str(tmp_path / 'a' / '..' / 'keep') + os.sep, ''])
+    assert trie.is_protected(str(tmp_path / 'keep' / 'f'))
+    assert not trie.is_protected(str(tmp_path / 'a' / 'f'))
+
+def test_symlinked_protected_path(tmp_path):
+    (tmp_path / 'real').mkdir()
+    os.symlink(str(tmp_path / 'real'), str(tmp_path / 'link'))
+    trie = ProtectedPathTrie([str(tmp_path / 'link')])
+    assert trie.is_protected(str(tmp_path / 'real' / 'f'))
+    assert trie.is_protected(str(tmp_path / 'link' / 'f'))
+
+def test_node_for(tmp_path):
+    trie = ProtectedPathTrie([str(tmp_path / 'a' / 'keep')])
+    assert trie.node_for(str(tmp_path / 'b')) is None
+    node = trie.node_for(str(tmp_path / 'a'))
+    assert node is not None and not node.protected
+    assert node.child('keep').protected
+    assert node.child('keep2') is None
+    assert trie.node_for(str(tmp_path / 'a' / 'keep' / 'sub')).protected
+
+def recording_lister(listed):
+    def lister(dirpath, stats=None):
+        listed.append(dirpath)
+        return list_dir(dirpath, stats)
+    return lister
+
+TREE = ['keep/a.tmp', 'keep/sub/b.tmp', 'keep2/c.tmp', 'other/keep/d.tmp', 'e.tmp', 'secret.tmp']
+
+def test_iter_files_never_lists_protected_subtrees(tmp_path, monkeypatch):
+    make_tree(str(tmp_path), TREE)
+    trie = ProtectedPathTrie([str(tmp_path / 'keep'), str(tmp_path / 'secret.tmp')])
+    listed = []
+    monkeypatch.setattr(walker, 'list_dir', recording_lister(listed))
+    found = sorted(os.path.relpath(os.path.join(d, name), str(tmp_path))
+                   for d, name, st in iter_files(str(tmp_path), protected=trie))
+    assert found == sorted(os.path.normpath(p) for p in ['keep2/c.tmp', 'other/keep/d.tmp', 'e.tmp'])
+    assert not any(trie.is_protected(d) for d in listed)
+
+def test_iter_files_inside_protected_root(tmp_path, monkeypatch):
+    make_tree(str(tmp_path), TREE)
+    listed = []
+    monkeypatch.setattr(walker, 'list_dir', recording_lister(listed))
+    trie = ProtectedPathTrie([str(tmp_path / 'keep')])
+    assert list(iter_files(str(tmp_path / 'keep' / 'sub'), protected=trie)) == []
+    assert listed == []
+
+def test_parallel_walker_never_lists_protected_subtrees(tmp_path):
+    make_tree(str(tmp_path), TREE)
+    trie = ProtectedPathTrie([str(tmp_path / 'keep'), str(tmp_path / 'secret.tmp'), str(tmp_path / 'other')])
+    listed = []
+    walk = ParallelWalker(3, recording_lister(listed), protected=trie)
+    found = sorted(os.path.relpath(os.path.join(d, name), str(tmp_path))
+                   for tag, d, name, st in walk.iter_files([('t', str(tmp_path)), ('t', str(tmp_path / 'other'))]))
+    assert found == sorted(os.path.normpath(p) for p in ['keep2/c.tmp', 'e.tmp'])
+    assert not any(trie.is_protected(d) for d in listed)
+    assert sorted(listed) == sorted([str(tmp_path), str(tmp_path / 'keep2')])
+
+def test_cleaner_skips_protected_files(tmp_path, cleaner):
+    make_tree(str(tmp_path), TREE)
+    old = 0
+    for path in TREE:
+        os.utime(os.path.join(str(tmp_path), path), (old, old))
+    cleaner.cleanup_targets = {'temp_files': [str(tmp_path)]}
+    cleaner.protected_paths = [str(tmp_path / 'keep'), str(tmp_path / 'secret.tmp')]
+    assert cleaner.is_protected(str(tmp_path / 'keep' / 'a.tmp'))
+    assert not cleaner.is_protected(str(tmp_path / 'keep2' / 'c.tmp'))
+    result = cleaner.clean_drive('C:')
+    assert result.files_processed == 3
+    for path in ['keep/a.tmp', 'keep/sub/b.tmp', 'secret.tmp']:
+        assert os.path.exists(os.path.join(str(tmp_path), path))
@@ -0,0 +1,207 @@
+import errno
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from quickercleaner import relocate
+from quickercleaner.relocate import Relocator, copy_fd, prepare_target, relocated_path
+
+def make_file(path, data=b'data'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+@pytest.fixture
+def target(tmp_path):
+    return prepare_target(str(tmp_path / 'moved'))
+
+def test_relocated_path_keeps_directory_structure(tmp_path):
+    src = str(tmp_path / 'a' / 'b.tmp')
+    dest = relocated_path(src, '/target')
+    assert dest.startswith('/target' + os.sep)
+    assert dest.endswith(os.path.join('a', 'b.tmp'))
+    assert src.lstrip(os.sep) in dest
+
+def test_prepare_target_creates_directory(tmp_path):
+    target = prepare_target(str(tmp_path / 'x' / 'y'))
+    assert os.path.isdir(target)
+    assert os.path.isabs(target)
+
+def test_prepare_target_rejects_a_file(tmp_path):
+    path = make_file(str(tmp_path / 'file'))
+    with pytest.raises(OSError):
+        prepare_target(path)
+
+def test_same_device_rename(tmp_path, target):
+    src = make_file(str(tmp_path / 'src' / 'a.tmp'), b'hello')
+    assert Relocator(target).remove([src]) == [None]
+    assert not os.path.exists(src)
+    assert read(relocated_path(src, target)) == b'hello'
+
+def test_cross_device_copy(tmp_path, target):
+    data = os.urandom(300000)
+    srcs = [make_file(str(tmp_path / 'src' / f'{i}.tmp'), data) for i in range(3)]
+    mtime = os.stat(srcs[0]).st_mtime_ns - 10 ** 9
+    os.utime(srcs[0], ns=(mtime, mtime))
+    relocator = Relocator(target)
+    relocator._target_dev = -1
+    assert relocator.remove(srcs) == [None] * 3
+    for src in srcs:
+        assert not os.path.exists(src)
+        assert read(relocated_path(src, target)) == data
+    assert os.stat(relocated_path(srcs[0], target)).st_mtime_ns == mtime
+
+def test_rename_exdev_falls_back_to_copy(tmp_path, target, monkeypatch):
+    src = make_file(str(tmp_path / 'src' / 'a.tmp'), b'hello')
+
+    def rename(a, b):
+        raise OSError(errno.EXDEV, 'Invalid cross-device link')
+    monkeypatch.setattr(os, 'rename', rename)
+    assert Relocator(target).remove([src]) == [None]
+    assert not os.path.exists(src)
+    assert read(relocated_path(src, target)) == b'hello'
+
+@pytest.mark.parametrize('cross_device', [False, True])
+def test_name_collision_leaves_both_files(tmp_path, target, cross_device):
+    src = make_file(str(tmp_path / 'src' / 'a.tmp'), b'new')
+    dest = make_file(relocated_path(src, target), b'old')
+    other = make_file(str(tmp_path / 'src' / 'b.tmp'), b'other')
+    relocator = Relocator(target)
+    if cross_device:
+        relocator._target_dev = -1
+    errors = relocator.remove([src, other])
+    assert isinstance(errors[0], FileExistsError)
+    assert errors[1] is None
+    assert read(src) == b'new'
+    assert read(dest) == b'old'
+    # The rest of the batch still goes
+    assert not os.path.exists(other)
+    assert read(relocated_path(other, target)) == b'other'
+
+def copy(tmp_path, data, size):
+    src = make_file(str(tmp_path / 'src'), data)
+    dst = str(tmp_path / 'dst')
+    src_fd = os.open(src, os.O_RDONLY)
+    dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT)
+    try:
+        copy_fd(src_fd, dst_fd, size)
+    finally:
+        os.close(src_fd)
+        os.close(dst_fd)
+    return read(dst)
+
+def test_copy_fd_copies_everything(tmp_path):
+    data = os.urandom(100000)
+    assert copy(tmp_path, data, len(data)) == data
+
+def test_copy_fd_raises_when_source_ends_early(tmp_path):
+    with pytest.raises(OSError) as e:
+        copy(tmp_path, b'x' * 1000, 2000)
+    assert e.value.errno == errno.EIO
+
+def test_copy_fd_fallback_raises_when_source_ends_early(tmp_path, monkeypatch):
+    monkeypatch.delattr(os, 'copy_file_range', raising=False)
+    monkeypatch.delattr(os, 'sendfile', raising=False)
+    data = os.urandom(1000)
+    assert copy(tmp_path, data, len(data)) == data
+    with pytest.raises(OSError) as e:
+        copy(tmp_path, data, 2000)
+    assert e.value.errno == errno.EIO
+
+def test_copy_fd_zero_from_copy_file_range_falls_through(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, 'copy_file_range', lambda *args: 0, raising=False)
+    data = os.urandom(1000)
+    assert copy(tmp_path, data, len(data)) == data
+
+def test_short_copy_keeps_source(tmp_path, target, monkeypatch):
+    src = make_file(str(tmp_path / 'src' / 'a.tmp'), b'x' * 1000)
+    real_fstat = os.fstat
+
+    def fstat(fd):
+        # The file shrinks between the stat and the copy
+        return SimpleNamespace(st_size=real_fstat(fd).st_size + 500)
+    monkeypatch.setattr(relocate.os, 'fstat', fstat)
+    relocator = Relocator(target)
+    relocator._target_dev = -1
+    error, = relocator.remove([src])
+    assert isinstance(error, OSError)
+    assert read(src) == b'x' * 1000
+    assert not os.path.exists(relocated_path(src, target))
+
+def make_old_files(directory, names, size=100):
+    old = time.time() - 400 * 86400
+    paths = [make_file(os.path.join(directory, name), b'x' * size) for name in names]
+    for path in paths:
+        os.utime(path, (old, old))
+    return paths
+
+real_init = Relocator.__init__
+
+def cross_device_init(self, target):
+    real_init(self, target)
+    self._target_dev = -1
+
+@pytest.mark.parametrize('cross_device', [False, True])
+def test_clean_drive_reports_collisions_per_file(tmp_path, cleaner, monkeypatch, cross_device):
+    srcs = make_old_files(str(tmp_path / 'temp'), [f'{i}.tmp' for i in range(5)])
+    cleaner.cleanup_targets = {'temp_files': [str(tmp_path / 'temp')]}
+    cleaner.move_target = str(tmp_path / 'moved')
+    target = prepare_target(cleaner.move_target)
+    make_file(relocated_path(srcs[2], target), b'old')
+    if cross_device:
+        monkeypatch.setattr(Relocator, '__init__', cross_device_init)
+    result = cleaner.clean_drive('C:')
+    assert result.files_processed == 4
+    assert result.space_freed_bytes == 400
+    assert result.files_skipped == 0
+    assert len(result.errors) == 1 and srcs[2] in result.errors[0]
+    assert sorted(result.target_paths) == sorted(srcs[:2] + srcs[3:])
+    assert os.listdir(str(tmp_path / 'temp')) == ['2.tmp']
+    for src in srcs[:2] + srcs[3:]:
+        assert read(relocated_path(src, target)) == b'x' * 100
+
+def test_failed_fsync_discards_only_that_copy(tmp_path, target, monkeypatch):
+    srcs = [make_file(str(tmp_path / 'src' / f'{i}.tmp'), b'data') for i in range(3)]
+    relocator = Relocator(target)
+    relocator._target_dev = -1
+    real_fsync = os.fsync
+    calls = []
+
+    def fsync(fd):
+        calls.append(fd)
+        if len(calls) == 2:
+            raise OSError(errno.EIO, 'I/O error')
+        real_fsync(fd)
+    monkeypatch.setattr(os, 'fsync', fsync)
+    errors = relocator.remove(srcs)
+    assert errors[0] is None and errors[2] is None
+    assert isinstance(errors[1], OSError)
+    assert read(srcs[1]) == b'data'
+    assert not os.path.exists(relocated_path(srcs[1], target))
+    for src in (srcs[0], srcs[2]):
+        assert not os.path.exists(src)
+        assert read(relocated_path(src, target)) == b'data'
+
+def test_source_that_cannot_be_removed_keeps_no_copy(tmp_path, target, monkeypatch):
+    srcs = [make_file(str(tmp_path / 'src' / f'{i}.tmp'), b'data') for i in range(2)]
+    relocator = Relocator(target)
+    relocator._target_dev = -1
+    real_remove = os.remove
+
+    def remove(path):
+        if path == srcs[0]:
+            raise PermissionError(errno.EACCES, 'Access denied', path)
+        real_remove(path)
+    monkeypatch.setattr(os, 'remove', remove)
+    errors = relocator.remove(srcs)
+    assert isinstance(errors[0], PermissionError) and errors[1] is None
+    assert read(srcs[0]) == b'data'
+    assert not os.path.exists(relocated_path(srcs[0], target))
+    assert read(relocated_path(srcs[1], target)) == b'data'
@@ -0,0 +1,123 @@
+import csv
+import gzip
+import io
+import json
+import os
+
+import pytest
+
+from quickercleaner.report import CSV_COLUMNS, ReportWriter, report_format
+
+NOW = 1700000000.0
+
+class Stat:
+    def __init__(self, size, mtime):
+        self.st_size = size
+        self.st_mtime = mtime
+
+CANDIDATES = [
+    ('/tmp/a', 'x.tmp', Stat(10, NOW - 3 * 86400), 'temp'),
+    ('/tmp/a', 'y "q".log', Stat(20, NOW - 86400), 'log'),
+]
+OUTCOMES = [
+    ('temp_files', '/tmp/a/x.tmp', 10, 'removed', None),
+    ('temp_files', '/tmp/a/gone.tmp', None, 'skipped', None),
+    ('temp_files', '/tmp/a/y "q".log', 20, 'failed', 'Access denied'),
+]
+SUMMARY = {
+    'drive': 'C:', 'files': 1, 'bytes': 10, 'cancelled': False,
+    'errors': {'total': 1}, 'categories': {'temp_files': {'files': 1, 'bytes': 10}},
+}
+
+def write(path, **kwargs):
+    with ReportWriter(path, **kwargs) as report:
+        report.add_candidates('temp_files', CANDIDATES, NOW)
+        report.add_outcomes(OUTCOMES)
+        report.write_summary(SUMMARY)
+    return report
+
+def read_ndjson(data):
+    return [json.loads(line) for line in data.decode('ascii').splitlines()]
+
+def read_csv(data):
+    return list(csv.reader(io.StringIO(data.decode('utf-8'))))
+
+@pytest.mark.parametrize('path, fmt', [
+    ('r.ndjson', 'ndjson'), ('r.json', 'ndjson'), ('r.csv', 'csv'), ('r.csv.gz', 'csv'), ('r.ndjson.gz', 'ndjson'),
+])
+def test_report_format(path, fmt):
+    assert report_format(path) == fmt
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        ReportWriter(str(tmp_path / 'r.txt'), fmt='xml')
+
+def test_ndjson(tmp_path):
+    path = str(tmp_path / 'r.ndjson')
+    report = write(path)
+    with open(path, 'rb') as f:
+        records = read_ndjson(f.read())
+    # The summary is not a file record
+    assert report.records == 5
+    assert len(records) == 6
+    assert records[0] == {'record': 'file', 'category': 'temp_files', 'file_category': 'temp',
+                          'path': os.path.join('/tmp/a', 'x.tmp'), 'size': 10,
+                          'mtime': NOW - 3 * 86400, 'age_days': 3}
+    assert records[1]['path'] == os.path.join('/tmp/a', 'y "q".log')
+    assert records[3] == {'record': 'file', 'category': 'temp_files', 'path': '/tmp/a/gone.tmp',
+                          'size': None, 'status': 'skipped', 'error': None}
+    assert records[4]['error'] == 'Access denied'
+    summary = records[-1]
+    assert summary.pop('record') == 'summary'
+    assert summary == SUMMARY
+
+def test_csv(tmp_path):
+    path = str(tmp_path / 'r.csv')
+    report = write(path)
+    with open(path, 'rb') as f:
+        rows = read_csv(f.read())
+    assert rows[0] == list(CSV_COLUMNS)
+    assert report.records == 5
+    assert len(rows) == 1 + 2 + 3 + 2
+    assert rows[1] == ['file', 'temp_files', 'temp', os.path.join('/tmp/a', 'x.tmp'), '10',
+                       repr(NOW - 3 * 86400), '3', '', '', '1']
+    assert rows[2][3] == os.path.join('/tmp/a', 'y "q".log')
+    assert rows[4] == ['file', 'temp_files', '', '/tmp/a/gone.tmp', '', '', '', 'skipped', '', '1']
+    assert rows[5][7:9] == ['failed', 'Access denied']
+    assert rows[6] == ['summary', 'temp_files', '', '', '10', '', '', 'complete', '', '1']
+    assert rows[7] == ['summary', '', '', 'C:', '10', '', '', 'complete', '1', '1']
+
+@pytest.mark.parametrize('name, reader', [('r.ndjson.gz', read_ndjson), ('r.csv.gz', read_csv)])
+def test_gzip(tmp_path, name, reader):
+    path = str(tmp_path / name)
+    write(path)
+    with gzip.open(path, 'rb') as f:
+        compressed = reader(f.read())
+    plain = str(tmp_path / name[:-3])
+    write(plain)
+    with open(plain, 'rb') as f:
+        assert compressed == reader(f.read())
+
+def test_gzip_is_reproducible(tmp_path):
+    first, second = str(tmp_path / 'a.csv.gz'), str(tmp_path / 'b.csv.gz')
+    write(first)
+    write(second)
+    with open(first, 'rb') as a, open(second, 'rb') as b:
+        assert a.read() == b.read()
+
+def test_undecodable_names(tmp_path):
+    name = os.fsdecode(b'\xff.tmp')
+    files = [('/tmp', name, Stat(1, NOW), 'temp')]
+    ndjson, csv_path = str(tmp_path / 'r.ndjson'), str(tmp_path / 'r.csv')
+    for path in (ndjson, csv_path):
+        with ReportWriter(path) as report:
+            report.add_candidates('temp_files', files, NOW)
+    with open(ndjson, 'rb') as f:
+        assert json.loads(f.read())['path'] == os.path.join('/tmp', name)
+    with open(csv_path, 'rb') as f:
+        assert os.path.join(b'/tmp', b'\xff.tmp') in f.read()
+
+def test_close_twice(tmp_path):
+    report = ReportWriter(str(tmp_path / 'r.ndjson'))
+    report.close()
+    report.close()
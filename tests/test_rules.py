@@ -0,0 +1,115 @@
+import pytest
+
+from quickercleaner.config import Config
+from quickercleaner.rules import FileRules
+
+def test_default_rules_include_everything():
+    rules = FileRules()
+    assert rules.classify('a.tmp') == 'temporary'
+    assert rules.classify('b.TEMP') == 'temporary'
+    assert rules.classify('c.log') == 'log'
+    assert rules.classify('d.cache') == 'cache'
+    assert rules.classify('e.txt') == 'other'
+    assert rules.classify('Makefile') == 'other'
+
+def test_extension_includes():
+    rules = FileRules(['*.tmp', '*.LOG'])
+    assert rules.include_regex is None
+    assert rules.classify('a.tmp') == 'temporary'
+    assert rules.classify('a.log') == 'log'
+    assert rules.classify('A.Log') == 'log'
+    assert rules.classify('a.txt') is None
+    assert rules.classify('tmp') is None
+
+@pytest.mark.parametrize('name, included', [
+    ('~$report.docx', True),
+    ('~$REPORT.DOCX', True),
+    ('report.docx', False),
+    ('thumbs.db', True),
+    ('Thumbs.db', True),
+    ('cache_1', True),
+    ('cache_12', False),
+    ('a.tar.gz', True),
+    ('a.gz', False),
+    ('a.tmp', True),
+])
+def test_glob_includes(name, included):
+    rules = FileRules(['~$*', 'thumbs.db', 'cache_?', '*.tar.gz', '*.tmp'])
+    assert (rules.classify(name) is not None) == included
+
+def test_globs_match_whole_names():
+    rules = FileRules(['*.bak?'])
+    assert rules.classify('a.bak1') is not None
+    assert rules.classify('a.bak12') is None
+    assert rules.classify('a.bak1.txt') is None
+
+def test_no_includes_means_nothing():
+    assert FileRules([]).classify('a.tmp') is None
+
+@pytest.mark.parametrize('excluded', [['.docx'], ['docx'], [' .DOCX '], ['', 'docx']])
+def test_excluded_extensions(excluded):
+    rules = FileRules(exclude_extensions=excluded)
+    assert rules.exclude_extensions == {'.docx'}
+    assert rules.classify('a.docx') is None
+    assert rules.classify('a.DocX') is None
+    assert rules.classify('a.docx.tmp') == 'temporary'
+    assert rules.classify('docx') == 'other'
+
+def test_exclusions_win_over_includes():
+    rules = FileRules(['*.tmp', 'keep*'], ['.tmp'])
+    assert rules.classify('a.tmp') is None
+    assert rules.classify('keep.tmp') is None
+    assert rules.classify('keep.log') == 'log'
+
+def test_category_ignores_include_rules():
+    rules = FileRules(['*.log'], ['.tmp'])
+    assert rules.classify('a.tmp') is None
+    assert rules.category('a.tmp') == 'temporary'
+
+def test_custom_categories():
+    rules = FileRules(category_patterns=[
+        ('office', ['~$*', '*.wbk']),
+        ('logs', ['*.log', 'log-*']),
+        ('backup', ['*.wbk']),
+    ])
+    assert rules.category('~$a.docx') == 'office'
+    assert rules.category('a.WBK') == 'office'
+    assert rules.category('log-2020.txt') == 'logs'
+    assert rules.category('a.log') == 'logs'
+    assert rules.category('a.tmp') == 'other'
+
+def test_extension_categories_checked_before_globs():
+    rules = FileRules(category_patterns=[('prefixed', ['tmp*']), ('temporary', ['*.tmp'])])
+    assert rules.category('tmp1.tmp') == 'temporary'
+    assert rules.category('tmp1.txt') == 'prefixed'
+
+@pytest.fixture
+def environ(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for key in ('QUICK_CLEANER_TEMP_PATTERNS', 'QUICK_CLEANER_PROTECTED_EXTENSIONS'):
+        monkeypatch.delenv(key, raising=False)
+    return monkeypatch
+
+def test_config_without_patterns_includes_everything(environ):
+    config = Config()
+    assert config.temp_patterns is None
+    assert config.file_rules.include_all
+    assert config.file_rules.classify('a.txt') == 'other'
+
+def test_config_parses_patterns_and_extensions(environ):
+    environ.setenv('QUICK_CLEANER_TEMP_PATTERNS', '*.tmp, ~$*,,*.log ')
+    environ.setenv('QUICK_CLEANER_PROTECTED_EXTENSIONS', '.log, docx')
+    config = Config()
+    assert config.temp_patterns == ['*.tmp', '~$*', '*.log']
+    assert config.protected_extensions == ['.log', 'docx']
+    assert config.file_rules.classify('a.tmp') == 'temporary'
+    assert config.file_rules.classify('~$a.txt') == 'other'
+    assert config.file_rules.classify('a.log') is None
+    assert config.file_rules.classify('~$a.docx') is None
+    assert config.file_rules.classify('a.txt') is None
+
+def test_config_empty_patterns_include_nothing(environ):
+    environ.setenv('QUICK_CLEANER_TEMP_PATTERNS', '')
+    config = Config()
+    assert config.temp_patterns == []
+    assert config.file_rules.classify('a.tmp') is None
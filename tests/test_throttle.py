@@ -0,0 +1,138 @@
+import pytest
+
+from quickercleaner import throttle
+from quickercleaner.throttle import IOThrottle, TokenBucket, read_limits
+
+def approx(seconds):
+    # Waits may end a clock tick late when float refills leave a tiny debt
+    return pytest.approx(seconds, abs=1e-4)
+
+class FakeTime:
+    """Stands in for the time module; sleep() advances monotonic() and calls on_sleep
+
+    Like a real sleep it takes at least a clock tick, so rounding errors in
+    the remaining debt cannot keep a waiter spinning.
+    """
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.on_sleep = None
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += max(seconds, 1e-6)
+        if self.on_sleep is not None:
+            self.on_sleep()
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(throttle, 'time', fake)
+    return fake
+
+def test_unlimited(clock):
+    bucket = TokenBucket(0)
+    assert bucket.acquire(10 ** 9) == 0
+    assert clock.sleeps == []
+
+def test_burst_is_one_second(clock):
+    bucket = TokenBucket(100)
+    assert bucket.acquire(100) == 0
+    assert bucket.acquire(50) == approx(0.5)
+    assert clock.sleeps == [approx(0.1)] * 5
+
+def test_refill(clock):
+    bucket = TokenBucket(100)
+    bucket.acquire(100)
+    clock.now += 0.3
+    assert bucket.acquire(29) == 0
+    assert bucket.acquire(11) == approx(0.1)
+
+def test_refill_is_capped(clock):
+    bucket = TokenBucket(100)
+    clock.now += 3600
+    assert bucket.acquire(100) == 0
+    assert bucket.acquire(100) == approx(1.0)
+
+def test_debt_is_paid_back(clock):
+    bucket = TokenBucket(100)
+    # A single large request waits until the bucket is out of debt
+    assert bucket.acquire(400) == approx(3.0)
+    assert bucket.acquire(100) == approx(1.0)
+
+def test_lower_rate_during_wait(clock):
+    bucket = TokenBucket(100)
+    bucket.acquire(100)
+    clock.on_sleep = lambda: bucket.set_rate(10)
+    # 0.1s at 100/s pays 10 of the 50, the remaining 40 take 4s at 10/s
+    assert bucket.acquire(50) == approx(4.1)
+
+def test_higher_rate_during_wait(clock):
+    bucket = TokenBucket(10)
+    bucket.acquire(10)
+    clock.on_sleep = lambda: bucket.set_rate(1000)
+    # 0.1s at 10/s pays 1 of the 100, the remaining 99 take 0.099s at 1000/s
+    assert bucket.acquire(100) == approx(0.199)
+
+def test_rate_set_to_unlimited_during_wait(clock):
+    bucket = TokenBucket(10)
+    bucket.acquire(10)
+    clock.on_sleep = lambda: bucket.set_rate(0)
+    assert bucket.acquire(100) == approx(0.1)
+    assert bucket.acquire(10 ** 6) == 0
+
+def test_set_rate_caps_tokens(clock):
+    bucket = TokenBucket(1000)
+    bucket.set_rate(10)
+    assert bucket.acquire(10) == 0
+    assert bucket.acquire(10) == approx(1.0)
+
+def test_should_stop(clock):
+    bucket = TokenBucket(10)
+    calls = []
+
+    def should_stop():
+        calls.append(1)
+        return len(calls) > 2
+    assert bucket.acquire(1000, should_stop) == approx(0.2)
+
+def test_io_throttle_reports_waits(clock):
+    waits = []
+    io = IOThrottle(max_scan_ops=10, max_remove_bytes=100, on_wait=lambda bucket, seconds: waits.append((bucket, seconds)))
+    io.scan(10)
+    io.remove(5, 100)
+    assert waits == []
+    io.scan(5)
+    # The 0.5s scan wait refilled 50 bytes
+    io.remove(5, 100)
+    assert waits == [('throttle.scan', approx(0.5)), ('throttle.remove_bytes', approx(0.5))]
+
+def test_io_throttle_set_limits(clock):
+    io = IOThrottle(max_scan_ops=10)
+    io.set_limits(max_remove_ops=5)
+    assert io.limits == {'max_scan_ops': 10, 'max_remove_ops': 5, 'max_remove_bytes': 0}
+
+def test_read_limits(tmp_path):
+    path = tmp_path / 'limits'
+    path.write_text(
+        '# throttle the running cleanup\n'
+        '\n'
+        'QUICK_CLEANER_MAX_SCAN_OPS = 500\n'
+        'QUICK_CLEANER_MAX_REMOVE_MB=2.5\n'
+        'QUICK_CLEANER_UNKNOWN=1\n'
+        'QUICK_CLEANER_MAX_REMOVE_OPS=\n'
+    )
+    assert read_limits(str(path)) == {
+        'max_scan_ops': 500.0,
+        'max_remove_ops': 0.0,
+        'max_remove_bytes': 2.5 * 1024 * 1024,
+    }
+
+def test_read_limits_rejects_bad_values(tmp_path):
+    path = tmp_path / 'limits'
+    path.write_text('QUICK_CLEANER_MAX_SCAN_OPS=fast\n')
+    with pytest.raises(ValueError):
+        read_limits(str(path))
@@ -0,0 +1,89 @@
+import os
+import threading
+
+import pytest
+
+from quickercleaner.pipeline import StageStats
+from quickercleaner.trash import DeleterPool, RemovalBatcher, TrashBackend
+
+def make_files(directory, names, size=100):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name in names:
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        paths.append(path)
+    return paths
+
+def send2trash(paths):
+    """Like send2trash: handles a list in order and stops at the first failure"""
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        if path.endswith('.bad'):
+            raise PermissionError(13, 'Access is denied', path)
+        if not os.path.lexists(path):
+            raise OSError(2, f'File not found: {path}')
+        os.remove(path)
+
+@pytest.fixture
+def backend():
+    backend = TrashBackend(use_recycle_bin=False)
+    backend._send2trash = send2trash
+    return backend
+
+def test_partly_failed_batch(tmp_path, backend):
+    paths = make_files(str(tmp_path), ['a', 'b', 'c.bad', 'd'])
+    batcher = RemovalBatcher(backend, 100)
+    for path in paths:
+        assert batcher.add(path, 100) == []
+    outcomes = batcher.flush()
+    assert [(path, size) for path, size, error in outcomes] == [(path, 100) for path in paths]
+    assert [error for path, size, error in outcomes if path != paths[2]] == [None] * 3
+    assert isinstance(outcomes[2][2], PermissionError)
+    assert [os.path.exists(path) for path in paths] == [False, False, True, False]
+
+def test_vanished_file_is_skipped(tmp_path):
+    paths = make_files(str(tmp_path), ['a', 'b', 'c'])
+    os.remove(paths[1])
+    batcher = RemovalBatcher(TrashBackend(use_recycle_bin=False), 100)
+    for path in paths:
+        batcher.add(path, 100)
+    assert batcher.flush() == [(paths[0], 100, None), (paths[1], None, None), (paths[2], 100, None)]
+
+def test_batches_per_directory(tmp_path):
+    first = make_files(str(tmp_path / 'x'), ['a', 'b'])
+    second = make_files(str(tmp_path / 'y'), ['c'])
+    calls = []
+
+    class Backend(TrashBackend):
+        def remove(self, paths):
+            calls.append(paths)
+            return super().remove(paths)
+    batcher = RemovalBatcher(Backend(use_recycle_bin=False), 3)
+    batcher.add(first[0], 1)
+    batcher.add(second[0], 1)
+    assert len(batcher.add(first[1], 1)) == 3
+    assert sorted(calls) == [first, second]
+
+def test_deleter_pool_counts_partly_failed_batch(tmp_path, backend):
+    paths = make_files(str(tmp_path), ['a', 'b', 'c.bad', 'd'])
+    pool = DeleterPool(2, 100, lambda: backend, StageStats('verify'), StageStats('delete'), threading.Event())
+    assert pool.submit([(path, 100, 'temp_files') for path in paths])
+    totals = pool.close()
+    assert (totals.files, totals.bytes, totals.skipped) == (3, 300, 0)
+    assert sorted(totals.removed) == [paths[0], paths[1], paths[3]]
+    assert totals.categories == {'temp_files': {'files': 3, 'bytes': 300}}
+    assert len(totals.errors) == 1 and paths[2] in totals.errors[0]
+
+def test_deleter_pool_raises_backend_failure(tmp_path):
+    stopped = threading.Event()
+
+    def make_backend():
+        raise NotADirectoryError('bad target')
+    pool = DeleterPool(1, 10, make_backend, StageStats('verify'), StageStats('delete'), stopped)
+    pool.submit([(str(tmp_path / 'a'), 1, 'temp_files')])
+    with pytest.raises(NotADirectoryError):
+        pool.close()
+    assert stopped.is_set()
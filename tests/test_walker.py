@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+
+import pytest
+
+from quickercleaner.walker import ParallelWalker, WalkStats, age_in_days, iter_files, list_dir
+
+DAY = 24 * 3600
+
+def make_tree(root, files):
+    """files maps relative paths to sizes"""
+    for path, size in files.items():
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, 'wb') as f:
+            f.write(b'x' * size)
+
+def relative(root, entries):
+    return sorted((os.path.relpath(os.path.join(d, name), root), st.st_size) for d, name, st in entries)
+
+FILES = {'a.tmp': 1, 'b.log': 2, 'x/c.tmp': 3, 'x/y/d.tmp': 4, 'x/y/z/e.bak': 5, 'w/f.tmp': 6}
+
+def test_age_in_days():
+    now = 1000 * DAY
+    assert age_in_days(now - 3 * DAY - 1, now) == 3
+    assert age_in_days(now - DAY + 1, now) == 0
+
+def test_list_dir(tmp_path):
+    make_tree(str(tmp_path), {'a.tmp': 1, 'sub/b.tmp': 2})
+    stats = WalkStats()
+    subdirs, files = list_dir(str(tmp_path), stats)
+    assert subdirs == [str(tmp_path / 'sub')]
+    assert [(name, st.st_size) for name, st in files] == [('a.tmp', 1)]
+    assert (stats.dirs_listed, stats.stat_calls, stats.errors) == (1, 1, 0)
+
+def test_list_dir_does_not_follow_symlinks(tmp_path):
+    make_tree(str(tmp_path), {'real/a.tmp': 1, 'f.tmp': 1})
+    os.symlink(str(tmp_path / 'real'), str(tmp_path / 'dirlink'))
+    os.symlink(str(tmp_path / 'f.tmp'), str(tmp_path / 'filelink'))
+    subdirs, files = list_dir(str(tmp_path))
+    assert subdirs == [str(tmp_path / 'real')]
+    assert [name for name, st in files] == ['f.tmp']
+
+def test_list_dir_records_errors(tmp_path):
+    stats = WalkStats()
+    assert list_dir(str(tmp_path / 'missing'), stats) == ([], [])
+    assert stats.errors == 1
+    assert stats.error_counts == {'ENOENT': 1}
+
+def test_iter_files(tmp_path):
+    make_tree(str(tmp_path), FILES)
+    stats = WalkStats()
+    found = relative(str(tmp_path), iter_files(str(tmp_path), stats))
+    assert found == sorted((os.path.normpath(path), size) for path, size in FILES.items())
+    assert stats.dirs_listed == 5
+    # One stat per file, none per directory
+    assert stats.stat_calls == len(FILES)
+    assert (stats.files_seen, stats.bytes_seen) == (len(FILES), sum(FILES.values()))
+
+def test_scan_path(tmp_path, cleaner):
+    make_tree(str(tmp_path / 'root'), FILES)
+    assert cleaner.scan_path(str(tmp_path / 'root')) == (sum(FILES.values()), len(FILES))
+
+def test_scan_path_detailed_uses_one_reference_time(tmp_path, cleaner):
+    make_tree(str(tmp_path / 'root'), {'old.tmp': 10, 'young.tmp': 20, 'old.txt': 30})
+    now = time.time()
+    for name, age in (('old.tmp', 400), ('young.tmp', 10), ('old.txt', 400)):
+        mtime = now - age * DAY
+        os.utime(str(tmp_path / 'root' / name), (mtime, mtime))
+    cleaner.min_age_days = 365
+    size, count, files = cleaner.scan_path_detailed(str(tmp_path / 'root'), now)
+    names = {record.name: record for record in files}
+    assert 'young.tmp' not in names
+    assert names['old.tmp'].age_days == 400
+    assert files.now == now
+    assert size == sum(record.size for record in files)
+    assert count == len(files)
+
+def make_wide_tree(root, dirs=30, depth=3, files=3):
+    expected = []
+    for i in range(dirs):
+        parts = [f'd{i}'] + [f's{j}' for j in range(i % depth)]
+        for k in range(files):
+            path = os.path.join(*parts, f'f{k}.tmp')
+            expected.append((path, i + k))
+    make_tree(root, dict(expected))
+    return sorted(expected)
+
+class Collector:
+    def __init__(self):
+        self.files = []
+        self.listings = []
+
+    def add_files(self, tag, dirpath, files):
+        self.files.extend((tag, dirpath, name, st) for name, st in files)
+
+    def add_listing(self, tag, dirpath, subdirs, files):
+        self.listings.append((tag, dirpath, subdirs))
+        self.add_files(tag, dirpath, files)
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_parallel_walker_run(tmp_path, workers):
+    expected = make_wide_tree(str(tmp_path))
+    accumulators, stats = ParallelWalker(workers).run([('t', str(tmp_path))], Collector)
+    assert len(accumulators) == workers
+    found = [entry for acc in accumulators for entry in acc.files]
+    assert relative(str(tmp_path), [(d, name, st) for tag, d, name, st in found]) == expected
+    assert stats.files_seen == len(expected)
+    assert stats.stat_calls == len(expected)
+
+def test_parallel_walker_tags_each_root(tmp_path):
+    make_tree(str(tmp_path), {'a/x.tmp': 1, 'b/y.tmp': 2, 'b/c/z.tmp': 3})
+    walk = ParallelWalker(3)
+    found = sorted((tag, name) for tag, d, name, st in walk.iter_files([('first', str(tmp_path / 'a')), ('second', str(tmp_path / 'b'))]))
+    assert found == [('first', 'x.tmp'), ('second', 'y.tmp'), ('second', 'z.tmp')]
+    assert walk.stats.files_seen == 3
+
+def test_parallel_walker_matches_iter_files(tmp_path):
+    expected = make_wide_tree(str(tmp_path), dirs=60)
+    walk = ParallelWalker(4)
+    found = [(d, name, st) for tag, d, name, st in walk.iter_files([(None, str(tmp_path))], max_pending_dirs=2)]
+    assert relative(str(tmp_path), found) == expected == relative(str(tmp_path), iter_files(str(tmp_path)))
+
+def test_iter_listings_yields_parents_first(tmp_path):
+    make_wide_tree(str(tmp_path))
+    seen = {str(tmp_path)}
+    for tag, dirpath, subdirs, files in ParallelWalker(4).iter_listings([(None, str(tmp_path))]):
+        assert dirpath in seen
+        seen.update(subdirs)
+
+def test_cancel_stops_the_walk(tmp_path):
+    make_wide_tree(str(tmp_path))
+    cancel = threading.Event()
+    listed = []
+
+    def lister(dirpath, stats=None):
+        listed.append(dirpath)
+        cancel.set()
+        return list_dir(dirpath, stats)
+    ParallelWalker(2, lister, cancel).run([(None, str(tmp_path))], Collector)
+    assert len(listed) <= 2
+
+def test_closing_iter_files_stops_workers(tmp_path):
+    make_wide_tree(str(tmp_path), dirs=60)
+    before = threading.active_count()
+    files = ParallelWalker(4).iter_files([(None, str(tmp_path))], max_pending_dirs=1)
+    next(files)
+    assert threading.active_count() > before
+    files.close()
+    assert threading.active_count() == before
+
+def test_lister_errors_are_raised(tmp_path):
+    make_wide_tree(str(tmp_path))
+
+    def lister(dirpath, stats=None):
+        if dirpath != str(tmp_path):
+            raise RuntimeError('listing failed')
+        return list_dir(dirpath, stats)
+    with pytest.raises(RuntimeError):
+        ParallelWalker(4, lister).run([(None, str(tmp_path))], Collector)
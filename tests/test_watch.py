@@ -0,0 +1,83 @@
+import os
+import time
+
+from quickercleaner.watch import CandidateModel, WatchDaemon
+
+OLD = time.time() - 400 * 86400
+
+def make_old_file(path, size=100):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    os.utime(path, (OLD, OLD))
+    return path
+
+def make_daemon(cleaner, *roots):
+    cleaner.cleanup_targets = {'temp_files': [str(root) for root in roots]}
+    return WatchDaemon(cleaner, 'C:', backend='poll')
+
+def test_resync_relists_tracked_directories(tmp_path, cleaner):
+    deep = tmp_path / 'temp' / 'a' / 'b'
+    make_old_file(str(deep / 'f1.tmp'))
+    daemon = make_daemon(cleaner, tmp_path / 'temp')
+    daemon.resync()
+    assert daemon.model.total_files == 1
+    # A change the watcher never reported, as after a queue overflow
+    make_old_file(str(deep / 'f2.tmp'))
+    make_old_file(str(tmp_path / 'temp' / 'a' / 'f3.tmp'))
+    daemon.resync()
+    assert daemon.model.total_files == 3
+    assert daemon.model.total_size == 300
+
+def test_resync_drops_vanished_directories(tmp_path, cleaner):
+    make_old_file(str(tmp_path / 'temp' / 'a' / 'f1.tmp'))
+    make_old_file(str(tmp_path / 'temp' / 'f2.tmp'))
+    daemon = make_daemon(cleaner, tmp_path / 'temp')
+    daemon.resync()
+    os.remove(str(tmp_path / 'temp' / 'a' / 'f1.tmp'))
+    os.rmdir(str(tmp_path / 'temp' / 'a'))
+    daemon.resync()
+    assert daemon.model.total_files == 1
+    assert str(tmp_path / 'temp' / 'a') not in daemon.model
+
+def test_resync_tracks_repeated_and_nested_targets_once(tmp_path, cleaner):
+    root = tmp_path / 'temp'
+    make_old_file(str(root / 'sub' / 'f1.tmp'))
+    make_old_file(str(root / 'f2.tmp'))
+    os.symlink(str(root), str(tmp_path / 'alias'))
+    daemon = make_daemon(cleaner, root, tmp_path / 'alias', root / 'sub', tmp_path / 'missing')
+    daemon.resync()
+    assert daemon.model.total_files == 2
+    assert daemon.model.totals() == {'temp_files': {'size': 200, 'files': 2}}
+    assert len(daemon.model) == 2
+
+def test_resync_skips_protected_targets(tmp_path, cleaner):
+    make_old_file(str(tmp_path / 'temp' / 'f1.tmp'))
+    make_old_file(str(tmp_path / 'temp' / 'keep' / 'f2.tmp'))
+    cleaner.protected_paths = [str(tmp_path / 'temp' / 'keep')]
+    daemon = make_daemon(cleaner, tmp_path / 'temp', tmp_path / 'temp' / 'keep')
+    daemon.resync()
+    assert daemon.model.total_files == 1
+
+def test_update_relists_changed_directories(tmp_path, cleaner):
+    make_old_file(str(tmp_path / 'temp' / 'f1.tmp'))
+    daemon = make_daemon(cleaner, tmp_path / 'temp')
+    daemon.resync()
+    make_old_file(str(tmp_path / 'temp' / 'new' / 'f2.tmp'))
+    daemon.update({str(tmp_path / 'temp')})
+    assert daemon.model.total_files == 2
+
+def test_young_files_are_counted_once_of_age(tmp_path, cleaner):
+    path = str(tmp_path / 'temp' / 'f.tmp')
+    make_old_file(path)
+    mtime = time.time() - 10 * 86400
+    os.utime(path, (mtime, mtime))
+    cleaner.cleanup_targets = {'temp_files': [str(tmp_path / 'temp')]}
+    cleaner.min_age_days = 30
+    model = CandidateModel(cleaner)
+    now = time.time()
+    model.rescan('temp_files', str(tmp_path / 'temp'), now)
+    assert model.total_files == 0
+    assert model.advance(now + 19 * 86400) == 0
+    assert model.advance(now + 21 * 86400) == 1
+    assert model.total_files == 1